@@ -293,6 +293,11 @@ async def initialize(input_data: InputSchema, request: Request):
                 "-f", annotations,
             ])
 
+        # parsed clustering inputs are shared by all runs on the same clustering
+        cache_dir = os.getenv("KINFIN_CACHE_DIR")
+        if cache_dir:
+            command.extend(["--cache_dir", cache_dir])
+
         status_file = os.path.join(result_dir, f"{session_id}.status")
         asyncio.create_task(run_cli_command(command, status_file))
 
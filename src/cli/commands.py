@@ -3,8 +3,15 @@ import sys
 from typing import Union
 
 from cli.validate import validate_cli_args
-from core.config import SUPPORTED_PLOT_FORMATS, SUPPORTED_TAXRANKS, SUPPORTED_TESTS
+from core.config import (
+    SUPPORTED_ALO_METRICS_FORMATS,
+    SUPPORTED_PLOT_FORMATS,
+    SUPPORTED_RAREFACTION_MODES,
+    SUPPORTED_TAXRANKS,
+    SUPPORTED_TESTS,
+)
 from core.input import InputData, ServeArgs
+from core.plan import OUTPUT_STAGES
 
 
 # TODO : --plotsize should take a tuple
@@ -124,6 +131,50 @@ def parse_args(
         default=30,
         type=int,
     )
+    general_group.add_argument(
+        "--rarefaction",
+        help="Rarefaction curves from sampled repetitions or as exact expected values (with min/max of a few samples) [default: sampled]. Options: sampled, exact",
+        default="sampled",
+        choices=SUPPORTED_RAREFACTION_MODES,
+    )
+    general_group.add_argument(
+        "--seed",
+        help="Seed for the random sampling of rarefaction curves [default: random]",
+        default=None,
+        type=int,
+    )
+    general_group.add_argument(
+        "-j",
+        "--jobs",
+        help="Number of worker processes used for cluster analysis [default: 1]",
+        default=1,
+        type=int,
+    )
+    general_group.add_argument(
+        "--chunk_size",
+        help="Parse and analyse clusters in chunks of this many clusters, spilling per-cluster outputs to disk to bound memory [default: off]",
+        default=None,
+        type=int,
+    )
+    general_group.add_argument(
+        "--cache_dir",
+        help="Directory in which parsed input files are cached, to be reused by later runs on the same inputs [default: off]",
+        default=None,
+    )
+    general_group.add_argument(
+        "--alo_metrics_format",
+        help="Format of the cluster metrics and 1-to-1s of ALOs: a file per level with a row per cluster, or a long-format file per attribute with a row per cluster and level it is present in, and an offset index [default: per_level]. Options: per_level, long",
+        default="per_level",
+        choices=SUPPORTED_ALO_METRICS_FORMATS,
+    )
+    general_group.add_argument(
+        "--outputs",
+        help=f"Outputs to produce; only the analyses they need are run [default: all]. Options: {', '.join(OUTPUT_STAGES)}",
+        default=None,
+        nargs="+",
+        metavar="OUTPUT",
+        choices=list(OUTPUT_STAGES),
+    )
 
     # Fuzzy Orthology Groups
     fuzzy_group = cli_parser.add_argument_group("Fuzzy Orthology Groups")
@@ -196,6 +247,11 @@ def parse_args(
             test=args.test,
             taxranks=args.taxranks,
             repetitions=args.repetitions + 1,
+            seed=args.seed,
+            rarefaction=args.rarefaction,
+            jobs=args.jobs,
+            chunk_size=args.chunk_size,
+            cache_dir=args.cache_dir,
             fuzzy_count=args.target_count,
             fuzzy_fraction=args.target_fraction,
             fuzzy_range=fuzzy_range,
@@ -207,6 +263,8 @@ def parse_args(
             ipr_mapping_f=ipr_mapping_f,
             go_mapping_f=go_mapping_f,
             taxon_idx_mapping_file=args.taxon_idx_mapping,
+            outputs=args.outputs,
+            alo_metrics_format=args.alo_metrics_format,
         )
     else:
         sys.exit()
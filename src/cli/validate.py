@@ -78,6 +78,21 @@ def validate_cli_args(args) -> None:
             "[ERROR] : Please specify a positive integer for the minimum number of proteomes to consider for computations"
         )
 
+    if args.jobs <= 0:
+        error_msgs.append(
+            "[ERROR] : Please specify a positive integer for the number of jobs"
+        )
+
+    if args.chunk_size is not None and args.chunk_size <= 0:
+        error_msgs.append(
+            "[ERROR] : Please specify a positive integer for the chunk size"
+        )
+
+    if args.outputs and "tree" in args.outputs and not args.tree_file:
+        error_msgs.append(
+            "[ERROR] : You have requested the 'tree' output using '--outputs'. Please also provide a tree file using ('--tree_file')."
+        )
+
     if error_msgs:
         logger.error("\n".join(error_msgs))
         sys.exit(1)
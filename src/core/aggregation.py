@@ -0,0 +1,222 @@
+from typing import Dict, List, Literal, Optional, Tuple, Union
+
+import numpy as np
+import scipy.sparse
+
+from core.alo_collections import AloCollection
+from core.clusters import ClusterMatrix, ClusterProteins
+from core.lengths import LengthStats
+
+# order of cluster type codes in AttributeAggregate.cluster_type_codes
+CLUSTER_TYPES: Tuple[Literal["singleton", "specific", "shared"], ...] = (
+    "singleton",
+    "specific",
+    "shared",
+)
+
+
+class AttributeAggregate:
+    """
+    Per-cluster counts of all levels of one attribute.
+
+    Stored in CSR layout (rows are clusters, columns are levels) with entries for
+    the levels present in a cluster only:
+        - protein_counts: number of proteins of the cluster in proteomes of the level
+        - proteome_counts: number of proteomes of the level present in the cluster
+        - protein_length_stats: length statistics of the proteins of the cluster in
+          proteomes of the level (None if no lengths are known)
+    """
+
+    def __init__(
+        self,
+        attribute: str,
+        levels: List[str],
+        indptr: np.ndarray,
+        level_idxs: np.ndarray,
+        protein_counts: np.ndarray,
+        proteome_counts: np.ndarray,
+        cluster_type_codes: np.ndarray,
+        protein_length_stats: Optional[LengthStats] = None,
+    ) -> None:
+        self.attribute: str = attribute
+        self.levels: List[str] = levels
+        self.indptr: np.ndarray = indptr
+        self.level_idxs: np.ndarray = level_idxs
+        self.protein_counts: np.ndarray = protein_counts
+        self.proteome_counts: np.ndarray = proteome_counts
+        self.cluster_type_codes: np.ndarray = cluster_type_codes
+        self.protein_length_stats: Optional[LengthStats] = protein_length_stats
+
+    def get_level_counts(self, cluster_idx: int) -> Dict[str, Tuple[int, int]]:
+        """
+        Returns protein and proteome counts of the levels present in a cluster.
+
+        Args:
+            cluster_idx (int): Row of the cluster in the cluster matrix.
+
+        Returns:
+            Dict[str, Tuple[int, int]]: (protein count, proteome count) by level.
+        """
+        start, end = self.indptr[cluster_idx], self.indptr[cluster_idx + 1]
+        return {
+            self.levels[level_idx]: (protein_count, proteome_count)
+            for level_idx, protein_count, proteome_count in zip(
+                self.level_idxs[start:end].tolist(),
+                self.protein_counts[start:end].tolist(),
+                self.proteome_counts[start:end].tolist(),
+            )
+        }
+
+    def get_protein_length_stats(
+        self, cluster_idx: int
+    ) -> Dict[str, Dict[str, Union[int, float]]]:
+        """
+        Returns protein length statistics of all levels for a cluster.
+
+        Args:
+            cluster_idx (int): Row of the cluster in the cluster matrix.
+
+        Returns:
+            Dict[str, Dict[str, Union[int, float]]]: 'sum', 'mean', 'median' and 'sd'
+                of protein lengths by level (0 for levels in which the cluster is
+                absent, or if no lengths are known).
+        """
+        protein_length_stats_by_level: Dict[str, Dict[str, Union[int, float]]] = {
+            level: {"sum": 0, "mean": 0.0, "median": 0, "sd": 0.0}
+            for level in self.levels
+        }
+        if self.protein_length_stats is not None:
+            start, end = self.indptr[cluster_idx], self.indptr[cluster_idx + 1]
+            for entry_idx, level_idx in enumerate(
+                self.level_idxs[start:end].tolist(), start
+            ):
+                protein_length_stats_by_level[self.levels[level_idx]] = (
+                    self.protein_length_stats.get(entry_idx)
+                )
+        return protein_length_stats_by_level
+
+    def get_cluster_type(
+        self, cluster_idx: int
+    ) -> Literal["singleton", "specific", "shared"]:
+        """
+        Returns the type of a cluster with regard to the attribute.
+
+        Args:
+            cluster_idx (int): Row of the cluster in the cluster matrix.
+
+        Returns:
+            Literal["singleton", "specific", "shared"]: The attribute cluster type.
+        """
+        return CLUSTER_TYPES[self.cluster_type_codes[cluster_idx]]
+
+
+def build_level_indicator_matrix(
+    levels: List[str],
+    proteome_ids_by_level: Dict[str, set],
+    proteome_idx_by_proteome_id: Dict[str, int],
+) -> scipy.sparse.csr_matrix:
+    """
+    Builds the proteome-by-level indicator matrix of an attribute.
+
+    Args:
+        levels (List[str]): Levels of the attribute, one column each.
+        proteome_ids_by_level (Dict[str, set]): Proteome IDs of each level.
+        proteome_idx_by_proteome_id (Dict[str, int]): Row index of each proteome.
+
+    Returns:
+        scipy.sparse.csr_matrix: Matrix with a 1 where a proteome belongs to a level.
+    """
+    rows: List[int] = []
+    columns: List[int] = []
+    for level_idx, level in enumerate(levels):
+        for proteome_id in proteome_ids_by_level[level]:
+            rows.append(proteome_idx_by_proteome_id[proteome_id])
+            columns.append(level_idx)
+    return scipy.sparse.csr_matrix(
+        (np.ones(len(rows), dtype=np.int32), (rows, columns)),
+        shape=(len(proteome_idx_by_proteome_id), len(levels)),
+    )
+
+
+def aggregate_attributes(
+    cluster_matrix: ClusterMatrix,
+    aloCollection: AloCollection,
+    cluster_proteins: Optional[ClusterProteins] = None,
+) -> Dict[str, AttributeAggregate]:
+    """
+    Computes per-level counts and cluster types for all clusters and attributes.
+
+    For each attribute, the cluster-by-proteome count matrix is multiplied with the
+    proteome-by-level indicator matrix of the attribute, which gives the protein
+    counts by level, and the same is done with the presence pattern of the count
+    matrix, which gives the proteome counts by level (and hence the coverage and
+    present/absent status). A cluster is a 'singleton' if it has at most one
+    protein, 'shared' if it is present in more than one level and 'specific'
+    otherwise (see core.logic.get_attribute_cluster_type).
+
+    If the proteins of the clusters are given (and their lengths are known), the
+    length statistics of every cluster and level are computed in one segment
+    reduction per attribute.
+
+    Args:
+        cluster_matrix (ClusterMatrix): Protein counts of clusters by proteome.
+        aloCollection (AloCollection): Attributes, levels and proteome indices.
+        cluster_proteins (Optional[ClusterProteins]): Proteins of all clusters.
+
+    Returns:
+        Dict[str, AttributeAggregate]: Aggregated counts by attribute.
+    """
+    counts = cluster_matrix.tocsr()
+    presence = counts.copy()
+    presence.data = np.ones_like(presence.data)
+    singleton = np.asarray(counts.sum(axis=1)).ravel() <= 1
+
+    attribute_aggregates: Dict[str, AttributeAggregate] = {}
+    for attribute in aloCollection.attributes:
+        proteome_ids_by_level = aloCollection.proteome_ids_by_level_by_attribute[
+            attribute
+        ]
+        levels = list(proteome_ids_by_level)
+        indicator = build_level_indicator_matrix(
+            levels,
+            proteome_ids_by_level,
+            aloCollection.proteome_idx_by_proteome_id,
+        )
+        protein_counts = (counts @ indicator).tocsr()
+        proteome_counts = (presence @ indicator).tocsr()
+        protein_counts.sort_indices()
+        proteome_counts.sort_indices()
+
+        present_level_count = np.diff(protein_counts.indptr)
+        cluster_type_codes = np.where(
+            singleton,
+            CLUSTER_TYPES.index("singleton"),
+            np.where(
+                present_level_count > 1,
+                CLUSTER_TYPES.index("shared"),
+                CLUSTER_TYPES.index("specific"),
+            ),
+        ).astype(np.int8)
+
+        protein_length_stats = None
+        if cluster_proteins is not None:
+            entry_cluster_idxs = np.repeat(
+                np.arange(cluster_matrix.cluster_count), present_level_count
+            )
+            protein_length_stats = cluster_proteins.get_level_length_stats(
+                level_idx_by_proteome_idx=np.asarray(indicator.argmax(axis=1)).ravel(),
+                level_count=len(levels),
+                entry_idxs=entry_cluster_idxs * len(levels) + protein_counts.indices,
+            )
+
+        attribute_aggregates[attribute] = AttributeAggregate(
+            attribute=attribute,
+            levels=levels,
+            indptr=protein_counts.indptr,
+            level_idxs=protein_counts.indices,
+            protein_counts=protein_counts.data,
+            proteome_counts=proteome_counts.data,
+            cluster_type_codes=cluster_type_codes,
+            protein_length_stats=protein_length_stats,
+        )
+    return attribute_aggregates
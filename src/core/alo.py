@@ -1,6 +1,9 @@
 from typing import Dict, List, Literal, Optional, Set, Union
 
+import numpy as np
+
 from core.clusters import Cluster
+from core.logic import get_proteome_bitmask
 
 
 class AttributeLevel:
@@ -11,12 +14,35 @@ class AttributeLevel:
         'specific' : only present within one ALO
     """
 
-    def __init__(self, attribute: str, level: str, proteomes: Set[str]) -> None:
+    def __init__(
+        self,
+        attribute: str,
+        level: str,
+        proteomes: Set[str],
+        proteome_idx_by_proteome_id: Optional[Dict[str, int]] = None,
+    ) -> None:
         self.attribute: str = attribute
         self.level: str = level
         self.proteomes: Set[str] = set(proteomes)
         self.proteomes_list: List[str] = list(proteomes)
         self.proteome_count: int = len(proteomes)
+        # columns of proteomes_list in ClusterCollection.cluster_matrix
+        self.proteome_idxs: np.ndarray = np.array(
+            (
+                [
+                    proteome_idx_by_proteome_id[proteome_id]
+                    for proteome_id in self.proteomes_list
+                ]
+                if proteome_idx_by_proteome_id
+                else []
+            ),
+            dtype=np.int32,
+        )
+        self.proteome_bitmask: int = (
+            get_proteome_bitmask(self.proteomes, proteome_idx_by_proteome_id)
+            if proteome_idx_by_proteome_id
+            else 0
+        )
 
         self.cluster_ids_by_cluster_type_by_cluster_status: Dict[
             str, Dict[str, List[str]]
@@ -64,6 +90,31 @@ class AttributeLevel:
         ] = {}
         self.protein_count_by_cluster_id: Dict[str, int] = {}
 
+        # counts of clusters that are not stored by cluster ID, see
+        # add_inferred_singletons and release_clusters
+        self.released_cluster_count_by_cluster_type_by_cluster_status: Dict[
+            str, Dict[str, int]
+        ] = {
+            "present": {"singleton": 0, "specific": 0, "shared": 0},
+            "absent": {"singleton": 0, "specific": 0, "shared": 0},
+        }
+        self.released_protein_count_by_cluster_type: Dict[str, int] = {
+            "singleton": 0,
+            "specific": 0,
+            "shared": 0,
+        }
+        self.released_protein_span_by_cluster_type: Dict[str, Union[int, float]] = {
+            "singleton": 0,
+            "specific": 0,
+            "shared": 0,
+        }
+        self.released_cluster_count_by_cluster_cardinality_by_cluster_type: Dict[
+            str, Dict[str, int]
+        ] = {
+            "shared": {"true": 0, "fuzzy": 0},
+            "specific": {"true": 0, "fuzzy": 0},
+        }
+
     def add_cluster(
         self,
         cluster: Cluster,
@@ -137,6 +188,198 @@ class AttributeLevel:
             mean_non_ALO_count
         )
 
+    def add_inferred_singletons(
+        self, present_count: int, absent_count: int, protein_span: int
+    ) -> None:
+        """
+        Adds inferred singletons (see InferredSingletons) to the cluster and protein
+        counts, without storing them by cluster ID.
+
+        Every inferred singleton has one protein, so the number of present
+        singletons is also their number of proteins.
+
+        Args:
+            present_count (int): Number of singletons of proteomes of the ALO.
+            absent_count (int): Number of singletons of other proteomes.
+            protein_span (int): Sum of the protein lengths of the present singletons.
+
+        Returns:
+            None
+        """
+        released_cluster_counts = (
+            self.released_cluster_count_by_cluster_type_by_cluster_status
+        )
+        released_cluster_counts["present"]["singleton"] += present_count
+        released_cluster_counts["absent"]["singleton"] += absent_count
+        self.released_protein_count_by_cluster_type["singleton"] += present_count
+        self.released_protein_span_by_cluster_type["singleton"] += protein_span
+
+    def release_clusters(self) -> None:
+        """
+        Drops the data stored by cluster ID, keeping only the cluster and protein
+        counts (and spans) used by the attribute metrics.
+
+        Used when clusters are analysed in chunks, once the outputs of the clusters
+        of a chunk have been written.
+
+        Returns:
+            None
+        """
+        for cluster_status, cluster_ids_by_cluster_type in list(
+            self.cluster_ids_by_cluster_type_by_cluster_status.items()
+        ):
+            for cluster_type, cluster_ids in list(cluster_ids_by_cluster_type.items()):
+                self.released_cluster_count_by_cluster_type_by_cluster_status[
+                    cluster_status
+                ][cluster_type] += len(cluster_ids)
+                cluster_ids.clear()
+
+        for cluster_type, protein_ids in list(self.protein_ids_by_cluster_type.items()):
+            self.released_protein_count_by_cluster_type[cluster_type] += len(
+                protein_ids
+            )
+            protein_ids.clear()
+
+        for cluster_type, protein_spans in list(
+            self.protein_span_by_cluster_type.items()
+        ):
+            self.released_protein_span_by_cluster_type[cluster_type] += sum(
+                protein_spans
+            )
+            protein_spans.clear()
+
+        for cluster_type, cluster_ids_by_cluster_cardinality in list(
+            self.clusters_by_cluster_cardinality_by_cluster_type.items()
+        ):
+            for cluster_cardinality, cluster_ids in list(
+                cluster_ids_by_cluster_cardinality.items()
+            ):
+                self.released_cluster_count_by_cluster_cardinality_by_cluster_type[
+                    cluster_type
+                ][cluster_cardinality] += len(cluster_ids)
+                cluster_ids.clear()
+
+        for cluster_data in (
+            self.cluster_status_by_cluster_id,
+            self.cluster_type_by_cluster_id,
+            self.cluster_mwu_pvalue_by_cluster_id,
+            self.cluster_mwu_log2_mean_by_cluster_id,
+            self.cluster_mean_ALO_count_by_cluster_id,
+            self.cluster_mean_non_ALO_count_by_cluster_id,
+            self.protein_length_stats_by_cluster_id,
+            self.protein_count_by_cluster_id,
+        ):
+            cluster_data.clear()
+
+    def set_representation_test(
+        self,
+        cluster_id: str,
+        mwu_pvalue: Optional[float],
+        mwu_log2_mean: Optional[float],
+        mean_ALO_count: Optional[float],
+        mean_non_ALO_count: Optional[float],
+    ) -> None:
+        """
+        Sets the representation test results of a cluster added before.
+
+        Args:
+            cluster_id (str): ID of the cluster.
+            mwu_pvalue (Optional[float]): P-value of the representation test.
+            mwu_log2_mean (Optional[float]): Log2 of the ratio of mean counts.
+            mean_ALO_count (Optional[float]): Mean count of ALO.
+            mean_non_ALO_count (Optional[float]): Mean count of non-ALO.
+
+        Returns:
+            None
+        """
+        self.cluster_mwu_pvalue_by_cluster_id[cluster_id] = mwu_pvalue
+        self.cluster_mwu_log2_mean_by_cluster_id[cluster_id] = mwu_log2_mean
+        self.cluster_mean_ALO_count_by_cluster_id[cluster_id] = mean_ALO_count
+        self.cluster_mean_non_ALO_count_by_cluster_id[cluster_id] = mean_non_ALO_count
+
+    def merge(self, other: "AttributeLevel") -> None:
+        """
+        Merges the cluster data accumulated by another instance of the same ALO.
+
+        Used to combine partial results computed over disjoint shards of the
+        clustering. Shards must be merged in cluster order so that lists end up
+        in the same order as in a serial run.
+
+        Args:
+            other (AttributeLevel): Partial ALO for the same attribute and level.
+
+        Returns:
+            None
+        """
+        for cluster_status, cluster_ids_by_cluster_type in list(
+            other.cluster_ids_by_cluster_type_by_cluster_status.items()
+        ):
+            for cluster_type, cluster_ids in list(cluster_ids_by_cluster_type.items()):
+                self.cluster_ids_by_cluster_type_by_cluster_status[cluster_status][
+                    cluster_type
+                ].extend(cluster_ids)
+
+        for cluster_type, protein_ids in list(
+            other.protein_ids_by_cluster_type.items()
+        ):
+            self.protein_ids_by_cluster_type[cluster_type].extend(protein_ids)
+
+        for cluster_type, protein_spans in list(
+            other.protein_span_by_cluster_type.items()
+        ):
+            self.protein_span_by_cluster_type[cluster_type].extend(protein_spans)
+
+        for cluster_type, cluster_ids_by_cluster_cardinality in list(
+            other.clusters_by_cluster_cardinality_by_cluster_type.items()
+        ):
+            for cluster_cardinality, cluster_ids in list(
+                cluster_ids_by_cluster_cardinality.items()
+            ):
+                self.clusters_by_cluster_cardinality_by_cluster_type[cluster_type][
+                    cluster_cardinality
+                ].extend(cluster_ids)
+
+        self.cluster_status_by_cluster_id.update(other.cluster_status_by_cluster_id)
+        self.cluster_type_by_cluster_id.update(other.cluster_type_by_cluster_id)
+        self.cluster_mwu_pvalue_by_cluster_id.update(
+            other.cluster_mwu_pvalue_by_cluster_id
+        )
+        self.cluster_mwu_log2_mean_by_cluster_id.update(
+            other.cluster_mwu_log2_mean_by_cluster_id
+        )
+        self.cluster_mean_ALO_count_by_cluster_id.update(
+            other.cluster_mean_ALO_count_by_cluster_id
+        )
+        self.cluster_mean_non_ALO_count_by_cluster_id.update(
+            other.cluster_mean_non_ALO_count_by_cluster_id
+        )
+        self.protein_length_stats_by_cluster_id.update(
+            other.protein_length_stats_by_cluster_id
+        )
+        self.protein_count_by_cluster_id.update(other.protein_count_by_cluster_id)
+
+        for cluster_status, cluster_counts in list(
+            other.released_cluster_count_by_cluster_type_by_cluster_status.items()
+        ):
+            for cluster_type, cluster_count in list(cluster_counts.items()):
+                self.released_cluster_count_by_cluster_type_by_cluster_status[
+                    cluster_status
+                ][cluster_type] += cluster_count
+        for cluster_type in self.released_protein_count_by_cluster_type:
+            self.released_protein_count_by_cluster_type[
+                cluster_type
+            ] += other.released_protein_count_by_cluster_type[cluster_type]
+            self.released_protein_span_by_cluster_type[
+                cluster_type
+            ] += other.released_protein_span_by_cluster_type[cluster_type]
+        for cluster_type, cluster_counts in list(
+            other.released_cluster_count_by_cluster_cardinality_by_cluster_type.items()
+        ):
+            for cluster_cardinality, cluster_count in list(cluster_counts.items()):
+                self.released_cluster_count_by_cluster_cardinality_by_cluster_type[
+                    cluster_type
+                ][cluster_cardinality] += cluster_count
+
     def get_protein_count_by_cluster_type(self, cluster_type: str) -> int:
         """
         Return the count of proteins for a specific cluster type.
@@ -152,11 +395,14 @@ class AttributeLevel:
         """
         if cluster_type == "total":
             return sum(
-                len(protein_ids)
-                for _, protein_ids in list(self.protein_ids_by_cluster_type.items())
+                len(protein_ids) + self.released_protein_count_by_cluster_type[_type]
+                for _type, protein_ids in list(self.protein_ids_by_cluster_type.items())
             )
         else:
-            return len(self.protein_ids_by_cluster_type[cluster_type])
+            return (
+                len(self.protein_ids_by_cluster_type[cluster_type])
+                + self.released_protein_count_by_cluster_type[cluster_type]
+            )
 
     def get_cluster_count_by_cluster_status_by_cluster_type(
         self,
@@ -178,20 +424,28 @@ class AttributeLevel:
             KeyError: If 'cluster_status' or 'cluster_type' is not found in
                 self.cluster_ids_by_cluster_type_by_cluster_status.
         """
+        released_cluster_count_by_cluster_type = (
+            self.released_cluster_count_by_cluster_type_by_cluster_status[
+                cluster_status
+            ]
+        )
         if cluster_type == "total":
             return sum(
-                len(cluster_ids)
-                for _, cluster_ids in list(
+                len(cluster_ids) + released_cluster_count_by_cluster_type[_type]
+                for _type, cluster_ids in list(
                     self.cluster_ids_by_cluster_type_by_cluster_status[
                         cluster_status
                     ].items()
                 )
             )
         else:
-            return len(
-                self.cluster_ids_by_cluster_type_by_cluster_status[cluster_status][
-                    cluster_type
-                ]
+            return (
+                len(
+                    self.cluster_ids_by_cluster_type_by_cluster_status[cluster_status][
+                        cluster_type
+                    ]
+                )
+                + released_cluster_count_by_cluster_type[cluster_type]
             )
 
     def get_protein_span_by_cluster_type(self, cluster_type: str) -> Union[int, float]:
@@ -209,11 +463,14 @@ class AttributeLevel:
         """
         return (
             sum(
-                sum(protein_ids)
-                for _, protein_ids in list(self.protein_span_by_cluster_type.items())
+                sum(protein_ids) + self.released_protein_span_by_cluster_type[_type]
+                for _type, protein_ids in list(
+                    self.protein_span_by_cluster_type.items()
+                )
             )
             if cluster_type == "total"
             else sum(self.protein_span_by_cluster_type[cluster_type])
+            + self.released_protein_span_by_cluster_type[cluster_type]
         )
 
     def get_cluster_count_by_cluster_cardinality_by_cluster_type(
@@ -234,10 +491,15 @@ class AttributeLevel:
         Raises:
             KeyError: If 'cluster_type' or 'cluster_cardinality' is not found.
         """
-        return len(
-            self.clusters_by_cluster_cardinality_by_cluster_type[cluster_type][
-                cluster_cardinality
-            ]
+        return (
+            len(
+                self.clusters_by_cluster_cardinality_by_cluster_type[cluster_type][
+                    cluster_cardinality
+                ]
+            )
+            + self.released_cluster_count_by_cluster_cardinality_by_cluster_type[
+                cluster_type
+            ][cluster_cardinality]
         )
 
     def get_proteomes(self) -> str:
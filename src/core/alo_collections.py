@@ -1,7 +1,6 @@
 import logging
 import os
-import random
-from typing import Any, Dict, List, Optional, Set
+from typing import Any, Dict, List, Optional, Set, Tuple
 
 import ete3
 import matplotlib as mat
@@ -10,7 +9,15 @@ import numpy as np
 from ete3 import Tree
 
 from core.alo import AttributeLevel
+from core.clusters import ClusterMatrix
 from core.config import ATTRIBUTE_RESERVED
+from core.logic import get_proteome_bitmask
+from core.rarefaction import (
+    compute_expected_rarefaction_curve,
+    compute_rarefaction_curves,
+    get_presence_matrix,
+)
+from core.tree import TreeIndex
 
 logger = logging.getLogger("kinfin_logger")
 
@@ -35,6 +42,12 @@ class AloCollection:
         tree_ete: Optional[Tree],
     ) -> None:
         self.proteomes = proteomes
+        # column/bit index of each proteome in cluster-by-proteome data
+        self.proteome_ids: List[str] = sorted(proteomes)
+        self.proteome_idx_by_proteome_id: Dict[str, int] = {
+            proteome_id: proteome_idx
+            for proteome_idx, proteome_id in enumerate(self.proteome_ids)
+        }
         self.attributes_verbose = attributes
         self.attributes = [
             # list of attributes
@@ -46,12 +59,42 @@ class AloCollection:
         self.level_by_attribute_by_proteome_id = level_by_attribute_by_proteome_id
         self.node_idx_by_proteome_ids = node_idx_by_proteome_ids
         self.tree_ete = tree_ete
+        if self.tree_ete:
+            for node in self.tree_ete.traverse("levelorder"):  # type: ignore
+                node.add_feature(
+                    "proteome_bitmask",
+                    get_proteome_bitmask(
+                        node.proteome_ids, self.proteome_idx_by_proteome_id
+                    ),
+                )
+        self.tree_index: Optional[TreeIndex] = (
+            TreeIndex(self.tree_ete, self.proteome_idx_by_proteome_id)
+            if self.tree_ete
+            else None
+        )
         self.proteome_ids_by_level_by_attribute = (
             self.compute_proteomes_by_level_by_attribute()
         )
         self.fastas_parsed: bool = False
         self.ALO_by_level_by_attribute = self.create_ALOs()
 
+    def get_proteome_ids(self, proteome_bitmask: int) -> List[str]:
+        """
+        Returns the IDs of the proteomes whose bits are set in a bitmask.
+
+        Args:
+            proteome_bitmask (int): Bitmask of proteomes.
+
+        Returns:
+            List[str]: Sorted proteome IDs.
+        """
+        proteome_ids: List[str] = []
+        while proteome_bitmask:
+            lowest_bit = proteome_bitmask & -proteome_bitmask
+            proteome_ids.append(self.proteome_ids[lowest_bit.bit_length() - 1])
+            proteome_bitmask ^= lowest_bit
+        return proteome_ids
+
     def compute_proteomes_by_level_by_attribute(
         self,
     ) -> Dict[str, Dict[str, Set[str]]]:
@@ -102,6 +145,7 @@ class AloCollection:
                     attribute=attribute,
                     level=level,
                     proteomes=proteome_ids,
+                    proteome_idx_by_proteome_id=self.proteome_idx_by_proteome_id,
                 )
                 if level not in ALO_by_level_by_attribute[attribute]:
                     ALO_by_level_by_attribute[attribute][level] = None
@@ -427,47 +471,12 @@ class AloCollection:
         else:
             self.plot_text_tree(dirs)
 
-    def compute_repetition_for_rarefaction_curve(
-        self,
-        ALO: AttributeLevel,
-        attribute: str,
-        level: str,
-        rarefaction_by_samplesize_by_level_by_attribute: Dict[
-            str, Dict[str, Dict[int, List[int]]]
-        ],
-    ):
-        seen_cluster_ids = set()
-        random_list_of_proteome_ids = list(ALO.proteomes)
-        random.shuffle(random_list_of_proteome_ids)
-        for idx, proteome_id in enumerate(random_list_of_proteome_ids):
-            key = "TAXON" if "TAXON" in self.ALO_by_level_by_attribute else "taxon"
-            if proteome_ALO := self.ALO_by_level_by_attribute[key][proteome_id]:
-                seen_cluster_ids.update(
-                    proteome_ALO.cluster_ids_by_cluster_type_by_cluster_status[
-                        "present"
-                    ]["specific"]
-                )
-                seen_cluster_ids.update(
-                    proteome_ALO.cluster_ids_by_cluster_type_by_cluster_status[
-                        "present"
-                    ]["shared"]
-                )
-                sample_size = idx + 1
-                if (
-                    sample_size
-                    not in rarefaction_by_samplesize_by_level_by_attribute[attribute][
-                        level
-                    ]
-                ):
-                    rarefaction_by_samplesize_by_level_by_attribute[attribute][level][
-                        sample_size
-                    ] = []
-                rarefaction_by_samplesize_by_level_by_attribute[attribute][level][
-                    sample_size
-                ].append(len(seen_cluster_ids))
-
     def compute_rarefaction_data(
-        self, repetitions: int
+        self,
+        repetitions: int,
+        cluster_matrix: ClusterMatrix,
+        seed: Optional[int] = None,
+        jobs: int = 1,
     ) -> Dict[str, Dict[str, Dict[int, List[int]]]]:
         """
         Compute rarefaction data and generate rarefaction curves for proteome clusters.
@@ -478,6 +487,9 @@ class AloCollection:
 
         Args:
         - repetitions: Number of repetitions to shuffle proteome lists for random sampling.
+        - cluster_matrix: Protein counts of clusters by proteome.
+        - seed: Seed of the random number generator, None for a random seed.
+        - jobs: Number of worker processes over which levels are spread.
 
         Returns:
         - Dict[str, Dict[str, Dict[int, List[int]]]]
@@ -487,9 +499,9 @@ class AloCollection:
         ] = {}
         logger.info("[STATUS] - Generating rarefaction data ...")
         try:
+            levels: List[Tuple[str, str]] = []
             for attribute in self.attributes:
-                if attribute not in rarefaction_by_samplesize_by_level_by_attribute:
-                    rarefaction_by_samplesize_by_level_by_attribute[attribute] = {}
+                rarefaction_by_samplesize_by_level_by_attribute[attribute] = {}
                 for level, proteome_ids in self.proteome_ids_by_level_by_attribute[
                     attribute
                 ].items():
@@ -501,26 +513,64 @@ class AloCollection:
                             f"[STATUS] - ... skipping {attribute} at level {level}"
                         )
                         continue
-                    if (
+                    rarefaction_by_samplesize_by_level_by_attribute[attribute][
                         level
-                        not in rarefaction_by_samplesize_by_level_by_attribute[
-                            attribute
-                        ]
-                    ):
-                        rarefaction_by_samplesize_by_level_by_attribute[attribute][
-                            level
-                        ] = {}
-                    ALO = self.ALO_by_level_by_attribute[attribute].get(level)
-                    if ALO is None:
+                    ] = {}
+                    if self.ALO_by_level_by_attribute[attribute].get(level) is None:
                         continue
-                    for _ in range(repetitions):
-                        self.compute_repetition_for_rarefaction_curve(
-                            ALO=ALO,
-                            attribute=attribute,
-                            level=level,
-                            rarefaction_by_samplesize_by_level_by_attribute=rarefaction_by_samplesize_by_level_by_attribute,
-                        )
+                    levels.append((attribute, level))
+
+            rarefaction_curves = compute_rarefaction_curves(
+                presence=get_presence_matrix(cluster_matrix),
+                proteome_idxs_by_level=[
+                    self.ALO_by_level_by_attribute[attribute][level].proteome_idxs  # type: ignore
+                    for attribute, level in levels
+                ],
+                repetitions=repetitions,
+                seed=seed,
+                jobs=jobs,
+            )
+            for (attribute, level), rarefaction_curve in zip(
+                levels, rarefaction_curves
+            ):
+                rarefaction_by_samplesize_by_level_by_attribute[attribute][
+                    level
+                ] = rarefaction_curve
         except Exception as e:
             logger.error(f"[ERROR] - {e}")
             return {}
         return rarefaction_by_samplesize_by_level_by_attribute
+
+    def compute_expected_rarefaction_data(
+        self, cluster_matrix: ClusterMatrix
+    ) -> Dict[str, Dict[str, Dict[int, float]]]:
+        """
+        Compute the expected rarefaction curves of non-singleton clusters.
+
+        Same levels as compute_rarefaction_data, but instead of sampling random
+        orders of proteomes, the expected cluster count of each sample size is
+        computed in closed form.
+
+        Args:
+        - cluster_matrix: Protein counts of clusters by proteome.
+
+        Returns:
+        - Dict[str, Dict[str, Dict[int, float]]]
+        """
+        expected_rarefaction_by_samplesize_by_level_by_attribute: Dict[
+            str, Dict[str, Dict[int, float]]
+        ] = {}
+        logger.info("[STATUS] - Computing expected rarefaction curves ...")
+        presence = get_presence_matrix(cluster_matrix)
+        for attribute in self.attributes:
+            expected_rarefaction_by_samplesize_by_level_by_attribute[attribute] = {}
+            for level, proteome_ids in self.proteome_ids_by_level_by_attribute[
+                attribute
+            ].items():
+                ALO = self.ALO_by_level_by_attribute[attribute].get(level)
+                if len(proteome_ids) == 1 or ALO is None:
+                    continue
+                expected_rarefaction_by_samplesize_by_level_by_attribute[attribute][
+                    level
+                ] = compute_expected_rarefaction_curve(presence, ALO.proteome_idxs)
+        return expected_rarefaction_by_samplesize_by_level_by_attribute
@@ -1,13 +1,28 @@
 import json
 import logging
 import os
-from collections import Counter, OrderedDict, defaultdict
-from typing import Dict, List, Optional, Set
+import sqlite3
+from collections import OrderedDict, defaultdict
+from typing import Callable, Dict, Generator, Iterable, List, Optional, Set, Tuple
+
+import numpy as np
+import scipy.sparse
 
 from core.alo_collections import AloCollection
-from core.clusters import Cluster, ClusterCollection
+from core.clusters import (
+    Cluster,
+    ClusterCollection,
+    ClusterMatrix,
+    ClusterProteins,
+    InferredSingletons,
+)
+from core.dataset_cache import DatasetCache
+from core.descriptions import DescriptionStore
+from core.domains import DomainCounts
 from core.logic import (
     add_taxid_attributes,
+    get_fasta_files,
+    get_proteome_bitmask,
     parse_attributes_from_config_data,
     parse_fasta_dir,
     parse_go_mapping,
@@ -15,42 +30,31 @@ from core.logic import (
     parse_pfam_mapping,
     parse_tree_from_file,
 )
-from core.proteins import Protein, ProteinCollection
-from core.utils import progress, yield_file_lines
+from core.proteins import DomainDescriptions, Protein, ProteinCollection
+from core.utils import yield_file_lines
 
 logger = logging.getLogger("kinfin_logger")
 
 
 def get_singletons(
     proteinCollection: ProteinCollection,
-    cluster_list: List[Cluster],
-) -> int:
+    proteome_count: int,
+) -> InferredSingletons:
     """
-    Identify and create singleton clusters for unclustered proteins in a protein collection.
+    Identify singleton clusters for unclustered proteins in a protein collection.
 
     Args:
     - proteinCollection (ProteinCollection): An instance of ProteinCollection class.
-    - cluster_list (List[Cluster]): A list to which new singleton Cluster objects will be appended.
+    - proteome_count (int): Number of proteomes.
 
     Returns:
-    - int: Number of singleton clusters created and appended to cluster_list.
+    - InferredSingletons: Singletons of the unclustered proteins.
 
-    This function iterates through proteins in the given protein collection that are not yet clustered.
-    For each unclustered protein, it creates a new singleton cluster and appends it to cluster_list.
+    Singletons are numbered in the order of the protein collection. No Cluster objects
+    are created, see InferredSingletons.
     """
     logger.info("[STATUS] - Inferring singletons ...")
-    singleton_idx = 0
-    for protein in proteinCollection.proteins_list:
-        if protein.clustered is False:
-            cluster_id = f"singleton_{singleton_idx}"
-            cluster = Cluster(
-                cluster_id,
-                [protein.protein_id],
-                proteinCollection,
-            )
-            cluster_list.append(cluster)
-            singleton_idx += 1
-    return singleton_idx
+    return InferredSingletons.from_protein_collection(proteinCollection, proteome_count)
 
 
 def parse_cluster_file(
@@ -58,6 +62,7 @@ def parse_cluster_file(
     cluster_f: str,
     proteinCollection: ProteinCollection,
     available_proteomes: Set[str],
+    datasetCache: Optional[DatasetCache] = None,
 ) -> List[Cluster]:
     """
     Parses a cluster file to create Cluster objects and updates protein information.
@@ -68,13 +73,157 @@ def parse_cluster_file(
         cluster_f (str): Path to the cluster file.
         proteinCollection (ProteinCollection): Collection of Protein objects.
         available_proteomes (Set[str]): Set of all available proteomes.
+        datasetCache (Optional[DatasetCache]): Cache of parsed input files.
 
     Returns:
-        Tuple[List[Cluster], Dict[str, any]]: List of Cluster objects and stats.
+        List[Cluster]: List of Cluster objects.
 
     Raises:
         FileNotFoundError: If the cluster file `cluster_f` does not exist.
     """
+    return [
+        cluster
+        for cluster_list in iter_cluster_file(
+            output_dir,
+            get_cluster_rows(cluster_f, datasetCache),
+            proteinCollection,
+            available_proteomes,
+        )
+        for cluster in cluster_list
+    ]
+
+
+def yield_cluster_rows(cluster_f: str) -> Generator[Tuple[str, List[str]], None, None]:
+    """
+    Parses the lines of a cluster file.
+
+    Args:
+        cluster_f (str): Path to the cluster file.
+
+    Yields:
+        Tuple[str, List[str]]: Cluster ID and protein IDs of each cluster.
+
+    Raises:
+        FileNotFoundError: If the cluster file `cluster_f` does not exist.
+    """
+    with open(cluster_f) as fh:
+        for line in fh:
+            temp: List[str] = line.rstrip("\n").split(" ")
+            cluster_id, protein_ids = temp[0].replace(":", ""), temp[1:]
+            yield cluster_id, [protein_id for protein_id in protein_ids if protein_id]
+
+
+def get_cluster_rows(
+    cluster_f: str, datasetCache: Optional[DatasetCache]
+) -> Iterable[Tuple[str, List[str]]]:
+    """
+    Returns the clusters of a cluster file, from the dataset cache if possible.
+
+    Cached clusters are stored as the cluster IDs, the protein IDs of all clusters
+    and the offsets of each cluster in them. These are memory-mapped, so that
+    iterating over them does not load the whole file.
+
+    Args:
+        cluster_f (str): Path to the cluster file.
+        datasetCache (Optional[DatasetCache]): Cache of parsed input files.
+
+    Returns:
+        Iterable[Tuple[str, List[str]]]: Cluster ID and protein IDs of each cluster.
+    """
+    if datasetCache is None:
+        return yield_cluster_rows(cluster_f)
+    return yield_cached_cluster_rows(
+        get_cached_columns(
+            datasetCache,
+            "clusters",
+            [cluster_f],
+            lambda: parse_cluster_columns(cluster_f),
+        )
+    )
+
+
+def parse_cluster_columns(cluster_f: str) -> Dict[str, np.ndarray]:
+    """
+    Parses a cluster file into columns of 'cluster_ids', 'protein_ids' of all
+    clusters and the 'protein_offsets' of each cluster in them.
+
+    Args:
+        cluster_f (str): Path to the cluster file.
+
+    Returns:
+        Dict[str, np.ndarray]: The columns.
+    """
+    cluster_ids: List[str] = []
+    protein_ids: List[str] = []
+    protein_offsets: List[int] = [0]
+    for cluster_id, cluster_protein_ids in yield_cluster_rows(cluster_f):
+        cluster_ids.append(cluster_id)
+        protein_ids.extend(cluster_protein_ids)
+        protein_offsets.append(len(protein_ids))
+    return {
+        "cluster_ids": np.array(cluster_ids, dtype=str),
+        "protein_ids": np.array(protein_ids, dtype=str),
+        "protein_offsets": np.array(protein_offsets, dtype=np.int64),
+    }
+
+
+def yield_cached_cluster_rows(
+    cluster_columns: Dict[str, np.ndarray], block_size: int = 8192
+) -> Generator[Tuple[str, List[str]], None, None]:
+    """
+    Yields the clusters of cached cluster columns (see get_cluster_rows).
+
+    Args:
+        cluster_columns (Dict[str, np.ndarray]): Cached cluster columns.
+        block_size (int): Number of clusters converted to strings at once.
+
+    Yields:
+        Tuple[str, List[str]]: Cluster ID and protein IDs of each cluster.
+    """
+    cluster_ids = cluster_columns["cluster_ids"]
+    protein_ids = cluster_columns["protein_ids"]
+    protein_offsets = cluster_columns["protein_offsets"]
+    for block_start in range(0, len(cluster_ids), block_size):
+        block_end = min(block_start + block_size, len(cluster_ids))
+        block_offsets = protein_offsets[block_start : block_end + 1].tolist()
+        block_protein_ids = protein_ids[block_offsets[0] : block_offsets[-1]].tolist()
+        for cluster_idx, cluster_id in enumerate(
+            cluster_ids[block_start:block_end].tolist()
+        ):
+            yield cluster_id, block_protein_ids[
+                block_offsets[cluster_idx]
+                - block_offsets[0] : block_offsets[cluster_idx + 1]
+                - block_offsets[0]
+            ]
+
+
+def iter_cluster_file(
+    output_dir: str,
+    cluster_rows: Iterable[Tuple[str, List[str]]],
+    proteinCollection: ProteinCollection,
+    available_proteomes: Set[str],
+    chunk_size: Optional[int] = None,
+) -> Generator[List[Cluster], None, None]:
+    """
+    Parses the clusters of a cluster file and yields its Cluster objects in chunks,
+    marking their proteins as clustered. The filtered clustering data and stats are
+    saved to files once the whole file has been read.
+
+    Args:
+        output_dir (str): Base directory path for saving files.
+        cluster_rows (Iterable[Tuple[str, List[str]]]): Cluster ID and protein IDs
+            of each cluster, see yield_cluster_rows.
+        proteinCollection (ProteinCollection): Collection of Protein objects.
+        available_proteomes (Set[str]): Set of all available proteomes.
+        chunk_size (Optional[int]): Number of clusters per chunk, None for a
+            single chunk of all clusters.
+
+    Yields:
+        List[Cluster]: Clusters of the next chunk, in file order.
+
+    Raises:
+        FileNotFoundError: If the cluster file does not exist.
+    """
     cluster_list: List[Cluster] = []
     stats = {
         "total_clusters": 0,
@@ -95,12 +244,9 @@ def parse_cluster_file(
 
     try:
 
-        with open(cluster_f) as fh, open(output_filtered_file, "w") as ofh:
-            for line in fh:
+        with open(output_filtered_file, "w") as ofh:
+            for cluster_id, protein_ids in cluster_rows:
                 stats["total_clusters"] += 1
-                temp: List[str] = line.rstrip("\n").split(" ")
-                cluster_id, protein_ids = temp[0].replace(":", ""), temp[1:]
-                protein_ids = [protein_id for protein_id in protein_ids if protein_id]
 
                 filtered_protein_ids = []
                 for protein_id in protein_ids:
@@ -128,6 +274,9 @@ def parse_cluster_file(
                     filtered_protein_ids.sort()
                     ofh.write(f"{cluster_id}: {', '.join(filtered_protein_ids)}\n")
                     stats["filtered_clusters"] += 1
+                    if len(cluster_list) == chunk_size:
+                        yield cluster_list
+                        cluster_list = []
     except Exception as e:
         logger.error("[ERROR] - Something has gone wrong in build.py")
         logger.error(f"[ERROR] - Error parsing cluster file: {e}")
@@ -165,59 +314,68 @@ def parse_cluster_file(
             indent=4,
         )
 
-    return cluster_list
+    if cluster_list or chunk_size is None:
+        yield cluster_list
 
 
 # cli
-def parse_domains_from_functional_annotations_file(
+def parse_functional_annotation_file(
     functional_annotation_f: str,
-    proteinCollection: ProteinCollection,
-) -> None:
+) -> Dict[str, np.ndarray]:
     """
-    Parse functional annotations from a file and populate ProteinCollection with parsed data.
+    Parse functional annotations from a file into columns of domain entries.
 
     Parameters:
     - functional_annotation_f (str): Path to the functional annotation file.
-    - proteinCollection (ProteinCollection): Instance of ProteinCollection class to store parsed data.
-    - pfam_mapping (bool): Flag indicating whether to parse Pfam mappings.
-    - ipr_mapping (bool): Flag indicating whether to parse InterPro mappings.
-    - pfam_mapping_f (str): File path to the Pfam mapping file.
-    - ipr_mapping_f (str): File path to the InterPro mapping file.
-    - go_mapping_f (str): File path to the GO mapping file.
+
+    Returns:
+    - Dict[str, np.ndarray]: Columns of the annotations:
+        - 'domain_sources': domain sources of the header
+        - 'protein_ids': protein ID of each annotated line
+        - 'entry_offsets': offsets of the domain entries of each line
+        - 'entry_sources': domain source of each entry, index into 'source_names'
+        - 'entry_domain_ids', 'entry_counts': domain ID and count of each entry
+        - 'source_names': domain sources of the entries
 
     Raises:
     - ValueError: If the functional annotation file lacks a header.
 
     Notes:
-    - The function reads each line of the functional annotation file, parses relevant data,
-      and populates the proteinCollection with domain annotations and GO terms.
-    - It also optionally parses additional mappings (Pfam, InterPro, GO) based on provided flags.
-    - Updates proteinCollection.functional_annotation_parsed and proteinCollection.domain_desc_by_id_by_source.
+    - GO terms have no count and are counted once. Entries are kept in the order of
+      the file, so that adding them to proteins (see add_functional_annotations)
+      keeps the last annotation of a protein or domain, as parsing the lines one by
+      one did.
     """
 
     logger.info(
         f"[STATUS] - Parsing {functional_annotation_f} ... this may take a while"
     )
 
+    domain_sources: List[str] = []
+    source_idx_by_source_name: Dict[str, int] = {}
+    protein_ids: List[str] = []
+    entry_offsets: List[int] = [0]
+    entry_sources: List[int] = []
+    entry_domain_ids: List[str] = []
+    entry_counts: List[int] = []
     for line in yield_file_lines(functional_annotation_f):
         temp: List[str] = line.split()
         if temp[0].startswith("#"):
-            proteinCollection.domain_sources = temp[1:]
+            domain_sources = temp[1:]
 
         else:
-            if not proteinCollection.domain_sources:
+            if not domain_sources:
                 error_msg = f"[ERROR] - {functional_annotation_f} does not seem to have a header."
                 raise ValueError(error_msg)
 
-            domain_protein_id: str = temp.pop(0)
-            go_terms: List[str] = []
-            domain_counter_by_domain_source: Dict[str, Counter[str]] = {}
+            protein_ids.append(temp.pop(0))
             for idx, field in enumerate(temp):
                 if field != "None":
-                    domain_source: str = proteinCollection.domain_sources[idx]
-                    domain_string: List[str] = field.split(";")
-                    domain_counts_by_domain_id: Dict[str, int] = {}
-                    for domain_id_count in domain_string:
+                    domain_source: str = domain_sources[idx]
+                    source_idx: int = source_idx_by_source_name.setdefault(
+                        domain_source, len(source_idx_by_source_name)
+                    )
+                    for domain_id_count in field.split(";"):
                         domain_id: str
                         domain_count: int = 1
                         if domain_source == "GO":
@@ -225,18 +383,151 @@ def parse_domains_from_functional_annotations_file(
                         else:
                             domain_id, domain_count_str = domain_id_count.rsplit(":", 2)
                             domain_count = int(domain_count_str)
-                        domain_counts_by_domain_id[domain_id] = domain_count
-                    domain_counter: Counter[str] = Counter(domain_counts_by_domain_id)
-                    domain_counter_by_domain_source[domain_source] = domain_counter
-            proteinCollection.add_annotation_to_protein(
-                domain_protein_id=domain_protein_id,
-                domain_counter_by_domain_source=domain_counter_by_domain_source,
-                go_terms=go_terms,
+                        entry_sources.append(source_idx)
+                        entry_domain_ids.append(domain_id)
+                        entry_counts.append(domain_count)
+            entry_offsets.append(len(entry_counts))
+
+    return {
+        "domain_sources": np.array(domain_sources, dtype=str),
+        "protein_ids": np.array(protein_ids, dtype=str),
+        "entry_offsets": np.array(entry_offsets, dtype=np.int64),
+        "entry_sources": np.array(entry_sources, dtype=np.int32),
+        "entry_domain_ids": np.array(entry_domain_ids, dtype=str),
+        "entry_counts": np.array(entry_counts, dtype=np.int64),
+        "source_names": np.array(list(source_idx_by_source_name), dtype=str),
+    }
+
+
+def add_functional_annotations(
+    annotation_columns: Dict[str, np.ndarray],
+    proteinCollection: ProteinCollection,
+) -> None:
+    """
+    Populate ProteinCollection with parsed functional annotations.
+
+    Parameters:
+    - annotation_columns (Dict[str, np.ndarray]): Columns of the annotations, see
+      parse_functional_annotation_file.
+    - proteinCollection (ProteinCollection): Instance of ProteinCollection class to store parsed data.
+
+    Notes:
+    - Annotations of proteins that are not in the collection are skipped.
+    - Domain IDs are interned into a vocabulary per domain source and the
+      annotations stored as sparse protein x domain count matrices (see
+      DomainCounts), instead of a Counter per protein and domain source.
+    - Updates proteinCollection.domain_sources and proteinCollection.functional_annotation_parsed.
+    """
+    proteinCollection.domain_sources = annotation_columns["domain_sources"].tolist()
+    proteins_by_protein_id = proteinCollection.proteins_by_protein_id
+    protein_count = proteinCollection.protein_count
+    line_protein_idxs = np.array(
+        [
+            (
+                proteins_by_protein_id[protein_id].protein_idx
+                if protein_id in proteins_by_protein_id
+                else -1
             )
+            for protein_id in annotation_columns["protein_ids"].tolist()
+        ],
+        dtype=np.int64,
+    )
+    line_idxs = np.arange(len(line_protein_idxs))
+    annotated = line_protein_idxs >= 0
+    # a protein annotated on several lines keeps the annotations of its last line
+    last_line_idxs = np.full(protein_count, -1, dtype=np.int64)
+    np.maximum.at(last_line_idxs, line_protein_idxs[annotated], line_idxs[annotated])
+    kept_lines = np.zeros(len(line_idxs), dtype=bool)
+    kept_lines[last_line_idxs[last_line_idxs >= 0]] = True
+
+    entry_line_idxs = np.repeat(line_idxs, np.diff(annotation_columns["entry_offsets"]))
+    entry_protein_idxs = line_protein_idxs[entry_line_idxs]
+    kept_entries = kept_lines[entry_line_idxs]
+    entry_sources = annotation_columns["entry_sources"]
+    for source_idx, domain_source in enumerate(
+        annotation_columns["source_names"].tolist()
+    ):
+        source_entry_idxs = np.flatnonzero(kept_entries & (entry_sources == source_idx))
+        domain_ids, columns = np.unique(
+            annotation_columns["entry_domain_ids"][source_entry_idxs],
+            return_inverse=True,
+        )
+        rows = entry_protein_idxs[source_entry_idxs]
+        # a domain listed twice for a protein keeps its last count
+        _, reversed_idxs = np.unique(
+            (rows * len(domain_ids) + columns)[::-1], return_index=True
+        )
+        last_idxs = len(rows) - 1 - reversed_idxs
+        proteinCollection.add_domain_counts(
+            domain_source,
+            DomainCounts(
+                domain_ids.tolist(),
+                scipy.sparse.csr_matrix(
+                    (
+                        annotation_columns["entry_counts"][
+                            source_entry_idxs[last_idxs]
+                        ],
+                        (rows[last_idxs], columns[last_idxs]),
+                    ),
+                    shape=(protein_count, len(domain_ids)),
+                ),
+            ),
+        )
 
     proteinCollection.functional_annotation_parsed = True
 
 
+def get_domain_descriptions(
+    mapping_f: str, parse_mapping: Callable[[str], Dict[str, str]]
+) -> DomainDescriptions:
+    """
+    Returns the descriptions of a domain mapping file, looked up on demand in its
+    compiled index (see DescriptionStore). If the index cannot be written, the
+    whole file is parsed instead.
+
+    Args:
+        mapping_f (str): Path to the mapping file.
+        parse_mapping (Callable[[str], Dict[str, str]]): Parser of the mapping file.
+
+    Returns:
+        DomainDescriptions: Descriptions by domain ID.
+    """
+    try:
+        return DescriptionStore(mapping_f, parse_mapping)
+    except (OSError, sqlite3.Error) as e:
+        logger.info(f"[STATUS] - Could not index {mapping_f} ({e}), parsing it instead")
+        return parse_mapping(mapping_f)
+
+
+def get_cached_columns(
+    datasetCache: Optional[DatasetCache],
+    kind: str,
+    input_fs: List[Optional[str]],
+    parse_columns: Callable[[], Dict[str, np.ndarray]],
+) -> Dict[str, np.ndarray]:
+    """
+    Returns the columns parsed from input files, from the dataset cache if possible.
+    Otherwise the files are parsed, and the columns are saved to the cache.
+
+    Args:
+        datasetCache (Optional[DatasetCache]): Cache of parsed input files, None to
+            always parse the files.
+        kind (str): Kind of data, names the cache entry.
+        input_fs (List[Optional[str]]): Paths of all files the columns depend on.
+        parse_columns (Callable[[], Dict[str, np.ndarray]]): Parses the files.
+
+    Returns:
+        Dict[str, np.ndarray]: The columns.
+    """
+    if datasetCache is None:
+        return parse_columns()
+    columns = datasetCache.load(kind, input_fs)
+    if columns is None:
+        columns = parse_columns()
+        datasetCache.save(kind, input_fs, columns)
+    return columns
+
+
 # common
 def build_AloCollection(
     config_f: str,
@@ -294,10 +585,22 @@ def build_AloCollection(
     )
 
 
-def get_protein_list_from_seq_f(sequence_ids_f: str, aloCollection: AloCollection):
+def parse_sequence_ids_file(sequence_ids_f: str) -> Dict[str, np.ndarray]:
+    """
+    Parses a sequence IDs file into columns of 'sequence_ids', 'protein_ids' and
+    'species_ids', with a row per line.
+
+    Args:
+        sequence_ids_f (str): Path to the sequence IDs file.
+
+    Returns:
+        Dict[str, np.ndarray]: The columns.
+    """
     logger.info(f"[STATUS] - Parsing sequence IDs: {sequence_ids_f} ...")
 
-    proteins_list: List[Protein] = []
+    sequence_ids: List[str] = []
+    protein_ids: List[str] = []
+    species_ids: List[str] = []
     for line in yield_file_lines(sequence_ids_f):
         temp = line.split(": ")
         sequence_id = temp[0]
@@ -309,11 +612,85 @@ def get_protein_list_from_seq_f(sequence_ids_f: str, aloCollection: AloCollectio
             .replace("(", "_")
             .replace(")", "_")
         )  # orthofinder replaces characters
-        species_id = sequence_id.split("_")[0]
-        if proteome_id := aloCollection.proteome_id_by_species_id.get(species_id, None):
-            protein = Protein(protein_id, proteome_id, species_id, sequence_id)
-            proteins_list.append(protein)
-    return proteins_list
+        sequence_ids.append(sequence_id)
+        protein_ids.append(protein_id)
+        species_ids.append(sequence_id.split("_")[0])
+    return {
+        "sequence_ids": np.array(sequence_ids, dtype=str),
+        "protein_ids": np.array(protein_ids, dtype=str),
+        "species_ids": np.array(species_ids, dtype=str),
+    }
+
+
+def parse_sequence_lengths(
+    protein_ids: np.ndarray, fasta_dir: str, species_ids_f: str, jobs: int = 1
+) -> Dict[str, np.ndarray]:
+    """
+    Parses the FASTA files of the species of a species IDs file into the column of
+    'lengths' of proteins (-1 for proteins without sequence).
+
+    Args:
+        protein_ids (np.ndarray): Protein IDs, as parsed by parse_sequence_ids_file.
+        fasta_dir (str): Directory of the FASTA files.
+        species_ids_f (str): Path to the species IDs file.
+        jobs (int): Number of processes scanning FASTA files.
+
+    Returns:
+        Dict[str, np.ndarray]: The column.
+    """
+    fasta_len_by_protein_id = parse_fasta_dir(
+        fasta_dir=fasta_dir,
+        species_ids_f=species_ids_f,
+        jobs=jobs,
+    )
+    return {
+        "lengths": np.array(
+            [
+                fasta_len_by_protein_id.get(protein_id, -1)
+                for protein_id in protein_ids.tolist()
+            ],
+            dtype=np.int64,
+        )
+    }
+
+
+def get_protein_list(
+    sequence_columns: Dict[str, np.ndarray], aloCollection: AloCollection
+) -> Tuple[List[Protein], np.ndarray]:
+    """
+    Creates the proteins of the proteomes of the AloCollection.
+
+    Args:
+        sequence_columns (Dict[str, np.ndarray]): Columns of the sequence IDs file,
+            as parsed by parse_sequence_ids_file.
+        aloCollection (AloCollection): Proteomes and their species IDs.
+
+    Returns:
+        Tuple[List[Protein], np.ndarray]: The proteins, and the row of each protein
+            in the columns.
+    """
+    proteome_id_by_species_id = aloCollection.proteome_id_by_species_id
+    protein_rows = np.flatnonzero(
+        np.isin(
+            sequence_columns["species_ids"],
+            [
+                species_id
+                for species_id, proteome_id in proteome_id_by_species_id.items()
+                if proteome_id
+            ],
+        )
+    )
+    proteins_list: List[Protein] = [
+        Protein(
+            protein_id, proteome_id_by_species_id[species_id], species_id, sequence_id
+        )
+        for sequence_id, protein_id, species_id in zip(
+            sequence_columns["sequence_ids"][protein_rows].tolist(),
+            sequence_columns["protein_ids"][protein_rows].tolist(),
+            sequence_columns["species_ids"][protein_rows].tolist(),
+        )
+    ]
+    return proteins_list, protein_rows
 
 
 # common
@@ -328,25 +705,37 @@ def build_ProteinCollection(
     pfam_mapping_f: str,
     go_mapping_f: str,
     ipr_mapping_f: str,
+    datasetCache: Optional[DatasetCache] = None,
+    jobs: int = 1,
 ) -> ProteinCollection:
-    proteins_list = get_protein_list_from_seq_f(
-        sequence_ids_f=sequence_ids_f,
-        aloCollection=aloCollection,
+    sequence_columns = get_cached_columns(
+        datasetCache,
+        "sequences",
+        [sequence_ids_f],
+        lambda: parse_sequence_ids_file(sequence_ids_f),
+    )
+    proteins_list, protein_rows = get_protein_list(sequence_columns, aloCollection)
+    proteinCollection = ProteinCollection(
+        proteins_list, aloCollection.proteome_idx_by_proteome_id
     )
-    proteinCollection = ProteinCollection(proteins_list)
 
     logger.info(f"[STATUS]\t - Proteins found = {proteinCollection.protein_count}")
 
     if fasta_dir is not None and species_ids_f is not None:
-        fasta_len_by_protein_id = parse_fasta_dir(
-            fasta_dir=fasta_dir,
-            species_ids_f=species_ids_f,
+        length_columns = get_cached_columns(
+            datasetCache,
+            "lengths",
+            [sequence_ids_f, species_ids_f, *get_fasta_files(species_ids_f, fasta_dir)],
+            lambda: parse_sequence_lengths(
+                sequence_columns["protein_ids"], fasta_dir, species_ids_f, jobs
+            ),
         )
         logger.info("[STATUS] - Adding FASTAs to ProteinCollection ...")
-        parse_steps: float = proteinCollection.protein_count / 100
-        for idx, protein in enumerate(proteinCollection.proteins_list):
-            protein.update_length(fasta_len_by_protein_id[protein.protein_id])
-            progress(idx + 1, parse_steps, proteinCollection.protein_count)
+        protein_lengths = length_columns["lengths"][protein_rows]
+        missing_idxs = np.flatnonzero(protein_lengths < 0)
+        if missing_idxs.size:
+            raise KeyError(proteins_list[missing_idxs[0]].protein_id)
+        proteinCollection.protein_table.lengths[:] = protein_lengths
         aloCollection.fastas_parsed = True
         proteinCollection.fastas_parsed = True
     else:
@@ -355,32 +744,86 @@ def build_ProteinCollection(
         )
 
     if functional_annotation_f is not None:
-        parse_domains_from_functional_annotations_file(
-            functional_annotation_f=functional_annotation_f,
-            proteinCollection=proteinCollection,
+        add_functional_annotations(
+            get_cached_columns(
+                datasetCache,
+                "annotations",
+                [functional_annotation_f],
+                lambda: parse_functional_annotation_file(functional_annotation_f),
+            ),
+            proteinCollection,
         )
-        domain_desc_by_id_by_source = {}
+        domain_desc_by_id_by_source: Dict[str, DomainDescriptions] = {}
 
         if pfam_mapping and "Pfam" in proteinCollection.domain_sources:
-            domain_desc_by_id_by_source["Pfam"] = parse_pfam_mapping(pfam_mapping_f)
+            domain_desc_by_id_by_source["Pfam"] = get_domain_descriptions(
+                pfam_mapping_f, parse_pfam_mapping
+            )
 
         if ipr_mapping and "IPR" in proteinCollection.domain_sources:
-            domain_desc_by_id_by_source["IPR"] = parse_ipr_mapping(ipr_mapping_f)
+            domain_desc_by_id_by_source["IPR"] = get_domain_descriptions(
+                ipr_mapping_f, parse_ipr_mapping
+            )
 
         if go_mapping_f:
-            domain_desc_by_id_by_source["GO"] = parse_go_mapping(go_mapping_f)
+            domain_desc_by_id_by_source["GO"] = get_domain_descriptions(
+                go_mapping_f, parse_go_mapping
+            )
 
         proteinCollection.domain_desc_by_id_by_source = domain_desc_by_id_by_source
 
     return proteinCollection
 
 
+def get_ClusterCollection(
+    cluster_list: List[Cluster],
+    inferred_singletons: Optional[InferredSingletons],
+    proteinCollection: ProteinCollection,
+    proteome_idx_by_proteome_id: Dict[str, int],
+) -> ClusterCollection:
+    """
+    Builds the cluster matrix and per-cluster protein data of parsed clusters.
+
+    Args:
+        cluster_list (List[Cluster]): Parsed clusters.
+        inferred_singletons (Optional[InferredSingletons]): Singletons of unclustered
+            proteins, if inferred.
+        proteinCollection (ProteinCollection): Proteins of the clusters.
+        proteome_idx_by_proteome_id (Dict[str, int]): Column index of each proteome.
+
+    Returns:
+        ClusterCollection: The collection of the clusters.
+    """
+    cluster_matrix = ClusterMatrix.from_clusters(
+        cluster_list, proteome_idx_by_proteome_id
+    )
+    for cluster in cluster_list:
+        cluster.proteome_bitmask = get_proteome_bitmask(
+            cluster.proteome_ids, proteome_idx_by_proteome_id
+        )
+
+    # per-cluster statistics are computed from it on first use
+    cluster_proteins = ClusterProteins.from_clusters(cluster_list, proteinCollection)
+
+    return ClusterCollection(
+        cluster_list,
+        inferred_singletons,
+        proteinCollection.functional_annotation_parsed,
+        proteinCollection.fastas_parsed,
+        proteinCollection.domain_sources,
+        cluster_matrix,
+        cluster_proteins,
+    )
+
+
 def build_ClusterCollection(
     output_dir: str,
     cluster_f: str,
     proteinCollection: ProteinCollection,
     infer_singletons: Optional[bool],
     available_proteomes: Set[str],
+    proteome_idx_by_proteome_id: Dict[str, int],
+    datasetCache: Optional[DatasetCache] = None,
 ) -> ClusterCollection:
     logger.info(f"[STATUS] - Parsing {cluster_f} ... this may take a while")
     cluster_list: List[Cluster] = parse_cluster_file(
@@ -388,16 +831,70 @@ def build_ClusterCollection(
         cluster_f,
         proteinCollection,
         available_proteomes,
+        datasetCache,
     )
 
-    inferred_singletons_count = 0
+    inferred_singletons: Optional[InferredSingletons] = None
     if infer_singletons:
-        inferred_singletons_count = get_singletons(proteinCollection, cluster_list)
+        inferred_singletons = get_singletons(
+            proteinCollection, len(proteome_idx_by_proteome_id)
+        )
 
-    return ClusterCollection(
+    logger.info("[STATUS] - Building cluster matrix and protein length statistics ...")
+    return get_ClusterCollection(
         cluster_list,
-        inferred_singletons_count,
-        proteinCollection.functional_annotation_parsed,
-        proteinCollection.fastas_parsed,
-        proteinCollection.domain_sources,
+        inferred_singletons,
+        proteinCollection,
+        proteome_idx_by_proteome_id,
     )
+
+
+def build_ClusterCollection_chunks(
+    output_dir: str,
+    cluster_f: str,
+    proteinCollection: ProteinCollection,
+    infer_singletons: Optional[bool],
+    available_proteomes: Set[str],
+    proteome_idx_by_proteome_id: Dict[str, int],
+    chunk_size: int,
+    datasetCache: Optional[DatasetCache] = None,
+) -> Generator[ClusterCollection, None, None]:
+    """
+    Streams the cluster file as a ClusterCollection for each chunk of clusters,
+    followed by one holding only the inferred singletons (if inferred).
+
+    Singletons can only be inferred once all clusters have been parsed, so the last
+    collection has no clusters of its own.
+
+    Args:
+        output_dir (str): Base directory path for saving files.
+        cluster_f (str): Path to the cluster file.
+        proteinCollection (ProteinCollection): Collection of Protein objects.
+        infer_singletons (Optional[bool]): Whether to infer singletons.
+        available_proteomes (Set[str]): Set of all available proteomes.
+        proteome_idx_by_proteome_id (Dict[str, int]): Column index of each proteome.
+        chunk_size (int): Number of clusters per chunk.
+        datasetCache (Optional[DatasetCache]): Cache of parsed input files.
+
+    Yields:
+        ClusterCollection: The collection of the next chunk.
+    """
+    logger.info(f"[STATUS] - Streaming {cluster_f} in chunks of {chunk_size} clusters")
+    for cluster_list in iter_cluster_file(
+        output_dir,
+        get_cluster_rows(cluster_f, datasetCache),
+        proteinCollection,
+        available_proteomes,
+        chunk_size,
+    ):
+        yield get_ClusterCollection(
+            cluster_list, None, proteinCollection, proteome_idx_by_proteome_id
+        )
+
+    if infer_singletons:
+        yield get_ClusterCollection(
+            [],
+            get_singletons(proteinCollection, len(proteome_idx_by_proteome_id)),
+            proteinCollection,
+            proteome_idx_by_proteome_id,
+        )
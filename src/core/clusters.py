@@ -1,13 +1,34 @@
 from collections import Counter
-from math import log
-from typing import DefaultDict, Dict, FrozenSet, List, Literal, Optional, Set
+from typing import Dict, FrozenSet, List, Literal, Optional, Set, Tuple
 
+import numpy as np
+import scipy.sparse
+
+from core.domains import DomainCounts
+from core.lengths import LengthStats
 from core.logic import compute_protein_ids_by_proteome
-from core.proteins import ProteinCollection
-from core.utils import mean, median, sd
+from core.proteins import Protein, ProteinCollection, ProteinTable
 
 
 class Cluster:
+    __slots__ = (
+        "cluster_id",
+        "cluster_idx",
+        "protein_count",
+        "proteome_count",
+        "proteome_bitmask",
+        "singleton",
+        "apomorphy",
+        "protein_ids_by_proteome_id",
+        "protein_counts_of_proteomes_by_level_by_attribute",
+        "proteome_coverage_by_level_by_attribute",
+        "implicit_protein_ids_by_proteome_id_by_level_by_attribute",
+        "cluster_type_by_attribute",
+        "protein_median",
+        "cluster_proteins",
+        "cluster_proteins_idx",
+    )
+
     def __init__(
         self,
         cluster_id: str,
@@ -15,12 +36,13 @@ class Cluster:
         proteinCollection: ProteinCollection,
     ) -> None:
         self.cluster_id: str = cluster_id
-        self.protein_ids = set(protein_ids)
+        self.cluster_idx: Optional[int] = (
+            None  # row in ClusterCollection.cluster_matrix
+        )
         self.protein_count: int = len(protein_ids)
         try:
-
-            self.proteomes_by_protein_id: Dict[str, str] = {
-                _id: proteinCollection.proteins_by_protein_id[_id].proteome_id
+            protein_by_protein_id: Dict[str, Protein] = {
+                _id: proteinCollection.proteins_by_protein_id[_id]
                 for _id in protein_ids
             }
         except KeyError as e:
@@ -30,166 +52,585 @@ class Cluster:
             )
             raise KeyError(error_msg) from e
 
-        self.proteome_ids_list: List[str] = list(self.proteomes_by_protein_id.values())
-        self.protein_count_by_proteome_id: Counter[str] = Counter(
-            self.proteome_ids_list
-        )
-        self.proteome_ids: FrozenSet[str] = frozenset(self.proteome_ids_list)
-        self.proteome_count: int = len(self.proteome_ids)
+        # protein IDs of the ProteinCollection, so that strings are shared
+        self.protein_ids_by_proteome_id: Dict[str, Tuple[str, ...]] = {
+            proteome_id: tuple(protein_ids)
+            for proteome_id, protein_ids in compute_protein_ids_by_proteome(
+                {
+                    protein.protein_id: protein.proteome_id
+                    for protein in protein_by_protein_id.values()
+                }
+            ).items()
+        }
+        self.proteome_count: int = len(self.protein_ids_by_proteome_id)
+        # bits of proteome_ids, see AloCollection.proteome_idx_by_proteome_id
+        self.proteome_bitmask: int = 0
         self.singleton: bool = self.protein_count <= 1
         self.apomorphy: bool = self.proteome_count <= 1
-
-        self.protein_ids_by_proteome_id: DefaultDict[str, Set[str]] = (
-            compute_protein_ids_by_proteome(self.proteomes_by_protein_id)
-        )
         self.protein_counts_of_proteomes_by_level_by_attribute: Dict[
             str, Dict[str, List[int]]
         ] = {}
         self.proteome_coverage_by_level_by_attribute: Dict[str, Dict[str, float]] = {}
         self.implicit_protein_ids_by_proteome_id_by_level_by_attribute: Dict[
-            str, Dict[str, Dict[str, List[str]]]
+            str, Dict[str, Dict[str, Tuple[str, ...]]]
         ] = {}
         self.cluster_type_by_attribute: Dict[
             str,
             Literal["singleton", "shared", "specific"],
         ] = {}
         self.protein_median: Optional[float] = None
-        self.protein_length_stats: Optional[Dict[str, float]] = (
-            self.compute_protein_length_stats(proteinCollection, self.protein_ids)
+        # proteins of the cluster and its row there, set by ClusterCollection (or
+        # InferredSingletons): protein length, secreted and domain statistics are
+        # computed from them on first use, for all clusters at once
+        self.cluster_proteins: Optional[ClusterProteins] = None
+        self.cluster_proteins_idx: int = -1
+
+    @property
+    def protein_ids(self) -> Set[str]:
+        """
+        Returns the protein IDs of the cluster.
+        """
+        return set().union(*self.protein_ids_by_proteome_id.values())
+
+    @property
+    def proteome_ids(self) -> FrozenSet[str]:
+        """
+        Returns the IDs of the proteomes present in the cluster.
+        """
+        return frozenset(self.protein_ids_by_proteome_id)
+
+    @property
+    def protein_count_by_proteome_id(self) -> Counter[str]:
+        """
+        Returns the number of proteins of the cluster by proteome ID.
+        """
+        return Counter(
+            {
+                proteome_id: len(protein_ids)
+                for proteome_id, protein_ids in self.protein_ids_by_proteome_id.items()
+            }
+        )
+
+    @property
+    def protein_length_stats(self) -> Optional[Dict[str, float]]:
+        """
+        Returns 'mean', 'median' and 'sd' of the protein lengths of the cluster, None
+        without FASTAs or if a protein has an unknown (or zero) length.
+        """
+        if self.cluster_proteins is None:
+            return None
+        return self.cluster_proteins.get_protein_length_stats(self.cluster_proteins_idx)
+
+    @property
+    def secreted_cluster_coverage(self) -> float:
+        """
+        Returns the fraction of secreted proteins of the cluster.
+        """
+        if self.cluster_proteins is None:
+            return 0.0
+        return self.cluster_proteins.get_secreted_fraction(self.cluster_proteins_idx)
+
+    @property
+    def domain_counter_by_domain_source(self) -> Dict[str, Counter[str]]:
+        """
+        Returns the domain counts of the cluster by domain source, for the domain
+        sources present in the cluster.
+        """
+        if self.cluster_proteins is None:
+            return {}
+        return self.cluster_proteins.get_domain_counter_by_domain_source(
+            self.cluster_proteins_idx
         )
-        self.secreted_cluster_coverage: float = self.compute_secreted_cluster_coverage(
-            proteinCollection, self.protein_ids, self.protein_count
+
+    @property
+    def domain_entropy_by_domain_source(self) -> Dict[str, float]:
+        """
+        Returns the entropy of the domain counts of the cluster by domain source, for
+        the domain sources present in the cluster.
+        """
+        if self.cluster_proteins is None:
+            return {}
+        return self.cluster_proteins.get_domain_entropy_by_domain_source(
+            self.cluster_proteins_idx
         )
-        self.domain_counter_by_domain_source: Dict[str, Counter[str]] = (
-            self.compute_domain_counter_by_domain_source(
-                proteinCollection, self.protein_ids
+
+
+class ClusterMatrix:
+    """
+    Protein counts of clusters (rows) by proteomes (columns) in CSR layout.
+
+    Row i holds the counts of cluster_list[i] of the ClusterCollection, columns
+    are proteome indices as assigned by AloCollection.proteome_idx_by_proteome_id.
+    Within a row, column indices are sorted.
+    """
+
+    def __init__(
+        self,
+        indptr: np.ndarray,
+        indices: np.ndarray,
+        data: np.ndarray,
+        proteome_count: int,
+    ) -> None:
+        self.indptr: np.ndarray = indptr
+        self.indices: np.ndarray = indices
+        self.data: np.ndarray = data
+        self.cluster_count: int = len(indptr) - 1
+        self.proteome_count: int = proteome_count
+
+    @classmethod
+    def from_clusters(
+        cls,
+        cluster_list: List[Cluster],
+        proteome_idx_by_proteome_id: Dict[str, int],
+    ) -> "ClusterMatrix":
+        """
+        Builds the matrix from the protein counts by proteome of each cluster.
+
+        Args:
+            cluster_list (List[Cluster]): Clusters, one row each (in order).
+            proteome_idx_by_proteome_id (Dict[str, int]): Column index of each proteome.
+
+        Returns:
+            ClusterMatrix: The cluster-by-proteome count matrix.
+        """
+        indptr: List[int] = [0]
+        indices: List[int] = []
+        data: List[int] = []
+        for cluster in cluster_list:
+            row = sorted(
+                (proteome_idx_by_proteome_id[proteome_id], count)
+                for proteome_id, count in cluster.protein_count_by_proteome_id.items()
             )
+            indices.extend(proteome_idx for proteome_idx, _ in row)
+            data.extend(count for _, count in row)
+            indptr.append(len(indices))
+        return cls(
+            indptr=np.array(indptr, dtype=np.int64),
+            indices=np.array(indices, dtype=np.int32),
+            data=np.array(data, dtype=np.int32),
+            proteome_count=len(proteome_idx_by_proteome_id),
+        )
+
+    @classmethod
+    def vstack(
+        cls, cluster_matrices: List["ClusterMatrix"], proteome_count: int
+    ) -> "ClusterMatrix":
+        """
+        Stacks the rows of several matrices, e.g. of chunks of clusters.
+
+        Args:
+            cluster_matrices (List[ClusterMatrix]): Matrices, in row order.
+            proteome_count (int): Number of proteomes (columns).
+
+        Returns:
+            ClusterMatrix: The matrix of all rows.
+        """
+        indptrs: List[np.ndarray] = [np.zeros(1, dtype=np.int64)]
+        offset = 0
+        for cluster_matrix in cluster_matrices:
+            indptrs.append(cluster_matrix.indptr[1:] + offset)
+            offset += len(cluster_matrix.indices)
+        return cls(
+            indptr=np.concatenate(indptrs),
+            indices=np.concatenate(
+                [np.zeros(0, dtype=np.int32)]
+                + [cluster_matrix.indices for cluster_matrix in cluster_matrices]
+            ),
+            data=np.concatenate(
+                [np.zeros(0, dtype=np.int32)]
+                + [cluster_matrix.data for cluster_matrix in cluster_matrices]
+            ),
+            proteome_count=proteome_count,
         )
-        self.domain_entropy_by_domain_source: Dict[str, float] = (
-            self.compute_domain_entropy_by_domain_source()
+
+    @property
+    def shape(self) -> Tuple[int, int]:
+        return self.cluster_count, self.proteome_count
+
+    def get_row(self, cluster_idx: int) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Returns the proteome indices and protein counts of a cluster.
+
+        Args:
+            cluster_idx (int): Row of the cluster.
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray]: Proteome indices and their protein counts.
+        """
+        start, end = self.indptr[cluster_idx], self.indptr[cluster_idx + 1]
+        return self.indices[start:end], self.data[start:end]
+
+    def get_dense_row(self, cluster_idx: int) -> np.ndarray:
+        """
+        Returns the protein counts of a cluster for every proteome index.
+
+        Args:
+            cluster_idx (int): Row of the cluster.
+
+        Returns:
+            np.ndarray: Protein counts of length proteome_count (0 if absent).
+        """
+        dense_row = np.zeros(self.proteome_count, dtype=np.int32)
+        proteome_idxs, counts = self.get_row(cluster_idx)
+        dense_row[proteome_idxs] = counts
+        return dense_row
+
+    def tocsr(self) -> scipy.sparse.csr_matrix:
+        """
+        Returns the matrix as a scipy.sparse.csr_matrix (sharing the arrays).
+        """
+        return scipy.sparse.csr_matrix(
+            (self.data, self.indices, self.indptr), shape=self.shape
         )
 
-    def compute_protein_length_stats(
+
+class ClusterProteins:
+    """
+    Integer IDs of the proteins of all clusters as flat arrays, with the cluster
+    (row of the cluster matrix) of each protein. Per-protein values are read from
+    the ProteinTable of the ProteinCollection.
+
+    Per-cluster statistics (protein lengths, secreted fraction, domain counts and
+    entropies) are computed for all clusters on first use and kept. Statistics of
+    inputs that were not given (FASTAs, SignalP or other annotations) are never
+    computed.
+    """
+
+    def __init__(
         self,
+        cluster_idxs: np.ndarray,
+        protein_idxs: np.ndarray,
+        protein_table: ProteinTable,
+        cluster_count: int,
+        fastas_parsed: bool = False,
+    ) -> None:
+        self.cluster_idxs: np.ndarray = cluster_idxs
+        self.protein_idxs: np.ndarray = protein_idxs
+        self.protein_table: ProteinTable = protein_table
+        self.cluster_count: int = cluster_count
+        self.fastas_parsed: bool = fastas_parsed
+        # computed on first use
+        self.cluster_length_stats: Optional[LengthStats] = None
+        self.secreted_fractions: Optional[np.ndarray] = None
+        self.domain_counts_by_domain_source: Optional[Dict[str, DomainCounts]] = None
+        self.domain_entropies_by_domain_source: Dict[str, np.ndarray] = {}
+
+    @classmethod
+    def from_clusters(
+        cls,
+        cluster_list: List[Cluster],
         proteinCollection: ProteinCollection,
-        protein_ids: Set[str],
-    ) -> Optional[Dict[str, float]]:
+    ) -> "ClusterProteins":
+        """
+        Looks up the integer IDs of the proteins of each cluster.
+
+        Args:
+            cluster_list (List[Cluster]): Clusters, in the order of the cluster matrix.
+            proteinCollection (ProteinCollection): Proteins of the clusters.
+
+        Returns:
+            ClusterProteins: Proteins of all clusters.
+        """
+        cluster_idxs: List[int] = []
+        protein_idxs: List[int] = []
+        for cluster_idx, cluster in enumerate(cluster_list):
+            for protein_ids in cluster.protein_ids_by_proteome_id.values():
+                cluster_idxs.extend([cluster_idx] * len(protein_ids))
+                protein_idxs.extend(
+                    proteinCollection.proteins_by_protein_id[protein_id].protein_idx
+                    for protein_id in protein_ids
+                )
+        return cls(
+            cluster_idxs=np.array(cluster_idxs, dtype=np.int32),
+            protein_idxs=np.array(protein_idxs, dtype=np.int32),
+            protein_table=proteinCollection.protein_table,
+            cluster_count=len(cluster_list),
+            fastas_parsed=proteinCollection.fastas_parsed,
+        )
+
+    def get_secreted_fractions(self) -> np.ndarray:
+        """
+        Returns the fraction of secreted proteins of each cluster.
+        """
+        if self.secreted_fractions is None:
+            self.secreted_fractions = np.bincount(
+                self.cluster_idxs,
+                weights=self.protein_table.secreted[self.protein_idxs],
+                minlength=self.cluster_count,
+            ) / np.maximum(
+                np.bincount(self.cluster_idxs, minlength=self.cluster_count), 1
+            )
+        return self.secreted_fractions
+
+    def get_domain_counts_by_domain_source(self) -> Dict[str, DomainCounts]:
+        """
+        Returns the domain counts of each cluster by domain source, summed over its
+        proteins.
+        """
+        if self.domain_counts_by_domain_source is None:
+            self.domain_counts_by_domain_source = {
+                domain_source: domain_counts.sum_rows(
+                    self.cluster_idxs, self.protein_idxs, self.cluster_count
+                )
+                for domain_source, domain_counts in self.protein_table.domain_counts_by_domain_source.items()
+            }
+        return self.domain_counts_by_domain_source
+
+    def get_cluster_length_stats(self) -> LengthStats:
         """
-        Computes statistics (mean, median, standard deviation) of protein lengths.
+        Returns the length statistics of the proteins of each cluster.
+        """
+        if self.cluster_length_stats is None:
+            self.cluster_length_stats = LengthStats(
+                self.protein_table.lengths[self.protein_idxs],
+                self.cluster_idxs,
+                self.cluster_count,
+            )
+        return self.cluster_length_stats
+
+    def get_protein_length_stats(self, cluster_idx: int) -> Optional[Dict[str, float]]:
+        """
+        Returns 'mean', 'median' and 'sd' of the protein lengths of a cluster.
+
+        Args:
+            cluster_idx (int): Row of the cluster.
+
+        Returns:
+            Optional[Dict[str, float]]: The statistics, None without FASTAs or if a
+                protein of the cluster has an unknown (or zero) length.
+        """
+        if not self.fastas_parsed:
+            return None
+        cluster_length_stats = self.get_cluster_length_stats()
+        if cluster_length_stats.minima[cluster_idx] <= 0:
+            return None
+        length_stats = cluster_length_stats.get(cluster_idx)
+        del length_stats["sum"]
+        return length_stats
+
+    def get_secreted_fraction(self, cluster_idx: int) -> float:
+        """
+        Returns the fraction of secreted proteins of a cluster.
 
-        Parameters:
-        - proteinCollection: A ProteinCollection object containing protein data.
-        - protein_ids: A set of protein IDs for which lengths are to be computed.
+        Args:
+            cluster_idx (int): Row of the cluster.
 
         Returns:
-        - Optional[Dict[str, float]]: A dictionary containing 'mean', 'median', and 'sd'
-          (standard deviation) of protein lengths, if all lengths are available and at least
-          one protein ID is provided. Returns None if no valid protein lengths are found.
-        """
-        protein_lengths: List[Optional[int]] = [
-            proteinCollection.proteins_by_protein_id[protein_id].length
-            for protein_id in protein_ids
-        ]
-        if all(protein_lengths):
-            protein_length_stats: Dict[str, float] = {"mean": mean(protein_lengths)}
-            protein_length_stats["median"] = median(protein_lengths)
-            protein_length_stats["sd"] = sd(protein_lengths)
-            return protein_length_stats
-
-    def compute_secreted_cluster_coverage(
+            float: The fraction, 0.0 without SignalP_EUK annotations.
+        """
+        if "SignalP_EUK" not in self.protein_table.domain_counts_by_domain_source:
+            return 0.0
+        return float(self.get_secreted_fractions()[cluster_idx])
+
+    def get_domain_counter_by_domain_source(
+        self, cluster_idx: int
+    ) -> Dict[str, Counter[str]]:
+        """
+        Returns the domain counts of a cluster by domain source.
+
+        Args:
+            cluster_idx (int): Row of the cluster.
+
+        Returns:
+            Dict[str, Counter[str]]: Counts by domain ID, for the domain sources
+                present in the cluster.
+        """
+        return {
+            domain_source: domain_counts.get_counter(cluster_idx)
+            for domain_source, domain_counts in self.get_domain_counts_by_domain_source().items()
+            if domain_counts.has_domains(cluster_idx)
+        }
+
+    def get_domain_entropy_by_domain_source(self, cluster_idx: int) -> Dict[str, float]:
+        """
+        Returns the entropy of the domain counts of a cluster by domain source.
+
+        Args:
+            cluster_idx (int): Row of the cluster.
+
+        Returns:
+            Dict[str, float]: Entropies, for the domain sources present in the
+                cluster.
+        """
+        domain_entropy_by_domain_source: Dict[str, float] = {}
+        for (
+            domain_source,
+            domain_counts,
+        ) in self.get_domain_counts_by_domain_source().items():
+            if domain_counts.has_domains(cluster_idx):
+                if domain_source not in self.domain_entropies_by_domain_source:
+                    self.domain_entropies_by_domain_source[domain_source] = (
+                        domain_counts.get_entropies()
+                    )
+                domain_entropy_by_domain_source[domain_source] = float(
+                    self.domain_entropies_by_domain_source[domain_source][cluster_idx]
+                )
+        return domain_entropy_by_domain_source
+
+    def get_level_length_stats(
         self,
-        proteinCollection: ProteinCollection,
-        protein_ids: Set[str],
-        protein_count: int,
-    ) -> float:
+        level_idx_by_proteome_idx: np.ndarray,
+        level_count: int,
+        entry_idxs: np.ndarray,
+    ) -> LengthStats:
         """
-        Computes the fraction of secreted proteins in a given set of protein IDs.
+        Returns the length statistics of the proteins of each cluster and level of
+        an attribute, skipping proteins of unknown length.
 
-        Parameters:
-        - proteinCollection: A ProteinCollection object containing protein data.
-        - protein_ids: A set of protein IDs to compute secreted protein coverage.
-        - protein_count: Total count of proteins in the cluster.
+        Args:
+            level_idx_by_proteome_idx (np.ndarray): Level of each proteome.
+            level_count (int): Number of levels of the attribute.
+            entry_idxs (np.ndarray): Sorted keys (cluster_idx * level count + level_idx)
+                of the clusters and levels to compute, one segment each.
 
         Returns:
-        - float: Fraction of secreted proteins in the provided set of protein IDs.
+            LengthStats: Length statistics in the order of entry_idxs.
         """
-        secreted = sum(
-            bool(proteinCollection.proteins_by_protein_id[protein_id].secreted)
-            for protein_id in protein_ids
+        lengths = self.protein_table.lengths[self.protein_idxs]
+        known = lengths >= 0
+        keys = self.cluster_idxs[known].astype(np.int64) * level_count + (
+            level_idx_by_proteome_idx[
+                self.protein_table.proteome_idxs[self.protein_idxs[known]]
+            ]
+        )
+        return LengthStats(
+            lengths[known], np.searchsorted(entry_idxs, keys), len(entry_idxs)
         )
-        return secreted / protein_count
 
-    def compute_domain_counter_by_domain_source(
+
+class InferredSingletons:
+    """
+    Unclustered proteins, each counted as a singleton cluster 'singleton_<i>'.
+
+    Inferred singletons are kept as integer IDs of their proteins instead of
+    Cluster objects: their contribution to ALOs and tree nodes only depends on
+    their proteome, so it is added in aggregate from the per-proteome counts and
+    spans. Clusters are only built on demand, when output rows are written.
+    """
+
+    def __init__(
         self,
+        protein_idxs: np.ndarray,
         proteinCollection: ProteinCollection,
-        protein_ids: Set[str],
-    ) -> Dict[str, Counter[str]]:
+        proteome_count: int,
+    ) -> None:
+        """
+        Args:
+            protein_idxs (np.ndarray): Integer IDs of the unclustered proteins, in
+                the order of their singleton IDs.
+            proteinCollection (ProteinCollection): Proteins of the singletons.
+            proteome_count (int): Number of proteomes.
         """
-        Computes the aggregated domain counts by domain source for a set of protein IDs.
+        self.protein_idxs: np.ndarray = protein_idxs
+        self.proteinCollection: ProteinCollection = proteinCollection
+        protein_table = proteinCollection.protein_table
+        self.proteome_idxs: np.ndarray = protein_table.proteome_idxs[protein_idxs]
+        # number of singletons by proteome (column of the cluster matrix)
+        self.counts: np.ndarray = np.bincount(
+            self.proteome_idxs, minlength=proteome_count
+        )
+        # sum of known protein lengths of the singletons by proteome
+        self.spans: np.ndarray = np.bincount(
+            self.proteome_idxs,
+            weights=np.maximum(protein_table.lengths[protein_idxs], 0),
+            minlength=proteome_count,
+        ).astype(np.int64)
+        # each singleton as a cluster of one protein, for per-cluster statistics
+        self.cluster_proteins: ClusterProteins = ClusterProteins(
+            cluster_idxs=np.arange(len(protein_idxs), dtype=np.int32),
+            protein_idxs=protein_idxs,
+            protein_table=protein_table,
+            cluster_count=len(protein_idxs),
+            fastas_parsed=proteinCollection.fastas_parsed,
+        )
 
-        Parameters:
-        - proteinCollection: A ProteinCollection object containing protein data.
-        - protein_ids: A set of protein IDs for which domain counts are computed.
+    @classmethod
+    def from_protein_collection(
+        cls, proteinCollection: ProteinCollection, proteome_count: int
+    ) -> "InferredSingletons":
+        """
+        Collects the proteins that are not part of any cluster.
+
+        Args:
+            proteinCollection (ProteinCollection): Proteins of the clustering.
+            proteome_count (int): Number of proteomes.
 
         Returns:
-        - Dict[str, Counter[str]]: A dictionary where keys are domain sources and values are
-          Counters mapping domain IDs to their respective counts.
-        """
-        cluster_domain_counter_by_domain_source: Dict[str, Counter[str]] = {}
-        for protein_id in protein_ids:
-            if protein_domain_counter_by_domain_source := proteinCollection.proteins_by_protein_id[
-                protein_id
-            ].domain_counter_by_domain_source:
-                for domain_source, protein_domain_counter in list(
-                    protein_domain_counter_by_domain_source.items()
-                ):
-                    if domain_source not in cluster_domain_counter_by_domain_source:
-                        cluster_domain_counter_by_domain_source[domain_source] = (
-                            Counter()
-                        )
-                    cluster_domain_counter_by_domain_source[
-                        domain_source
-                    ] += protein_domain_counter
-        return cluster_domain_counter_by_domain_source
-
-    def compute_domain_entropy_by_domain_source(self) -> Dict[str, float]:
-        """
-        Computes entropy for domains grouped by different sources.
+            InferredSingletons: Singletons of all unclustered proteins.
+        """
+        unclustered = np.fromiter(
+            (protein.clustered is False for protein in proteinCollection.proteins_list),
+            dtype=bool,
+            count=len(proteinCollection.proteins_list),
+        )
+        return cls(
+            np.flatnonzero(unclustered).astype(np.int32),
+            proteinCollection,
+            proteome_count,
+        )
+
+    def __len__(self) -> int:
+        return len(self.protein_idxs)
+
+    def get_cluster_id(self, singleton_idx: int) -> str:
+        """
+        Returns the cluster ID of a singleton.
+        """
+        return f"singleton_{singleton_idx}"
+
+    def get_cluster(self, singleton_idx: int) -> Cluster:
+        """
+        Builds the Cluster of a singleton, with its proteome bitmask set. Its
+        statistics are read from the singletons as one-protein clusters.
+
+        The cluster is not part of the cluster matrix, so its cluster_idx is None.
+
+        Args:
+            singleton_idx (int): Index of the singleton.
 
         Returns:
-        - Dict[str, float]: Dictionary where keys are domain sources and values are computed entropy values.
-        """
-        self.domain_entropy_by_domain_source: Dict[str, float] = {}
-        for domain_source, domain_counter in list(
-            self.domain_counter_by_domain_source.items()
-        ):
-            total_count: int = len(list(domain_counter.elements()))
-            domain_entropy: float = -sum(
-                i / total_count * log(i / total_count, 2)
-                for i in list(domain_counter.values())
-            )
-            if str(domain_entropy) == "-0.0":
-                self.domain_entropy_by_domain_source[domain_source] = 0.0
-            else:
-                self.domain_entropy_by_domain_source[domain_source] = domain_entropy
-        return self.domain_entropy_by_domain_source
+            Cluster: The singleton cluster.
+        """
+        protein_idx = int(self.protein_idxs[singleton_idx])
+        cluster = Cluster(
+            self.get_cluster_id(singleton_idx),
+            [self.proteinCollection.proteins_list[protein_idx].protein_id],
+            self.proteinCollection,
+        )
+        cluster.proteome_bitmask = 1 << int(self.proteome_idxs[singleton_idx])
+        cluster.cluster_proteins = self.cluster_proteins
+        cluster.cluster_proteins_idx = singleton_idx
+        return cluster
 
 
 class ClusterCollection:
     def __init__(
         self,
         cluster_list: List[Cluster],
-        inferred_singletons_count: int,
+        inferred_singletons: Optional[InferredSingletons],
         functional_annotation_parsed: bool,
         fastas_parsed: bool,
         domain_sources: List[str],
+        cluster_matrix: Optional[ClusterMatrix] = None,
+        cluster_proteins: Optional[ClusterProteins] = None,
     ):
         self.cluster_list: List[Cluster] = cluster_list
+        for cluster_idx, cluster in enumerate(cluster_list):
+            cluster.cluster_idx = cluster_idx
+            if cluster_proteins is not None:
+                cluster.cluster_proteins = cluster_proteins
+                cluster.cluster_proteins_idx = cluster_idx
+        self.cluster_matrix: Optional[ClusterMatrix] = cluster_matrix
+        self.cluster_proteins: Optional[ClusterProteins] = cluster_proteins
         self.cluster_list_by_cluster_id: Dict[str, Cluster] = {
             cluster.cluster_id: cluster for cluster in cluster_list
         }  # only for testing
-        self.cluster_count: int = len(cluster_list)
-        self.inferred_singletons_count: int = inferred_singletons_count
+        # unclustered proteins, not part of cluster_list and cluster_matrix
+        self.inferred_singletons: Optional[InferredSingletons] = inferred_singletons
+        self.inferred_singletons_count: int = (
+            len(inferred_singletons) if inferred_singletons else 0
+        )
+        self.cluster_count: int = len(cluster_list) + self.inferred_singletons_count
         self.functional_annotation_parsed: bool = functional_annotation_parsed
         self.fastas_parsed: bool = fastas_parsed
         # self.domain_sources = [domain_source for domain_source in domain_sources if not domain_source == "GO"]
@@ -1,6 +1,10 @@
 ATTRIBUTE_RESERVED = ["IDX", "OUT", "TAXID"]
 SUPPORTED_TESTS = {"welch", "mannwhitneyu", "ttest", "ks", "kruskal"}
 SUPPORTED_PLOT_FORMATS = {"png", "pdf", "svg"}
+SUPPORTED_RAREFACTION_MODES = {"sampled", "exact"}
+SUPPORTED_ALO_METRICS_FORMATS = {"per_level", "long"}
+# maximum number of count profiles whose representation test results are cached
+STATISTIC_CACHE_SIZE = 2**17
 SUPPORTED_TAXRANKS = {
     "superkingdom",
     "kingdom",
@@ -0,0 +1,146 @@
+import hashlib
+import json
+import logging
+import os
+import shutil
+import tempfile
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from core.utils import set_default_permissions
+
+logger = logging.getLogger("kinfin_logger")
+
+# bump when the arrays stored for a kind of entry change
+CACHE_FORMAT_VERSION = 1
+
+
+def get_file_signature(input_fs: List[Optional[str]]) -> str:
+    """
+    Returns a key for the current state of input files, from their paths, sizes
+    and modification times.
+
+    Args:
+        input_fs (List[Optional[str]]): Paths of the input files (None for inputs
+            that are not given).
+
+    Returns:
+        str: Hex digest of the signature.
+
+    Raises:
+        FileNotFoundError: If an input file does not exist.
+    """
+    signature = hashlib.sha1(str(CACHE_FORMAT_VERSION).encode())
+    for input_f in input_fs:
+        if input_f is None:
+            signature.update(b"None\0")
+            continue
+        stat = os.stat(input_f)
+        signature.update(
+            f"{os.path.abspath(input_f)}\0{stat.st_size}\0{stat.st_mtime_ns}\0".encode()
+        )
+    return signature.hexdigest()
+
+
+class DatasetCache:
+    """
+    Parsed input files, stored as .npy arrays in a cache directory.
+
+    Each entry is a directory named after the kind of data and the signature of the
+    input files it was parsed from (see get_file_signature), so that changed inputs
+    get a new entry and runs on the same inputs (e.g. with different configs) share
+    it. Arrays are loaded memory-mapped.
+
+    Entries are written to a temporary directory first and renamed into place, so
+    concurrent runs never see a partial entry. Failing to write an entry is not an
+    error, the run just goes on without caching.
+    """
+
+    def __init__(self, cache_dir: str) -> None:
+        """
+        Args:
+            cache_dir (str): Directory of the cache entries, created if needed.
+        """
+        self.cache_dir: str = os.path.abspath(cache_dir)
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    def get_entry_dir(self, kind: str, input_fs: List[Optional[str]]) -> str:
+        """
+        Returns the directory of the entry of a kind of data for input files.
+
+        Args:
+            kind (str): Kind of data, e.g. 'sequences'.
+            input_fs (List[Optional[str]]): Paths of the input files.
+
+        Returns:
+            str: Path of the entry directory.
+        """
+        return os.path.join(self.cache_dir, f"{kind}-{get_file_signature(input_fs)}")
+
+    def load(
+        self, kind: str, input_fs: List[Optional[str]]
+    ) -> Optional[Dict[str, np.ndarray]]:
+        """
+        Loads the arrays of an entry.
+
+        Args:
+            kind (str): Kind of data.
+            input_fs (List[Optional[str]]): Paths of the input files.
+
+        Returns:
+            Optional[Dict[str, np.ndarray]]: Arrays by name, None if there is no entry.
+        """
+        entry_dir = self.get_entry_dir(kind, input_fs)
+        try:
+            with open(os.path.join(entry_dir, "arrays.json")) as fh:
+                array_names: List[str] = json.load(fh)
+            arrays = {
+                array_name: np.load(
+                    os.path.join(entry_dir, f"{array_name}.npy"), mmap_mode="r"
+                )
+                for array_name in array_names
+            }
+        except (OSError, ValueError):
+            return None
+        logger.info(f"[STATUS] - Loaded {kind} from cache {entry_dir}")
+        return arrays
+
+    def save(
+        self,
+        kind: str,
+        input_fs: List[Optional[str]],
+        arrays: Dict[str, np.ndarray],
+    ) -> None:
+        """
+        Saves arrays as the entry of a kind of data for input files.
+
+        Args:
+            kind (str): Kind of data.
+            input_fs (List[Optional[str]]): Paths of the input files.
+            arrays (Dict[str, np.ndarray]): Arrays by name.
+
+        Returns:
+            None
+        """
+        entry_dir = self.get_entry_dir(kind, input_fs)
+        try:
+            tmp_dir = tempfile.mkdtemp(prefix=f".{kind}-", dir=self.cache_dir)
+        except OSError as e:
+            logger.warning(f"[WARN] - Could not cache {kind} in {entry_dir}: {e}")
+            return
+        try:
+            for array_name, array in arrays.items():
+                np.save(os.path.join(tmp_dir, f"{array_name}.npy"), array)
+            # written last, marks the entry as complete
+            with open(os.path.join(tmp_dir, "arrays.json"), "w") as fh:
+                json.dump(list(arrays), fh)
+            set_default_permissions(tmp_dir)
+            os.rename(tmp_dir, entry_dir)
+        except OSError as e:
+            # e.g. another run saved the same entry first
+            if not os.path.isdir(entry_dir):
+                logger.warning(f"[WARN] - Could not cache {kind} in {entry_dir}: {e}")
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            return
+        logger.info(f"[STATUS] - Cached {kind} in {entry_dir}")
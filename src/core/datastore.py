@@ -1,8 +1,10 @@
+import itertools
 import logging
+import multiprocessing
 import os
 import time
 from collections import Counter, defaultdict
-from typing import Any, Dict, FrozenSet, Generator, List, Set, Tuple, Union
+from typing import Any, Dict, Generator, Iterable, List, Optional, Set, Tuple, Union
 
 import matplotlib as mat
 import matplotlib.pyplot as plt
@@ -10,18 +12,27 @@ import numpy as np
 from matplotlib.lines import Line2D
 from matplotlib.ticker import FormatStrFormatter, NullFormatter
 
+from core.aggregation import AttributeAggregate, aggregate_attributes
 from core.alo import AttributeLevel
 from core.alo_collections import AloCollection
 from core.build import (
     build_AloCollection,
     build_ClusterCollection,
+    build_ClusterCollection_chunks,
     build_ProteinCollection,
 )
-from core.clusters import Cluster, ClusterCollection
+from core.clusters import Cluster, ClusterCollection, ClusterMatrix
+from core.dataset_cache import DatasetCache
 from core.input import InputData
-from core.logic import get_ALO_cluster_cardinality, get_attribute_cluster_type
+from core.logic import get_ALO_cluster_cardinality
+from core.long_format import LONG_FORMAT_SUFFIX, write_offset_index
+from core.plan import ComputePlan
+from core.plot_registry import PLOT_MANIFEST_FILENAME, PlotRegistry, get_plot_hash
 from core.proteins import ProteinCollection
-from core.utils import median, progress, statistic
+from core.spill import SpillDirectory
+from core.stats import STATISTIC_CACHE, batch_statistic
+from core.utils import median, progress
+from core.writers import LineWriter, OutputWriter, SortedOutputWriter, SpillRunWriter
 
 logger = logging.getLogger("kinfin_logger")
 mat.use("agg")
@@ -32,37 +43,177 @@ mat.rc("xtick", labelsize=20)
 axis_font = {"size": "20"}
 mat.rcParams.update({"font.size": 22})
 
+# attributes set on a Cluster by DataFactory.__analyse_cluster
+CLUSTER_ANALYSIS_FIELDS = (
+    "protein_counts_of_proteomes_by_level_by_attribute",
+    "proteome_coverage_by_level_by_attribute",
+    "implicit_protein_ids_by_proteome_id_by_level_by_attribute",
+    "cluster_type_by_attribute",
+    "protein_median",
+)
+# count features of tree nodes, see core.logic.parse_tree_from_file
+TREE_NODE_COUNT_FEATURES = (
+    "counts",
+    "apomorphic_cluster_counts",
+    "synapomorphic_cluster_counts",
+)
+
+# output of each output task writer, see DataFactory.run_output_task and
+# core.plan.OUTPUT_STAGES
+OUTPUT_BY_OUTPUT_TASK_WRITER = {
+    "cluster_size_plot": "cluster_size_distribution",
+    "rarefaction_plot": "rarefaction_curves",
+    "cluster_counts_by_taxon": "cluster_counts_by_taxon",
+    "cluster_metrics_domains": "cluster_metrics_domains",
+    "cluster_metrics_domains_detailed": "cluster_domain_annotation",
+    "cluster_summary": "cluster_summary",
+    "cluster_metrics_ALO": "cluster_metrics_ALO",
+    "cluster_metrics_ALO_long": "cluster_metrics_ALO",
+    "cluster_1to1_ALO": "cluster_1to1s",
+    "cluster_1to1_ALO_long": "cluster_1to1s",
+    "pairwise_representation": "pairwise_representation_test",
+    "attribute_metrics": "attribute_metrics",
+    "volcano_plot": "volcano_plots",
+}
+
+# DataFactory inherited by forked worker processes in DataFactory.analyse_clusters
+# and DataFactory.write_output
+_worker_dataFactory: Optional["DataFactory"] = None
+
+
+def _analyse_cluster_shard(
+    shard: Tuple[int, int],
+) -> Tuple[int, int, Dict[str, Any]]:
+    """
+    Worker entry point: analyses one shard of clusters of the inherited DataFactory.
+
+    Args:
+        shard (Tuple[int, int]): Start and end index of the shard in the cluster list.
+
+    Returns:
+        Tuple[int, int, Dict[str, Any]]: Start and end index, and partial results.
+    """
+    start, end = shard
+    return start, end, _worker_dataFactory.analyse_cluster_shard(start, end)
+
+
+def _run_output_task(
+    task: Tuple[Any, ...],
+) -> Tuple[Tuple[Any, ...], float, Any, Tuple[int, int]]:
+    """
+    Worker entry point: runs one output task of the inherited DataFactory.
+
+    Args:
+        task (Tuple[Any, ...]): The output task, see DataFactory.run_output_task.
+
+    Returns:
+        Tuple[Tuple[Any, ...], float, Any, Tuple[int, int]]: The task, its elapsed
+            time and result, and the (hits, misses) of the statistic cache during
+            the task.
+    """
+    cache_hits, cache_misses = STATISTIC_CACHE.hits, STATISTIC_CACHE.misses
+    elapsed, result = _worker_dataFactory.run_output_task(task)
+    return (
+        task,
+        elapsed,
+        result,
+        (STATISTIC_CACHE.hits - cache_hits, STATISTIC_CACHE.misses - cache_misses),
+    )
+
+
+def get_output_task_name(task: Tuple[Any, ...]) -> str:
+    """
+    Returns the name of an output task (writer, attribute and level or pair of
+    levels), for logs.
+    """
+    return ":".join(itertools.takewhile(lambda part: isinstance(part, str), task))
+
 
 class DataFactory:
     def __init__(self, inputData: InputData) -> None:
         self.dirs = {}
         self.inputData: InputData = inputData
+        # stages of the analysis needed by the selected outputs
+        self.plan: ComputePlan = ComputePlan(self.inputData.outputs)
+        logger.info(f"[STATUS] - Analysis stages: {self.plan}")
         self.aloCollection: AloCollection = build_AloCollection(
             config_f=self.inputData.config_f,
             nodesdb_f=self.inputData.nodesdb_f,
-            tree_f=self.inputData.tree_f,
+            tree_f=(
+                self.inputData.tree_f
+                if self.plan.needs_stage("tree_analysis")
+                else None
+            ),
             taxranks=self.inputData.taxranks,
             taxon_idx_mapping_file=self.inputData.taxon_idx_mapping_file,
         )
+        # parsed input files shared between runs, if enabled
+        self.datasetCache: Optional[DatasetCache] = (
+            DatasetCache(self.inputData.cache_dir) if self.inputData.cache_dir else None
+        )
         self.proteinCollection: ProteinCollection = build_ProteinCollection(
             aloCollection=self.aloCollection,
             fasta_dir=self.inputData.fasta_dir,
             go_mapping_f=self.inputData.go_mapping_f,
-            functional_annotation_f=self.inputData.functional_annotation_f,
+            functional_annotation_f=(
+                self.inputData.functional_annotation_f
+                if self.plan.needs_stage("functional_annotation")
+                else None
+            ),
             ipr_mapping=self.inputData.ipr_mapping,
             ipr_mapping_f=self.inputData.ipr_mapping_f,
             pfam_mapping=self.inputData.pfam_mapping,
             pfam_mapping_f=self.inputData.pfam_mapping_f,
             sequence_ids_f=self.inputData.sequence_ids_f,
             species_ids_f=self.inputData.species_ids_f,
+            datasetCache=self.datasetCache,
+            jobs=self.inputData.jobs,
         )
-        self.clusterCollection: ClusterCollection = build_ClusterCollection(
-            cluster_f=self.inputData.cluster_f,
-            output_dir=self.inputData.output_path,
-            proteinCollection=self.proteinCollection,
-            infer_singletons=self.inputData.infer_singletons,
-            available_proteomes=self.aloCollection.proteomes,
-        )
+        # with a chunk size, clusters are parsed and analysed one chunk at a time
+        # (see __analyse_clusters_streaming), otherwise all at once
+        self.clusterCollection: Optional[ClusterCollection] = None
+        if not self.inputData.chunk_size:
+            self.clusterCollection = build_ClusterCollection(
+                cluster_f=self.inputData.cluster_f,
+                output_dir=self.inputData.output_path,
+                proteinCollection=self.proteinCollection,
+                infer_singletons=self.inputData.infer_singletons,
+                available_proteomes=self.aloCollection.proteomes,
+                proteome_idx_by_proteome_id=self.aloCollection.proteome_idx_by_proteome_id,
+                datasetCache=self.datasetCache,
+            )
+        # per-cluster outputs written in chunks, merged by write_output
+        self.spillDirectory: Optional[SpillDirectory] = None
+        # volcano plots of the outputs being written
+        self.plotRegistry: Optional[PlotRegistry] = None
+        # output order of the clusters being written, see __get_output_order
+        self.output_order: Optional[np.ndarray] = None
+        self.cluster_size_counter: Counter[int] = Counter()
+        # (log2 mean ratio, p-value) of representation tests by pair of levels by
+        # attribute, for the volcano plots
+        self.pairwise_representation_test_by_pair_by_attribute: Dict[
+            str, Dict[Tuple[str, str], List[Tuple[float, float]]]
+        ] = {}
+        self.background_representation_test_by_pair_by_attribute: Dict[
+            str, Dict[Tuple[str, str], List[Tuple[float, float]]]
+        ] = {}
+        self.attribute_aggregates: Dict[str, AttributeAggregate] = {}
+        # rarefaction curves to be plotted by write_output, see
+        # AloCollection.compute_rarefaction_data and
+        # AloCollection.compute_expected_rarefaction_data
+        self.rarefaction_by_samplesize_by_level_by_attribute: Optional[
+            Dict[str, Dict[str, Dict[int, List[int]]]]
+        ] = None
+        self.expected_rarefaction_by_samplesize_by_level_by_attribute: Optional[
+            Dict[str, Dict[str, Dict[int, float]]]
+        ] = None
+        # representation tests of ALOs deferred until they can be run as a batch
+        self.pending_representation_tests: List[
+            Tuple[AttributeLevel, str, List[int], List[int]]
+        ] = []
+        # analysis fields of inferred singletons by proteome, see
+        # __get_inferred_singleton_fields
+        self.inferred_singleton_fields_by_proteome_idx: Dict[int, Dict[str, Any]] = {}
 
     def setup_dirs(self) -> None:
         """
@@ -95,23 +246,16 @@ class DataFactory:
         tree_path = os.path.join(output_path, "tree")
         node_chart_path = os.path.join(tree_path, "charts")
         node_header_path = os.path.join(tree_path, "headers")
-        # self.dirs["tree"] = tree_path
-        # self.dirs["tree_charts"] = node_chart_path
-        # self.dirs["tree_headers"] = node_header_path
-
-        if not os.path.exists(tree_path):
-            # self._create_directory(
-            self._extracted_from_setup_dirs_30(
-                "[STATUS] - Creating tree directory: ", tree_path, "tree"
-            )
-        if not os.path.exists(node_chart_path):
-            # self._create_directory(
-            self._extracted_from_setup_dirs_30(
-                "[STATUS] - Creating node charts directory: ",
-                node_chart_path,
-                "tree_charts",
-            )
-        if self.inputData.plot_tree and not os.path.exists(node_header_path):
+
+        self._create_directory(
+            "[STATUS] - Creating tree directory: ", tree_path, "tree"
+        )
+        self._create_directory(
+            "[STATUS] - Creating node charts directory: ",
+            node_chart_path,
+            "tree_charts",
+        )
+        if self.inputData.plot_tree:
             self._create_directory(
                 "[STATUS] - Creating node headers directory: ",
                 node_header_path,
@@ -119,8 +263,9 @@ class DataFactory:
             )
 
     def _create_directory(self, log_message, directory_path, dir_key):
-        logger.info(f"{log_message}{directory_path}")
-        os.makedirs(directory_path)
+        if not os.path.exists(directory_path):
+            logger.info(f"{log_message}{directory_path}")
+            os.makedirs(directory_path)
         self.dirs[dir_key] = directory_path
 
     def analyse_clusters(self) -> None:
@@ -133,25 +278,257 @@ class DataFactory:
         Returns:
             None
         """
+        analyse_clusters_start = time.time()
+        if self.inputData.chunk_size:
+            self.__analyse_clusters_streaming()
+        else:
+            if self.clusterCollection.inferred_singletons_count:
+                logger.info(
+                    f"[STATUS]\t - Clusters found = {self.clusterCollection.cluster_count} (of which {self.clusterCollection.inferred_singletons_count} were inferred singletons)")  # fmt:skip
+
+            else:
+                logger.info(
+                    f"[STATUS]\t - Clusters found = {self.clusterCollection.cluster_count}"
+                )
+            self.__analyse_cluster_collection()
+        analyse_clusters_end = time.time()
+        analyse_clusters_elapsed = analyse_clusters_end - analyse_clusters_start
+        logger.info(f"[STATUS] - Took {analyse_clusters_elapsed}s to analyse clusters")
+        logger.info(
+            f"[STATUS] - Representation test cache: {STATISTIC_CACHE.hits} hits, {STATISTIC_CACHE.misses} misses"
+        )
+
+    def __analyse_clusters_streaming(self) -> None:
+        """
+        Analyses the clusters chunk by chunk, while the cluster file is parsed.
+
+        The per-cluster outputs of a chunk are written to spill files before the
+        next chunk is parsed. Then the clusters of the chunk and their data in the
+        ALOs are released, so that only aggregate counts are kept. The cluster
+        matrices of the chunks are stacked for the rarefaction curves.
+
+        Returns:
+            None
+        """
+        self.spillDirectory = SpillDirectory(self.dirs["main"])
+        cluster_matrices: List[ClusterMatrix] = []
+        cluster_count = 0
+        for clusterCollection in build_ClusterCollection_chunks(
+            cluster_f=self.inputData.cluster_f,
+            output_dir=self.inputData.output_path,
+            proteinCollection=self.proteinCollection,
+            infer_singletons=self.inputData.infer_singletons,
+            available_proteomes=self.aloCollection.proteomes,
+            proteome_idx_by_proteome_id=self.aloCollection.proteome_idx_by_proteome_id,
+            chunk_size=self.inputData.chunk_size,
+            datasetCache=self.datasetCache,
+        ):
+            self.clusterCollection = clusterCollection
+            self.__analyse_cluster_collection()
+            self.__write_cluster_outputs()
+            for ALO_by_level in self.aloCollection.ALO_by_level_by_attribute.values():
+                for ALO in ALO_by_level.values():
+                    if ALO is not None:
+                        ALO.release_clusters()
+            cluster_matrices.append(clusterCollection.cluster_matrix)
+            cluster_count += clusterCollection.cluster_count
+            logger.info(f"[STATUS]\t - Clusters analysed = {cluster_count}")
+
+        # no clusters are kept, only their matrix (for the rarefaction curves)
+        self.clusterCollection = ClusterCollection(
+            [],
+            None,
+            self.proteinCollection.functional_annotation_parsed,
+            self.proteinCollection.fastas_parsed,
+            self.proteinCollection.domain_sources,
+            ClusterMatrix.vstack(
+                cluster_matrices, len(self.aloCollection.proteome_idx_by_proteome_id)
+            ),
+        )
+
+    def __analyse_cluster_collection(self) -> None:
+        """
+        Analyses the clusters and inferred singletons of the cluster collection.
+
+        Returns:
+            None
+        """
+        cluster_count = len(self.clusterCollection.cluster_list)
+        parse_steps = cluster_count / 100
+        self.cluster_size_counter.update(
+            cluster.protein_count for cluster in self.clusterCollection.cluster_list
+        )
         if self.clusterCollection.inferred_singletons_count:
-            logger.info(
-                f"[STATUS]\t - Clusters found = {self.clusterCollection.cluster_count} (of which {self.clusterCollection.inferred_singletons_count} were inferred singletons)")  # fmt:skip
+            self.cluster_size_counter[
+                1
+            ] += self.clusterCollection.inferred_singletons_count
+
+        logger.info("[STATUS] - Aggregating cluster counts by attribute level ...")
+        self.attribute_aggregates = aggregate_attributes(
+            self.clusterCollection.cluster_matrix,
+            self.aloCollection,
+            (
+                self.clusterCollection.cluster_proteins
+                if self.clusterCollection.fastas_parsed
+                else None
+            ),
+        )
 
+        logger.info("[STATUS] - Analysing clusters ...")
+        if self.inputData.jobs > 1 and cluster_count > 1:
+            self.__analyse_clusters_parallel(parse_steps)
         else:
-            logger.info(
-                f"[STATUS]\t - Clusters found = {self.clusterCollection.cluster_count}"
-            )
+            for idx, cluster in enumerate(self.clusterCollection.cluster_list):
+                self.__analyse_cluster(cluster)
+                progress(idx + 1, parse_steps, cluster_count)
+            self.__run_representation_tests()
+        if self.clusterCollection.inferred_singletons:
+            self.__analyse_inferred_singletons()
+        if self.aloCollection.tree_index:
+            self.aloCollection.tree_index.add_absent_counts()
 
-        parse_steps = self.clusterCollection.cluster_count / 100
+    def __analyse_clusters_parallel(self, parse_steps: float) -> None:
+        """
+        Analyses clusters in a pool of forked worker processes.
 
-        logger.info("[STATUS] - Analysing clusters ...")
-        analyse_clusters_start = time.time()
-        for idx, cluster in enumerate(self.clusterCollection.cluster_list):
+        The cluster list is split into contiguous shards. Each worker analyses its
+        shards against its own (empty) copy of the ALOs and tree, and the partial
+        results are merged back in cluster order, so that all accumulated lists
+        are identical to those of a serial run.
+
+        Args:
+            parse_steps (float): Number of clusters between progress updates.
+
+        Returns:
+            None
+        """
+        global _worker_dataFactory
+
+        cluster_count = len(self.clusterCollection.cluster_list)
+        jobs = min(self.inputData.jobs, cluster_count)
+        shard_size = max(1, -(-cluster_count // (jobs * 4)))
+        shards = [
+            (start, min(start + shard_size, cluster_count))
+            for start in range(0, cluster_count, shard_size)
+        ]
+        logger.info(
+            f"[STATUS] - Using {jobs} processes for {len(shards)} shards of clusters"
+        )
+        _worker_dataFactory = self
+        try:
+            with multiprocessing.get_context("fork").Pool(jobs) as pool:
+                for start, end, shard_result in pool.imap(
+                    _analyse_cluster_shard, shards
+                ):
+                    self.__merge_cluster_shard(start, end, shard_result)
+                    progress(end, parse_steps, cluster_count)
+        finally:
+            _worker_dataFactory = None
+
+    def analyse_cluster_shard(self, start: int, end: int) -> Dict[str, Any]:
+        """
+        Analyses a shard of the cluster list and returns the partial results.
+
+        Only meant to be called in a worker process: ALOs and tree node counts of
+        this process are reset first, so that afterwards they hold the
+        contributions of this shard only.
+
+        Args:
+            start (int): Index of the first cluster of the shard.
+            end (int): Index after the last cluster of the shard.
+
+        Returns:
+            Dict[str, Any]: A dictionary with keys:
+                - 'clusters': analysis fields of each cluster in the shard.
+                - 'ALOs': partial AttributeLevel by (attribute, level).
+                - 'tree_nodes': count features by node name.
+                - 'statistic_cache': (hits, misses) of the statistic cache.
+        """
+        cache_hits, cache_misses = STATISTIC_CACHE.hits, STATISTIC_CACHE.misses
+        self.aloCollection.ALO_by_level_by_attribute = self.aloCollection.create_ALOs()
+        if self.aloCollection.tree_ete:
+            for node in self.aloCollection.tree_ete.traverse("levelorder"):  # type: ignore
+                for feature in TREE_NODE_COUNT_FEATURES:
+                    node_counts = getattr(node, feature)
+                    for key in node_counts:
+                        node_counts[key] = 0
+                node.synapomorphic_cluster_strings = []  # type: ignore
+
+        clusters = self.clusterCollection.cluster_list[start:end]
+        for cluster in clusters:
             self.__analyse_cluster(cluster)
-            progress(idx + 1, parse_steps, self.clusterCollection.cluster_count)
-        analyse_clusters_end = time.time()
-        analyse_clusters_elapsed = analyse_clusters_end - analyse_clusters_start
-        logger.info(f"[STATUS] - Took {analyse_clusters_elapsed}s to analyse clusters")
+        self.__run_representation_tests()
+        if self.aloCollection.tree_index:
+            self.aloCollection.tree_index.add_absent_counts()
+
+        tree_nodes: Dict[str, Dict[str, Any]] = {}
+        if self.aloCollection.tree_ete:
+            for node in self.aloCollection.tree_ete.traverse("levelorder"):  # type: ignore
+                tree_nodes[node.name] = {
+                    feature: getattr(node, feature)
+                    for feature in TREE_NODE_COUNT_FEATURES
+                }
+                tree_nodes[node.name][
+                    "synapomorphic_cluster_strings"
+                ] = node.synapomorphic_cluster_strings  # type: ignore
+
+        return {
+            "clusters": [
+                {field: getattr(cluster, field) for field in CLUSTER_ANALYSIS_FIELDS}
+                for cluster in clusters
+            ],
+            "ALOs": {
+                (attribute, level): ALO
+                for attribute, ALO_by_level in self.aloCollection.ALO_by_level_by_attribute.items()
+                for level, ALO in ALO_by_level.items()
+                if ALO is not None
+            },
+            "tree_nodes": tree_nodes,
+            "statistic_cache": (
+                STATISTIC_CACHE.hits - cache_hits,
+                STATISTIC_CACHE.misses - cache_misses,
+            ),
+        }
+
+    def __merge_cluster_shard(
+        self, start: int, end: int, shard_result: Dict[str, Any]
+    ) -> None:
+        """
+        Merges the partial results of one shard into clusters, ALOs and tree nodes.
+
+        Args:
+            start (int): Index of the first cluster of the shard.
+            end (int): Index after the last cluster of the shard.
+            shard_result (Dict[str, Any]): Result of analyse_cluster_shard.
+
+        Returns:
+            None
+        """
+        for cluster, fields in zip(
+            self.clusterCollection.cluster_list[start:end], shard_result["clusters"]
+        ):
+            for field, value in fields.items():
+                setattr(cluster, field, value)
+
+        for (attribute, level), partial_ALO in shard_result["ALOs"].items():
+            self.aloCollection.ALO_by_level_by_attribute[attribute][level].merge(
+                partial_ALO
+            )
+
+        STATISTIC_CACHE.hits += shard_result["statistic_cache"][0]
+        STATISTIC_CACHE.misses += shard_result["statistic_cache"][1]
+
+        if not shard_result["tree_nodes"]:
+            return
+        for node in self.aloCollection.tree_ete.traverse("levelorder"):  # type: ignore
+            partial_node = shard_result["tree_nodes"][node.name]
+            for feature in TREE_NODE_COUNT_FEATURES:
+                node_counts = getattr(node, feature)
+                for key, count in partial_node[feature].items():
+                    node_counts[key] += count
+            node.synapomorphic_cluster_strings.extend(  # type: ignore
+                partial_node["synapomorphic_cluster_strings"]
+            )
 
     def plot_rarefaction_data(
         self,
@@ -162,6 +539,9 @@ class DataFactory:
         plotsize: Tuple[float, float],
         plot_format: str,
         fontsize: int,
+        expected_rarefaction_by_samplesize_by_level_by_attribute: Optional[
+            Dict[str, Dict[str, Dict[int, float]]]
+        ] = None,
     ) -> None:
         """
         Plot rarefaction curves based on provided data.
@@ -176,14 +556,25 @@ class DataFactory:
             plotsize (tuple): A tuple specifying the size of the plot (width, height) in inches.
             plot_format (str): The format of the plot to save (e.g., 'png', 'pdf').
             fontsize (int): Font size for plot labels and legend.
+            expected_rarefaction_by_samplesize_by_level_by_attribute (dict, optional):
+                Expected non-singleton cluster counts by sample size, by level and
+                attribute. Where available, the expected curve is plotted instead
+                of the median of the repetitions.
 
         Returns:
             None
         """
+        if expected_rarefaction_by_samplesize_by_level_by_attribute is None:
+            expected_rarefaction_by_samplesize_by_level_by_attribute = {}
         for (
             attribute,
             rarefaction_by_samplesize_by_level,
         ) in rarefaction_by_samplesize_by_level_by_attribute.items():
+            expected_rarefaction_by_samplesize_by_level = (
+                expected_rarefaction_by_samplesize_by_level_by_attribute.get(
+                    attribute, {}
+                )
+            )
             rarefaction_plot_f = os.path.join(
                 dirs[attribute], f"{attribute}.rarefaction_curve.{plot_format}"
             )
@@ -208,7 +599,12 @@ class DataFactory:
                     x_values.append(x)
                     y_mins.append(min(y_reps))
                     y_maxs.append(max(y_reps))
-                    median_y_values.append(median(y_reps))
+                    if level in expected_rarefaction_by_samplesize_by_level:
+                        median_y_values.append(
+                            expected_rarefaction_by_samplesize_by_level[level][x]
+                        )
+                    else:
+                        median_y_values.append(median(y_reps))
                     median_x_values.append(x)
                 x_array = np.array(x_values)
                 y_mins_array = np.array(y_mins)
@@ -244,41 +640,519 @@ class DataFactory:
             f.savefig(rarefaction_plot_f, format=plot_format)
             plt.close()
 
-    def write_output(self) -> None:
+    def __plot_rarefaction_curve(self, attribute: str) -> None:
+        """
+        Plots the rarefaction curve of an attribute, see plot_rarefaction_data.
+
+        Args:
+            attribute (str): The attribute.
+
+        Returns:
+            None
         """
-        Executes various methods to generate and write output files related to cluster analysis.
+        self.plot_rarefaction_data(
+            rarefaction_by_samplesize_by_level_by_attribute={
+                attribute: self.rarefaction_by_samplesize_by_level_by_attribute[
+                    attribute
+                ]
+            },
+            dirs=self.dirs,
+            plotsize=self.inputData.plotsize,
+            plot_format=self.inputData.plot_format,
+            fontsize=self.inputData.fontsize,
+            expected_rarefaction_by_samplesize_by_level_by_attribute=self.expected_rarefaction_by_samplesize_by_level_by_attribute,
+        )
 
-        This method sequentially calls private methods to:
+    def write_output(self) -> None:
+        """
+        Generates and writes the output files of the cluster analysis:
         - Plot cluster sizes.
+        - Plot the rarefaction curves, by attribute, if they were computed.
         - Write cluster counts by taxon.
         - Write cluster metrics related to domains.
         - Write detailed cluster metrics related to domains.
-        - Write attribute metrics.
-        - Write a summary of cluster metrics.
-        - Write cluster metrics related to ALO (Additive Log Ratio) transformation.
-        - Write cluster 1-to-1 ALO metrics.
-        - Write pairwise representation metrics.
+        - Write a summary of cluster metrics, by attribute.
+        - Write cluster metrics of each ALO (attribute level).
+        - Write cluster 1-to-1 metrics of each ALO.
+        - Write pairwise representation tests, by attribute.
+        - Write attribute metrics, by attribute.
+        - Plot the volcano plots of representation tests, by pair of levels.
+
+        Each of these is an independent output task (see run_output_task), except
+        for the volcano plots of an attribute, which need its pairwise tests. Each
+        volcano plot is registered once, and not rendered again if its data is
+        unchanged from a previous run (see PlotRegistry). With
+        several jobs, tasks are run by forked workers: tables in one pool, plots
+        in another, so that matplotlib rendering does not hold up tables. The time
+        of each task and the critical path are logged.
+
+        Lines with one row per cluster are written as they are produced, in the
+        output order of the clusters (see __get_output_order), so that they need no
+        sorting. Other sorted outputs are sorted in bounded memory (see
+        SortedOutputWriter).
+
+        When clusters were analysed in chunks, the per-cluster outputs have already
+        been written to spill files, which are merged instead.
+
+        Returns:
+            None
+        """
+        write_output_start = time.time()
+        self.plotRegistry = PlotRegistry(
+            os.path.join(self.dirs["main"], PLOT_MANIFEST_FILENAME)
+        )
+        table_tasks: List[Tuple[Any, ...]] = []
+        plot_tasks: List[Tuple[Any, ...]] = [
+            task for task in [("cluster_size_plot",)] if self.__is_planned(task)
+        ]
+        if self.rarefaction_by_samplesize_by_level_by_attribute is not None:
+            plot_tasks.extend(
+                ("rarefaction_plot", attribute)
+                for attribute in self.rarefaction_by_samplesize_by_level_by_attribute
+                if self.__is_planned(("rarefaction_plot", attribute))
+            )
+        if self.spillDirectory:
+            self.output_order = None
+            table_tasks.extend(
+                ("spill_file", output_f)
+                for output_f in self.spillDirectory.spill_file_by_output_f
+            )
+            # pairwise tests were run with the chunks
+            for attribute in self.aloCollection.attributes:
+                plot_tasks.extend(self.__get_volcano_plot_tasks(attribute))
+        else:
+            self.output_order = self.__get_output_order()
+            table_tasks.extend(self.__get_cluster_output_tasks())
+        table_tasks.extend(
+            ("attribute_metrics", attribute)
+            for attribute in self.aloCollection.attributes
+            if self.__is_planned(("attribute_metrics", attribute))
+        )
+
+        if self.inputData.jobs > 1:
+            elapsed_by_task = self.__run_output_tasks_parallel(table_tasks, plot_tasks)
+        else:
+            elapsed_by_task = self.__run_output_tasks(table_tasks + plot_tasks)
+
+        if self.spillDirectory:
+            self.spillDirectory.remove()
+            self.spillDirectory = None
+        self.plotRegistry.write()
+        self.plotRegistry = None
+        self.__log_output_task_times(elapsed_by_task, time.time() - write_output_start)
+
+    def __get_cluster_output_tasks(self) -> List[Tuple[str, ...]]:
+        """
+        Returns the output tasks of the outputs with a line per cluster (or per
+        cluster and level): one per file.
+
+        Returns:
+            List[Tuple[str, ...]]: Output tasks, see run_output_task.
+        """
+        tasks: List[Tuple[str, ...]] = [
+            ("cluster_counts_by_taxon",),
+            ("cluster_metrics_domains",),
+            ("cluster_metrics_domains_detailed",),
+        ]
+        tasks.extend(
+            ("cluster_summary", attribute)
+            for attribute in self.aloCollection.attributes
+        )
+        if self.inputData.alo_metrics_format == "long":
+            tasks.extend(
+                ("cluster_metrics_ALO_long", attribute)
+                for attribute in self.aloCollection.attributes
+            )
+            tasks.extend(
+                ("cluster_1to1_ALO_long", attribute)
+                for attribute in self.aloCollection.attributes
+                if attribute.lower() != "taxon"
+            )
+        else:
+            ALO_levels = [
+                (attribute, level)
+                for attribute in self.aloCollection.attributes
+                for level, ALO in sorted(
+                    self.aloCollection.ALO_by_level_by_attribute[attribute].items()
+                )
+                if ALO is not None
+            ]
+            tasks.extend(
+                ("cluster_metrics_ALO", attribute, level)
+                for attribute, level in ALO_levels
+            )
+            tasks.extend(
+                ("cluster_1to1_ALO", attribute, level)
+                for attribute, level in ALO_levels
+                if attribute.lower() != "taxon"
+            )
+        tasks.extend(
+            ("pairwise_representation", attribute)
+            for attribute in self.aloCollection.attributes
+        )
+        return [task for task in tasks if self.__is_planned(task)]
+
+    def __is_planned(self, task: Tuple[Any, ...]) -> bool:
+        """
+        Returns whether an output task is part of the compute plan: whether its
+        output was selected. The pairwise representation tests of an attribute are
+        also run for its volcano plots.
+
+        Args:
+            task (Tuple[Any, ...]): The output task, see run_output_task.
 
-        Each private method is responsible for generating specific outputs based on internal data.
+        Returns:
+            bool: True if the task is to be run.
+        """
+        if task[0] == "pairwise_representation":
+            return self.plan.needs_stage("pairwise_tests")
+        return self.plan.wants_output(OUTPUT_BY_OUTPUT_TASK_WRITER[task[0]])
+
+    def __get_volcano_plot_tasks(self, attribute: str) -> List[Tuple[Any, ...]]:
+        """
+        Returns the output tasks of the volcano plots of the background and pairwise
+        representation tests of an attribute, one per pair of levels, with their
+        data. Plots that are up to date (see PlotRegistry) are skipped.
+
+        Args:
+            attribute (str): The attribute.
+
+        Returns:
+            List[Tuple[Any, ...]]: Output tasks, see run_output_task.
+        """
+        tasks: List[Tuple[Any, ...]] = []
+        if not self.plan.wants_output("volcano_plots"):
+            return tasks
+        for test_by_pair_by_attribute in (
+            self.background_representation_test_by_pair_by_attribute,
+            self.pairwise_representation_test_by_pair_by_attribute,
+        ):
+            for (level, other_level), pair_data in test_by_pair_by_attribute.get(
+                attribute, {}
+            ).items():
+                p_values, log2fc_values = self.__prepare_data(pair_data)
+                if not p_values:
+                    continue
+                output_file = self.__get_output_filename(
+                    attribute, [level, other_level]
+                )
+                plot_hash = get_plot_hash(
+                    (p_values, log2fc_values),
+                    (
+                        level,
+                        other_level,
+                        self.inputData.plot_format,
+                        self.inputData.plotsize,
+                        self.inputData.fontsize,
+                    ),
+                )
+                if self.plotRegistry.register(output_file, plot_hash):
+                    tasks.append(
+                        (
+                            "volcano_plot",
+                            attribute,
+                            level,
+                            other_level,
+                            p_values,
+                            log2fc_values,
+                        )
+                    )
+                else:
+                    logger.info(f"[STATUS] - {output_file} is up to date")
+        return tasks
+
+    def run_output_task(self, task: Tuple[Any, ...]) -> Tuple[float, Any]:
+        """
+        Runs an output task: the writer named by its first element, called with
+        the other elements (attribute, level, ...).
+
+        Args:
+            task (Tuple[Any, ...]): The output task.
+
+        Returns:
+            Tuple[float, Any]: Elapsed time, and for pairwise representation tasks
+                the background and pairwise test results of the attribute (for the
+                volcano plots).
+        """
+        writer_by_name = {
+            "cluster_size_plot": self.__plot_cluster_sizes,
+            "rarefaction_plot": self.__plot_rarefaction_curve,
+            "spill_file": self.__write_spill_file,
+            "cluster_counts_by_taxon": self.__write_cluster_counts_by_taxon,
+            "cluster_metrics_domains": self.__write_cluster_metrics_domains,
+            "cluster_metrics_domains_detailed": self.__write_cluster_metrics_domains_detailed,
+            "cluster_summary": self.__write_cluster_summary,
+            "cluster_metrics_ALO": self.__write_cluster_metrics_ALO,
+            "cluster_metrics_ALO_long": self.__write_cluster_metrics_ALO_long,
+            "cluster_1to1_ALO": self.__write_cluster_1to1_ALO,
+            "cluster_1to1_ALO_long": self.__write_cluster_1to1_ALO_long,
+            "pairwise_representation": self.__write_pairwise_representation,
+            "attribute_metrics": self.__write_attribute_metrics,
+            "volcano_plot": self.__plot_volcano,
+        }
+        task_start = time.time()
+        writer, *args = task
+        writer_by_name[writer](*args)
+        result = None
+        if writer == "pairwise_representation":
+            attribute = args[0]
+            result = (
+                self.background_representation_test_by_pair_by_attribute.get(attribute),
+                self.pairwise_representation_test_by_pair_by_attribute.get(attribute),
+            )
+        return time.time() - task_start, result
+
+    def __run_output_tasks(self, tasks: List[Tuple[Any, ...]]) -> Dict[str, float]:
+        """
+        Runs output tasks one after another. The volcano plots of an attribute are
+        run after its pairwise representation tests.
+
+        Args:
+            tasks (List[Tuple[Any, ...]]): Output tasks.
+
+        Returns:
+            Dict[str, float]: Elapsed time by task name.
+        """
+        elapsed_by_task: Dict[str, float] = {}
+        tasks = list(tasks)
+        for task in tasks:
+            elapsed, _ = self.run_output_task(task)
+            elapsed_by_task[get_output_task_name(task)] = elapsed
+            if task[0] == "pairwise_representation":
+                tasks.extend(self.__get_volcano_plot_tasks(task[1]))
+        return elapsed_by_task
+
+    def __run_output_tasks_parallel(
+        self,
+        table_tasks: List[Tuple[Any, ...]],
+        plot_tasks: List[Tuple[Any, ...]],
+    ) -> Dict[str, float]:
+        """
+        Runs output tasks in two pools of forked worker processes, one for tables
+        and one for plots. The pairwise representation tests of an attribute are
+        merged back as soon as they are done, and its volcano plots submitted.
+        Hits and misses of the statistic cache in the workers are added to those
+        of this process.
+
+        Args:
+            table_tasks (List[Tuple[Any, ...]]): Output tasks writing tables.
+            plot_tasks (List[Tuple[Any, ...]]): Output tasks rendering plots.
+
+        Returns:
+            Dict[str, float]: Elapsed time by task name.
+        """
+        global _worker_dataFactory
+
+        jobs = self.inputData.jobs
+        plot_jobs = max(1, jobs // 4)
+        table_jobs = max(1, min(jobs - plot_jobs, len(table_tasks)))
+        logger.info(
+            f"[STATUS] - Using {table_jobs} processes for {len(table_tasks)} output tables and {plot_jobs} for plots"
+        )
+        elapsed_by_task: Dict[str, float] = {}
+        context = multiprocessing.get_context("fork")
+        _worker_dataFactory = self
+        try:
+            with context.Pool(table_jobs) as table_pool, context.Pool(
+                plot_jobs
+            ) as plot_pool:
+                plot_results = [
+                    plot_pool.apply_async(_run_output_task, (task,))
+                    for task in plot_tasks
+                ]
+                for task, elapsed, result, statistic_cache in table_pool.imap_unordered(
+                    _run_output_task, table_tasks
+                ):
+                    elapsed_by_task[get_output_task_name(task)] = elapsed
+                    STATISTIC_CACHE.hits += statistic_cache[0]
+                    STATISTIC_CACHE.misses += statistic_cache[1]
+                    if task[0] == "pairwise_representation":
+                        attribute = task[1]
+                        background_by_pair, pairwise_by_pair = result
+                        if background_by_pair:
+                            self.background_representation_test_by_pair_by_attribute[
+                                attribute
+                            ] = background_by_pair
+                        if pairwise_by_pair:
+                            self.pairwise_representation_test_by_pair_by_attribute[
+                                attribute
+                            ] = pairwise_by_pair
+                        plot_results.extend(
+                            plot_pool.apply_async(_run_output_task, (plot_task,))
+                            for plot_task in self.__get_volcano_plot_tasks(attribute)
+                        )
+                for plot_result in plot_results:
+                    task, elapsed, _, _ = plot_result.get()
+                    elapsed_by_task[get_output_task_name(task)] = elapsed
+        finally:
+            _worker_dataFactory = None
+        return elapsed_by_task
+
+    def __log_output_task_times(
+        self, elapsed_by_task: Dict[str, float], elapsed: float
+    ) -> None:
+        """
+        Logs the time of each output task and of the critical path: the longest
+        task, or pairwise representation tests followed by their slowest volcano
+        plot.
+
+        Args:
+            elapsed_by_task (Dict[str, float]): Elapsed time by task name.
+            elapsed (float): Time taken to write all outputs.
+
+        Returns:
+            None
+        """
+        for task_name, task_elapsed in sorted(
+            elapsed_by_task.items(), key=lambda item: item[1], reverse=True
+        ):
+            logger.info(f"[STATUS]\t - {task_name}: {task_elapsed:.3f}s")
+        critical_path = [
+            (task_elapsed, [task_name])
+            for task_name, task_elapsed in elapsed_by_task.items()
+        ]
+        for attribute in self.aloCollection.attributes:
+            tests_name = get_output_task_name(("pairwise_representation", attribute))
+            plots_prefix = get_output_task_name(("volcano_plot", attribute, ""))
+            plot_times = [
+                (task_elapsed, task_name)
+                for task_name, task_elapsed in elapsed_by_task.items()
+                if task_name.startswith(plots_prefix)
+            ]
+            if tests_name in elapsed_by_task and plot_times:
+                plot_elapsed, plot_name = max(plot_times)
+                critical_path.append(
+                    (
+                        elapsed_by_task[tests_name] + plot_elapsed,
+                        [tests_name, plot_name],
+                    )
+                )
+        critical_path_elapsed, critical_path_names = max(
+            critical_path, default=(0.0, [])
+        )
+        logger.info(
+            f"[STATUS] - Took {elapsed:.3f}s to write outputs ({sum(elapsed_by_task.values()):.3f}s in {len(elapsed_by_task)} tasks, critical path {' > '.join(critical_path_names)}: {critical_path_elapsed:.3f}s)"
+        )
+
+    def __write_spill_file(self, output_f: str) -> None:
+        """
+        Writes an output from its spill file, see SpillDirectory.
+
+        Args:
+            output_f (str): Path of the output file.
 
         Returns:
             None
         """
-        self.__plot_cluster_sizes()
-        self.__write_cluster_counts_by_taxon()
-        self.__write_cluster_metrics_domains()
-        self.__write_cluster_metrics_domains_detailed()
-        self.__write_attribute_metrics()
-        self.__write_cluster_summary()
-        self.__write_cluster_metrics_ALO()
-        self.__write_cluster_1to1_ALO()
-        self.__write_pairwise_representation()
+        if self.spillDirectory.write_output(output_f):
+            logger.info(f"[STATUS] - Writing {output_f}")
+            if output_f.endswith(LONG_FORMAT_SUFFIX):
+                write_offset_index(output_f)
+
+    def __write_cluster_outputs(self) -> None:
+        """
+        Writes the outputs with a line per cluster (or per cluster and level) for
+        the clusters of a chunk of the cluster collection, to spill files.
+
+        Returns:
+            None
+        """
+        self.output_order = self.__get_output_order()
+        for task in self.__get_cluster_output_tasks():
+            self.run_output_task(task)
+
+    def __get_output_order(self) -> Optional[np.ndarray]:
+        """
+        Returns the canonical output order of the clusters of the cluster
+        collection, followed by the inferred singletons: the order of their cluster
+        IDs. The lines of per-cluster outputs start with the cluster ID and a tab,
+        so writing them in this order is the same as sorting them.
+
+        Returns:
+            Optional[np.ndarray]: Indices of the clusters (singletons following the
+                cluster list) in output order, None if cluster IDs are not unique.
+        """
+        cluster_ids = [
+            cluster.cluster_id for cluster in self.clusterCollection.cluster_list
+        ]
+        if inferred_singletons := self.clusterCollection.inferred_singletons:
+            cluster_ids.extend(
+                inferred_singletons.get_cluster_id(singleton_idx)
+                for singleton_idx in range(len(inferred_singletons))
+            )
+        if len(set(cluster_ids)) != len(cluster_ids):
+            return None
+        return np.array(
+            sorted(range(len(cluster_ids)), key=lambda idx: f"{cluster_ids[idx]}\t"),
+            dtype=np.int64,
+        )
+
+    def __iter_output_order(self) -> Iterable[int]:
+        """
+        Returns the indices of the clusters (singletons following the cluster list)
+        in output order, or in the order of __iter_clusters if there is none.
+
+        Returns:
+            Iterable[int]: Cluster indices.
+        """
+        if self.output_order is not None:
+            return self.output_order.tolist()
+        cluster_count = len(self.clusterCollection.cluster_list)
+        if self.clusterCollection.inferred_singletons:
+            cluster_count += self.clusterCollection.inferred_singletons_count
+        return range(cluster_count)
+
+    def __iter_clusters_in_output_order(self) -> Generator[Cluster, None, None]:
+        """
+        Yields all analysed clusters and the inferred singletons in output order.
+
+        Returns:
+            Generator[Cluster, None, None]: Clusters in output order.
+        """
+        cluster_list = self.clusterCollection.cluster_list
+        cluster_count = len(cluster_list)
+        for idx in self.__iter_output_order():
+            if idx < cluster_count:
+                yield cluster_list[idx]
+            else:
+                yield self.__get_inferred_singleton(idx - cluster_count)
+
+    def __open_output_file(
+        self,
+        output_f: str,
+        header_line: Optional[str] = None,
+        sort: bool = True,
+        presorted: bool = False,
+        min_line_count: int = 1,
+    ) -> LineWriter:
+        """
+        Opens the writer of an output file, or of its spill file when clusters are
+        analysed in chunks.
+
+        Args:
+            output_f (str): Path of the output file.
+            header_line (Optional[str]): Line written before all others.
+            sort (bool): Whether the lines are sorted.
+            presorted (bool): Whether the lines are added in the output order of the
+                clusters, which is their sorted order if there is one.
+            min_line_count (int): Minimum number of lines for the file to be written.
+
+        Returns:
+            LineWriter: Writer of the lines, to be closed once all are added.
+        """
+        if self.spillDirectory:
+            return SpillRunWriter(
+                self.spillDirectory, output_f, header_line, sort, min_line_count
+            )
+        if sort and not (presorted and self.output_order is not None):
+            return SortedOutputWriter(output_f, header_line, min_line_count)
+        return OutputWriter(output_f, header_line, min_line_count)
 
     # analyse cluster
     def __analyse_ete_for_specific_cluster(
         self,
         cluster: Cluster,
-        intersection: FrozenSet[str],
+        intersection: int,
         node,
     ) -> None:
         """
@@ -289,7 +1163,7 @@ class DataFactory:
 
         Args:
             cluster (Cluster): The cluster to analyze.
-            intersection (FrozenSet[str]): The intersection of proteome IDs between
+            intersection (int): Bitmask of the intersection of proteomes between
                 the cluster and the current node.
             node: The evolutionary tree node to update.
 
@@ -306,22 +1180,22 @@ class DataFactory:
             child_node_proteome_coverage_strings = []
             child_node_proteome_ids_covered_count = 0
             for child_node in node.get_children():
-                if child_node.proteome_ids.isdisjoint(cluster.proteome_ids):
+                if not child_node.proteome_bitmask & cluster.proteome_bitmask:
                     # No child node proteomes are not in cluster
                     child_nodes_covered.append(False)
                 else:
                     # At least on child node proteome in cluster
                     child_nodes_covered.append(True)
-                    child_node_proteome_ids_covered_count = len(
-                        cluster.proteome_ids.intersection(child_node.proteome_ids)
-                    )
+                    child_node_proteome_ids_covered_count = (
+                        cluster.proteome_bitmask & child_node.proteome_bitmask
+                    ).bit_count()
                     child_node_proteome_coverage_strings.append(
                         f"{child_node.name}=({child_node_proteome_ids_covered_count}/{len(child_node.proteome_ids)})"
                     )
             if all(child_nodes_covered):
                 # At least one proteome of each child node in cluster
                 # => SYNAPOMORPHY
-                node_proteome_coverage = len(intersection) / len(
+                node_proteome_coverage = intersection.bit_count() / len(
                     node.proteome_ids
                 )  # type: ignore
                 node_cluster_type = ""
@@ -340,7 +1214,7 @@ class DataFactory:
                         node_cluster_type,
                         "{0:.3}".format(node_proteome_coverage),
                         ";".join(child_node_proteome_coverage_strings),
-                        ",".join(sorted(intersection)),
+                        ",".join(self.aloCollection.get_proteome_ids(intersection)),
                     )
                 )
 
@@ -348,9 +1222,10 @@ class DataFactory:
         """
         Analyzes a cluster within an ETE Tree if available in the ALO collection.
 
-        Traverses the ETE Tree in level order, comparing proteome IDs of each node
-        with the cluster's proteome IDs. Updates counts and attributes of nodes
-        based on the analysis results.
+        Only visits the nodes containing proteomes of the cluster, i.e. the paths from
+        its leaves to the root. Nodes above the LCA of the cluster's proteomes contain
+        all of them ('specific'), the others only some ('shared'). 'absent' counts are
+        filled in by the tree index once all clusters have been analysed.
 
         Args:
             cluster (Cluster): The cluster to analyze.
@@ -358,35 +1233,30 @@ class DataFactory:
         Returns:
             None
         """
-        if not self.aloCollection.tree_ete:
+        tree_index = self.aloCollection.tree_index
+        if not tree_index:
             return
 
-        for node in self.aloCollection.tree_ete.traverse("levelorder"):  # type: ignore
-            intersection = cluster.proteome_ids.intersection(
-                node.proteome_ids  # type: ignore
-            )  # type: ignore
-            difference = cluster.proteome_ids.difference(
-                node.proteome_ids  # type: ignore
-            )  # type: ignore
-
-            if len(intersection) == 0:
-                # Nothing to see here ...
-                node.counts["absent"] += 1  # type: ignore
-
-            elif cluster.singleton is True:
+        present_node_idxs, lca_idx = tree_index.get_cluster_nodes(
+            cluster.proteome_bitmask
+        )
+        for node_idx in sorted(present_node_idxs):
+            node = tree_index.nodes[node_idx]
+
+            if cluster.singleton is True:
                 # This is a singleton
                 node.counts["singleton"] += 1  # type: ignore
                 node.apomorphic_cluster_counts["singletons"] += 1  # type: ignore
 
-            elif len(difference) > 0:
+            elif lca_idx < 0 or not tree_index.is_ancestor(node_idx, lca_idx):
                 # This is a 'shared' cluster
                 node.counts["shared"] += 1  # type: ignore
 
-            elif len(difference) == 0:
+            else:
                 # This is a node 'specific' cluster
                 self.__analyse_ete_for_specific_cluster(
                     cluster=cluster,
-                    intersection=intersection,
+                    intersection=cluster.proteome_bitmask & node.proteome_bitmask,  # type: ignore
                     node=node,
                 )
 
@@ -395,24 +1265,24 @@ class DataFactory:
         cluster: Cluster,
         attribute: str,
         level: str,
+        proteome_counts: np.ndarray,
         protein_ids_by_level: Dict[str, List[str]],
-        protein_length_stats_by_level: Dict[str, Dict[str, Union[int, float]]],
         explicit_protein_count_by_proteome_id_by_level: Dict[str, Dict[str, int]],
     ) -> None:
         """
         Processes a specific level within an attribute for a given cluster.
 
-        Retrieves protein IDs and their counts associated with the specified level
-        from the ALO collection and updates various attributes and collections within
-        the cluster and the class instance.
+        Reads the protein counts of the proteomes of the level from the cluster's
+        row of the cluster matrix, retrieves the protein IDs of proteomes present
+        in the cluster and updates various attributes and collections within the
+        cluster and the class instance.
 
         Args:
             cluster (Cluster): The cluster for which to process the level.
             attribute (str): The attribute associated with the level.
             level (str): The specific level to process.
+            proteome_counts (np.ndarray): Dense cluster matrix row of the cluster.
             protein_ids_by_level (dict): A dictionary to store protein IDs by level.
-            protein_length_stats_by_level (dict): A dictionary to store protein length statistics
-                by level.
             explicit_protein_count_by_proteome_id_by_level (dict): A dictionary to store explicit
                 protein counts by proteome ID for each level.
 
@@ -427,11 +1297,13 @@ class DataFactory:
         protein_count_by_proteome_id = {}
         protein_ids_by_level[level] = []
 
-        for proteome_id in ALO.proteomes_list:
-            protein_ids = list(cluster.protein_ids_by_proteome_id.get(proteome_id, []))
-            protein_ids_by_level[level].extend(protein_ids)
-            protein_count_by_proteome_id[proteome_id] = len(protein_ids)
-            if protein_count_by_proteome_id[proteome_id] != 0:
+        for proteome_id, protein_count in zip(
+            ALO.proteomes_list, proteome_counts[ALO.proteome_idxs].tolist()
+        ):
+            protein_count_by_proteome_id[proteome_id] = protein_count
+            if protein_count != 0:
+                protein_ids = cluster.protein_ids_by_proteome_id[proteome_id]
+                protein_ids_by_level[level].extend(protein_ids)
                 protein_ids_by_proteome_id[proteome_id] = protein_ids
 
         if protein_ids_by_proteome_id:
@@ -443,18 +1315,48 @@ class DataFactory:
             protein_count_by_proteome_id
         )
 
-        protein_length_stats_by_level[level] = (
-            self.proteinCollection.get_protein_length_stats(protein_ids_by_level[level])
-        )
-
         cluster.protein_counts_of_proteomes_by_level_by_attribute[attribute][level] = (
             list(protein_count_by_proteome_id.values())
         )
 
+    def __process_absent_level(
+        self,
+        cluster: Cluster,
+        attribute: str,
+        level: str,
+        protein_ids_by_level: Dict[str, List[str]],
+    ) -> None:
+        """
+        Processes a level of an attribute in which a given cluster is absent.
+
+        All proteomes of the level have a protein count of zero, so there is no
+        need to look at the cluster's proteins. No explicit protein counts are
+        stored for the level since they would only add zeros to the counts of
+        non-ALO proteomes (which are ignored by the representation tests).
+
+        Args:
+            cluster (Cluster): The cluster for which to process the level.
+            attribute (str): The attribute associated with the level.
+            level (str): The specific level to process.
+            protein_ids_by_level (dict): A dictionary to store protein IDs by level.
+
+        Returns:
+            None
+        """
+        ALO = self.aloCollection.ALO_by_level_by_attribute[attribute][level]
+        if ALO is None:
+            return
+
+        protein_ids_by_level[level] = []
+        cluster.protein_counts_of_proteomes_by_level_by_attribute[attribute][level] = [
+            0
+        ] * ALO.proteome_count
+
     def __update_ALO_data(
         self,
         cluster: Cluster,
         attribute: str,
+        level_counts: Dict[str, Tuple[int, int]],
         protein_ids_by_level: Dict[str, List[str]],
         protein_length_stats_by_level: Dict[str, Dict[str, Union[int, float]]],
         explicit_protein_count_by_proteome_id_by_level: Dict[str, Dict[str, int]],
@@ -464,11 +1366,14 @@ class DataFactory:
 
         Iterates through each level of the ALO collection corresponding to the attribute,
         calculates various metrics based on the cluster's protein IDs and attributes, and
-        updates the ALO object with this information.
+        updates the ALO object with this information. Representation tests of shared
+        clusters are queued and run in batches by __run_representation_tests.
 
         Args:
             cluster (Cluster): The cluster to update ALO data for.
             attribute (str): The attribute associated with the ALO data.
+            level_counts (dict): Protein and proteome counts of the levels in which
+                the cluster is present (see AttributeAggregate.get_level_counts).
             protein_ids_by_level (dict): A dictionary mapping level names to lists of protein IDs.
             protein_length_stats_by_level (dict): A dictionary mapping level names to dictionaries
                 containing protein length statistics.
@@ -483,23 +1388,12 @@ class DataFactory:
             if ALO is None:
                 continue
 
+            _, proteome_count = level_counts.get(level, (0, 0))
             cluster.proteome_coverage_by_level_by_attribute[attribute][level] = (
-                len(
-                    cluster.implicit_protein_ids_by_proteome_id_by_level_by_attribute[
-                        attribute
-                    ].get(level, [])
-                )
-                / ALO.proteome_count
+                proteome_count / ALO.proteome_count
             )
 
-            ALO_cluster_status = (
-                "present"
-                if level
-                in cluster.implicit_protein_ids_by_proteome_id_by_level_by_attribute[
-                    attribute
-                ]
-                else "absent"
-            )
+            ALO_cluster_status = "present" if level in level_counts else "absent"
 
             ALO_cluster_cardinality = None
             mwu_pvalue = None
@@ -521,7 +1415,9 @@ class DataFactory:
                     fuzzy_range=self.inputData.fuzzy_range,
                 )
 
-                if cluster.cluster_type_by_attribute[attribute] == "shared":
+                if cluster.cluster_type_by_attribute[
+                    attribute
+                ] == "shared" and self.plan.needs_stage("representation_tests"):
                     non_ALO_proteome_counts_in_cluster = [
                         count
                         for non_ALO_level in explicit_protein_count_by_proteome_id_by_level
@@ -530,12 +1426,12 @@ class DataFactory:
                             non_ALO_level
                         ].values()
                     ]
-                    mwu_pvalue, mwu_log2_mean, mean_ALO_count, mean_non_ALO_count = (
-                        statistic(
-                            count_1=ALO_proteome_counts_in_cluster,
-                            count_2=non_ALO_proteome_counts_in_cluster,
-                            test=self.inputData.test,
-                            min_proteomes=self.inputData.min_proteomes,
+                    self.pending_representation_tests.append(
+                        (
+                            ALO,
+                            cluster.cluster_id,
+                            ALO_proteome_counts_in_cluster,
+                            non_ALO_proteome_counts_in_cluster,
                         )
                     )
 
@@ -552,22 +1448,49 @@ class DataFactory:
                 mean_non_ALO_count=mean_non_ALO_count,
             )
 
-    def __process_single_attribute(self, cluster: Cluster, attribute: str) -> None:
+    def __run_representation_tests(self) -> None:
+        """
+        Runs all queued representation tests as one batch and stores the results in
+        their ALOs.
+
+        Returns:
+            None
+        """
+        if not self.pending_representation_tests:
+            return
+
+        results = batch_statistic(
+            counts_1=[test[2] for test in self.pending_representation_tests],
+            counts_2=[test[3] for test in self.pending_representation_tests],
+            test=self.inputData.test,
+            min_proteomes=self.inputData.min_proteomes,
+        )
+        for (ALO, cluster_id, _, _), result in zip(
+            self.pending_representation_tests, results
+        ):
+            ALO.set_representation_test(cluster_id, *result)
+        self.pending_representation_tests = []
+
+    def __process_single_attribute(
+        self, cluster: Cluster, attribute: str, proteome_counts: np.ndarray
+    ) -> None:
         """
         Processes a single attribute for a given cluster.
 
         Retrieves and processes each level associated with the attribute from the ALO
         collection, updating various protein and cluster metrics within the cluster object.
+        Which levels the cluster is present in, and its cluster type, are looked up in
+        the precomputed attribute aggregates.
 
         Args:
             cluster (Cluster): The cluster to process the attribute for.
             attribute (str): The attribute to process.
+            proteome_counts (np.ndarray): Dense cluster matrix row of the cluster.
 
         Returns:
             None
         """
         protein_ids_by_level: Dict[str, List[str]] = {}
-        protein_length_stats_by_level: Dict[str, Dict[str, Union[int, float]]] = {}
         explicit_protein_count_by_proteome_id_by_level: Dict[str, Dict[str, int]] = {}
 
         cluster.protein_counts_of_proteomes_by_level_by_attribute[attribute] = {}
@@ -576,26 +1499,38 @@ class DataFactory:
             {}
         )
 
+        attribute_aggregate = self.attribute_aggregates[attribute]
+        level_counts = attribute_aggregate.get_level_counts(cluster.cluster_idx)
+
         for level in self.aloCollection.ALO_by_level_by_attribute[attribute]:
-            self.__process_level(
-                cluster,
-                attribute,
-                level,
-                protein_ids_by_level,
-                protein_length_stats_by_level,
-                explicit_protein_count_by_proteome_id_by_level,
-            )
+            if level in level_counts:
+                self.__process_level(
+                    cluster,
+                    attribute,
+                    level,
+                    proteome_counts,
+                    protein_ids_by_level,
+                    explicit_protein_count_by_proteome_id_by_level,
+                )
+            else:
+                self.__process_absent_level(
+                    cluster,
+                    attribute,
+                    level,
+                    protein_ids_by_level,
+                )
 
-        cluster.cluster_type_by_attribute[attribute] = get_attribute_cluster_type(
-            cluster.singleton,
-            cluster.implicit_protein_ids_by_proteome_id_by_level_by_attribute[
-                attribute
-            ],
+        cluster.cluster_type_by_attribute[attribute] = (
+            attribute_aggregate.get_cluster_type(cluster.cluster_idx)
+        )
+        protein_length_stats_by_level = attribute_aggregate.get_protein_length_stats(
+            cluster.cluster_idx
         )
 
         self.__update_ALO_data(
             cluster,
             attribute,
+            level_counts,
             protein_ids_by_level,
             protein_length_stats_by_level,
             explicit_protein_count_by_proteome_id_by_level,
@@ -605,7 +1540,8 @@ class DataFactory:
         """
         Processes all attributes in the ALO collection for a given cluster.
 
-        Iterates through each attribute in the ALO collection and processes it
+        Reads the cluster's protein counts by proteome from the cluster matrix once,
+        then iterates through each attribute in the ALO collection and processes it
         using the __process_single_attribute method.
 
         Args:
@@ -614,8 +1550,11 @@ class DataFactory:
         Returns:
             None
         """
+        proteome_counts = self.clusterCollection.cluster_matrix.get_dense_row(
+            cluster.cluster_idx
+        )
         for attribute in self.aloCollection.attributes:
-            self.__process_single_attribute(cluster, attribute)
+            self.__process_single_attribute(cluster, attribute, proteome_counts)
 
     def __finalize_cluster_analysis(self, cluster: Cluster) -> None:
         """
@@ -655,12 +1594,133 @@ class DataFactory:
         Returns:
             None
         """
-        if self.aloCollection.tree_ete:
+        if self.aloCollection.tree_index:
             self.__analyse_tree_ete(cluster=cluster)
 
         self.__process_attributes(cluster)
         self.__finalize_cluster_analysis(cluster)
 
+    def __analyse_inferred_singletons(self) -> None:
+        """
+        Adds the inferred singletons to ALOs and tree nodes in aggregate.
+
+        A singleton is present in the ALOs and tree nodes of its proteome and absent
+        from all others, so only the number of singletons (and the span of their
+        proteins) by proteome is needed.
+
+        Returns:
+            None
+        """
+        inferred_singletons = self.clusterCollection.inferred_singletons
+        singleton_count = len(inferred_singletons)
+        logger.info(f"[STATUS] - Counting {singleton_count} inferred singletons ...")
+        for ALO_by_level in self.aloCollection.ALO_by_level_by_attribute.values():
+            for ALO in ALO_by_level.values():
+                if ALO is None:
+                    continue
+                present_count = int(inferred_singletons.counts[ALO.proteome_idxs].sum())
+                ALO.add_inferred_singletons(
+                    present_count=present_count,
+                    absent_count=singleton_count - present_count,
+                    protein_span=int(
+                        inferred_singletons.spans[ALO.proteome_idxs].sum()
+                    ),
+                )
+        if self.aloCollection.tree_index:
+            self.aloCollection.tree_index.add_singleton_counts(
+                inferred_singletons.counts.tolist()
+            )
+
+    def __get_inferred_singleton_fields(self, proteome_idx: int) -> Dict[str, Any]:
+        """
+        Returns the analysis fields (see CLUSTER_ANALYSIS_FIELDS) of the inferred
+        singletons of a proteome, as __analyse_cluster would set them.
+
+        They only depend on the proteome, so they are computed once and shared by
+        all its singletons. Implicit protein IDs are left empty since they are not
+        written out.
+
+        Args:
+            proteome_idx (int): Index of the proteome.
+
+        Returns:
+            Dict[str, Any]: Analysis fields by name.
+        """
+        if proteome_idx in self.inferred_singleton_fields_by_proteome_idx:
+            return self.inferred_singleton_fields_by_proteome_idx[proteome_idx]
+
+        protein_counts_by_level_by_attribute: Dict[str, Dict[str, List[int]]] = {}
+        proteome_coverage_by_level_by_attribute: Dict[str, Dict[str, float]] = {}
+        for attribute in self.aloCollection.attributes:
+            protein_counts_by_level_by_attribute[attribute] = {}
+            proteome_coverage_by_level_by_attribute[attribute] = {}
+            for level, ALO in self.aloCollection.ALO_by_level_by_attribute[
+                attribute
+            ].items():
+                if ALO is None:
+                    continue
+                protein_counts = [
+                    int(ALO_proteome_idx == proteome_idx)
+                    for ALO_proteome_idx in ALO.proteome_idxs.tolist()
+                ]
+                protein_counts_by_level_by_attribute[attribute][level] = protein_counts
+                proteome_coverage_by_level_by_attribute[attribute][level] = (
+                    sum(protein_counts) / ALO.proteome_count
+                )
+
+        fields = {
+            "protein_counts_of_proteomes_by_level_by_attribute": protein_counts_by_level_by_attribute,
+            "proteome_coverage_by_level_by_attribute": proteome_coverage_by_level_by_attribute,
+            "implicit_protein_ids_by_proteome_id_by_level_by_attribute": {
+                attribute: {} for attribute in self.aloCollection.attributes
+            },
+            "cluster_type_by_attribute": {
+                attribute: "singleton" for attribute in self.aloCollection.attributes
+            },
+            "protein_median": median(
+                [
+                    count
+                    for count in protein_counts_by_level_by_attribute["all"]["all"]
+                    if count != 0
+                ]
+            ),
+        }
+        self.inferred_singleton_fields_by_proteome_idx[proteome_idx] = fields
+        return fields
+
+    def __get_inferred_singleton(self, singleton_idx: int) -> Cluster:
+        """
+        Builds the analysed Cluster of an inferred singleton.
+
+        Args:
+            singleton_idx (int): Index of the singleton.
+
+        Returns:
+            Cluster: The singleton cluster.
+        """
+        inferred_singletons = self.clusterCollection.inferred_singletons
+        cluster = inferred_singletons.get_cluster(singleton_idx)
+        for field, value in self.__get_inferred_singleton_fields(
+            int(inferred_singletons.proteome_idxs[singleton_idx])
+        ).items():
+            setattr(cluster, field, value)
+        return cluster
+
+    def __iter_clusters(self) -> Generator[Cluster, None, None]:
+        """
+        Yields all analysed clusters, followed by the inferred singletons, which are
+        built one at a time.
+
+        Returns:
+            Generator[Cluster, None, None]: Clusters in output order.
+        """
+        yield from self.clusterCollection.cluster_list
+        if self.clusterCollection.inferred_singletons:
+            for singleton_idx in range(
+                self.clusterCollection.inferred_singletons_count
+            ):
+                yield self.__get_inferred_singleton(singleton_idx)
+
     # write output
     # 0. __get_header_line
     def __get_header_line(self, filetype: str, attribute: str) -> str:
@@ -731,6 +1791,12 @@ class DataFactory:
                 "percentage_at_target_count",
             ]
             return "\t".join(cluster_1to1s_ALO_header)
+        elif filetype == "cluster_1to1s_ALO_long":
+            cluster_1to1s_ALO_long_header = self.__get_header_line(
+                "cluster_1to1s_ALO", attribute
+            ).split("\t")
+            cluster_1to1s_ALO_long_header.insert(1, "level")
+            return "\t".join(cluster_1to1s_ALO_long_header)
         elif filetype == "cluster_metrics":
             cluster_metrics_header = [
                 "#cluster_id",
@@ -784,6 +1850,13 @@ class DataFactory:
             # for domain_source in clusterCollection.domain_sources:
             #    cluster_metrics_ALO_header.append(domain_source)
             return "\t".join(cluster_metrics_ALO_header)
+        elif filetype == "cluster_metrics_ALO_long":
+            # all rows are of clusters present in their level
+            cluster_metrics_ALO_long_header = self.__get_header_line(
+                "cluster_metrics_ALO", attribute
+            ).split("\t")
+            cluster_metrics_ALO_long_header[1] = "level"
+            return "\t".join(cluster_metrics_ALO_long_header)
         elif filetype == "cluster_metrics_domains":
             cluster_metrics_domains_header = [
                 "#cluster_id",
@@ -842,10 +1915,7 @@ class DataFactory:
         Raises:
             ValueError: If self.inputData.plot_format is not a valid file format.
         """
-        cluster_protein_count = [
-            cluster.protein_count for cluster in self.clusterCollection.cluster_list
-        ]
-        cluster_protein_counter = Counter(cluster_protein_count)
+        cluster_protein_counter = self.cluster_size_counter
         count_plot_f = os.path.join(
             self.dirs["main"],
             f"cluster_size_distribution.{self.inputData.plot_format}",
@@ -883,7 +1953,7 @@ class DataFactory:
         Write cluster counts by taxon attribute to a text file.
 
         This method iterates through attributes in self.aloCollection.attributes,
-        retrieves protein counts by level for clusters in self.clusterCollection.cluster_list
+        retrieves protein counts by level for all clusters (including inferred singletons)
         that match the attribute "taxon", and writes the data to a text file named
         'cluster_counts_by_taxon.txt' in the directory specified by self.dirs["main"].
 
@@ -895,9 +1965,12 @@ class DataFactory:
             levels = sorted(
                 list(self.aloCollection.ALO_by_level_by_attribute[attribute])
             )
-            cafe_output = []
-            for cluster in self.clusterCollection.cluster_list:
-                if attribute.lower() == "taxon":
+            if attribute.lower() != "taxon":
+                continue
+            with self.__open_output_file(
+                cafe_f, self.__get_header_line("cafe", "taxon"), presorted=True
+            ) as cafe_writer:
+                for cluster in self.__iter_clusters_in_output_order():
                     cafe_line = f"{cluster.cluster_id}"
                     # cafe_line.append("None")
                     for _level in levels:
@@ -907,14 +1980,7 @@ class DataFactory:
                             ][_level]
                         )
                         cafe_line += f"\t{total_proteins}"
-                    cafe_output.append(cafe_line)
-            if cafe_output:
-                with open(cafe_f, "w") as cafe_fh:
-                    logger.info(f"[STATUS] - Writing {cafe_f}")
-                    cafe_output.sort()
-                    cafe_output.insert(0, self.__get_header_line("cafe", "taxon"))
-                    cafe_fh.write("\n".join(cafe_output) + "\n")
-                cafe_output = []
+                    cafe_writer.add_line(cafe_line)
 
     # 3. write_cluster_metrics_domains
     def __write_cluster_metrics_domains(self) -> None:
@@ -933,103 +1999,99 @@ class DataFactory:
             self.dirs["main"], "cluster_metrics_domains.txt"
         )
         header = self.__get_header_line("cluster_metrics_domains", "taxon").split("\t")
-        cluster_metrics_domains_output = []
-
-        if self.clusterCollection.functional_annotation_parsed:
-            for cluster in self.clusterCollection.cluster_list:
-                line_parts = {
-                    "#cluster_id": cluster.cluster_id,
-                    "cluster_protein_count": str(cluster.protein_count),
-                    "TAXON_count": str(cluster.proteome_count),
-                    "protein_span_mean": "N/A",
-                    "protein_span_sd": "N/A",
-                    "fraction_secreted": "N/A",
-                }
+        with self.__open_output_file(
+            cluster_metrics_domains_f, "\t".join(header), presorted=True
+        ) as cluster_metrics_domains_writer:
+            if self.clusterCollection.functional_annotation_parsed:
+                for cluster in self.__iter_clusters_in_output_order():
+                    line_parts = {
+                        "#cluster_id": cluster.cluster_id,
+                        "cluster_protein_count": str(cluster.protein_count),
+                        "TAXON_count": str(cluster.proteome_count),
+                        "protein_span_mean": "N/A",
+                        "protein_span_sd": "N/A",
+                        "fraction_secreted": "N/A",
+                    }
+
+                    protein_length_stats = cluster.protein_length_stats
+                    if self.clusterCollection.fastas_parsed and protein_length_stats:
+                        line_parts["protein_span_mean"] = str(
+                            protein_length_stats["mean"]
+                        )
+                        line_parts["protein_span_sd"] = str(protein_length_stats["sd"])
 
-                if (
-                    self.clusterCollection.fastas_parsed
-                    and cluster.protein_length_stats
-                ):
-                    line_parts["protein_span_mean"] = str(
-                        cluster.protein_length_stats["mean"]
-                    )
-                    line_parts["protein_span_sd"] = str(
-                        cluster.protein_length_stats["sd"]
-                    )
+                    if "SignalP_EUK" in self.clusterCollection.domain_sources:
+                        line_parts["fraction_secreted"] = "{0:.2f}".format(
+                            cluster.secreted_cluster_coverage
+                        )
 
-                if "SignalP_EUK" in self.clusterCollection.domain_sources:
-                    line_parts["fraction_secreted"] = "{0:.2f}".format(
-                        cluster.secreted_cluster_coverage
+                    # computed on access, see ClusterProteins
+                    domain_counter_by_domain_source = (
+                        cluster.domain_counter_by_domain_source
                     )
+                    domain_entropy_by_domain_source = (
+                        cluster.domain_entropy_by_domain_source
+                    )
+                    for domain_source in self.clusterCollection.domain_sources:
+                        if domain_source in domain_counter_by_domain_source:
+                            sorted_counts = sorted(
+                                [
+                                    f"{domain_id}:{count}"
+                                    for domain_id, count in domain_counter_by_domain_source[
+                                        domain_source
+                                    ].most_common()
+                                ],
+                                key=lambda x: (x.split(":")[-1], x.split(":")[-2]),
+                            )
+                            line_parts[domain_source] = ";".join(sorted_counts)
+                            line_parts[f"{domain_source}_entropy"] = "{0:.3f}".format(
+                                domain_entropy_by_domain_source[domain_source]
+                            )
+                        else:
+                            line_parts[domain_source] = "N/A"
+                            line_parts[f"{domain_source}_entropy"] = "N/A"
 
-                for domain_source in self.clusterCollection.domain_sources:
-                    if domain_source in cluster.domain_counter_by_domain_source:
-                        sorted_counts = sorted(
-                            [
-                                f"{domain_id}:{count}"
-                                for domain_id, count in cluster.domain_counter_by_domain_source[
-                                    domain_source
-                                ].most_common()
-                            ],
-                            key=lambda x: (x.split(":")[-1], x.split(":")[-2]),
-                        )
-                        line_parts[domain_source] = ";".join(sorted_counts)
-                        line_parts[f"{domain_source}_entropy"] = "{0:.3f}".format(
-                            cluster.domain_entropy_by_domain_source[domain_source]
-                        )
-                    else:
-                        line_parts[domain_source] = "N/A"
-                        line_parts[f"{domain_source}_entropy"] = "N/A"
-
-                # Ensure we're following the correct order from the header
-                ordered_line = [line_parts.get(col, "N/A") for col in header]
-                cluster_metrics_domains_output.append("\t".join(ordered_line))
-
-        if cluster_metrics_domains_output:
-            with open(cluster_metrics_domains_f, "w") as cluster_metrics_domains_fh:
-                logger.info(f"[STATUS] - Writing {cluster_metrics_domains_f}")
-                cluster_metrics_domains_output.sort()
-                cluster_metrics_domains_output.insert(0, "\t".join(header))
-                cluster_metrics_domains_fh.write(
-                    "\n".join(cluster_metrics_domains_output) + "\n"
-                )
+                    # Ensure we're following the correct order from the header
+                    ordered_line = [line_parts.get(col, "N/A") for col in header]
+                    cluster_metrics_domains_writer.add_line("\t".join(ordered_line))
 
     # 4. write_cluster_metrics_domains_detailed
-    def __count_proteins_with_domain(
-        self, cluster: Cluster, domain_source: str, domain_id: str
-    ) -> Tuple[Dict[str, int], Dict[str, int]]:
+    def __get_domain_protein_counts(
+        self, cluster: Cluster
+    ) -> Dict[Tuple[str, str], Counter[str]]:
         """
-        Count proteins with and without a specific domain in each proteome of a cluster.
+        Count proteins with each domain in each proteome of a cluster.
+
+        Builds an inverted index of the domains of the cluster in a single pass over
+        its proteins, so that the counts of all domains are available at once.
 
         Args:
             cluster (Cluster): The cluster object containing proteins to be analyzed.
-            domain_source (str): The source of the domain to be counted (e.g., "Pfam", "InterPro").
-            domain_id (str): The ID of the specific domain to be counted.
 
         Returns:
-            Tuple[Dict[str, int], Dict[str, int]]: A tuple containing:
-                - A dictionary where keys are proteome IDs and values are counts of proteins
-                  in the proteome that have the specified domain (`with_domain`).
-                - A dictionary where keys are proteome IDs and values are counts of proteins
-                  in the proteome that do not have the specified domain (`without_domain`).
+            Dict[Tuple[str, str], Counter[str]]: A dictionary where keys are
+                (domain_source, domain_id) tuples and values are counters of proteins
+                having the domain by proteome ID.
 
         """
-        with_domain = defaultdict(int)
-        without_domain = defaultdict(int)
-
+        protein_counts_by_domain: Dict[Tuple[str, str], Counter[str]] = defaultdict(
+            Counter
+        )
+        domain_counts_by_domain_source = (
+            self.proteinCollection.protein_table.domain_counts_by_domain_source
+        )
         for proteome_id, protein_ids in cluster.protein_ids_by_proteome_id.items():
             for protein_id in protein_ids:
                 protein = self.proteinCollection.proteins_by_protein_id[protein_id]
-                if (
-                    domain_source in protein.domain_counter_by_domain_source
-                    and domain_id
-                    in protein.domain_counter_by_domain_source[domain_source]
-                ):
-                    with_domain[proteome_id] += 1
-                else:
-                    without_domain[proteome_id] += 1
-
-        return with_domain, without_domain
+                for (
+                    domain_source,
+                    domain_counts,
+                ) in domain_counts_by_domain_source.items():
+                    for domain_id in domain_counts.get_domain_ids(protein.protein_idx):
+                        protein_counts_by_domain[(domain_source, domain_id)][
+                            proteome_id
+                        ] += 1
+        return protein_counts_by_domain
 
     def __format_proteome_counts(
         self, count_dict: Dict[str, int], cluster: Cluster
@@ -1075,28 +2137,32 @@ class DataFactory:
         ).get(domain_id, "N/A")
 
     def __process_cluster_domains(
-        self, cluster: Cluster, output_by_domain_source: Dict[str, List[str]]
+        self, cluster: Cluster, writer_by_domain_source: Dict[str, LineWriter]
     ) -> None:
         """
         Process domain statistics for a cluster and populate the output dictionary.
 
         Args:
             cluster (Cluster): The cluster object containing domain statistics to process.
-            output_by_domain_source (Dict[str, List[str]]): A dictionary where keys are domain sources
-                and values are lists of output lines to be populated with processed domain statistics.
+            writer_by_domain_source (Dict[str, LineWriter]): A dictionary where keys are domain sources
+                and values are the writers of the output lines of processed domain statistics.
 
         Returns:
             None
 
         """
+        protein_counts_by_domain = self.__get_domain_protein_counts(cluster)
         for (
             domain_source,
             domain_counter,
         ) in cluster.domain_counter_by_domain_source.items():
             for domain_id, count in domain_counter.most_common():
-                with_domain, without_domain = self.__count_proteins_with_domain(
-                    cluster, domain_source, domain_id
-                )
+                with_domain = protein_counts_by_domain[(domain_source, domain_id)]
+                without_domain = {
+                    proteome_id: len(protein_ids) - with_domain[proteome_id]
+                    for proteome_id, protein_ids in cluster.protein_ids_by_proteome_id.items()
+                    if len(protein_ids) > with_domain[proteome_id]
+                }
                 proteome_count_with_domain = sum(
                     count > 0 for count in with_domain.values()
                 )
@@ -1110,40 +2176,15 @@ class DataFactory:
                     domain_source, domain_id
                 )
 
-                output_line = (
-                    f"{cluster.cluster_id}\t{domain_source}\t{domain_id}\t"
-                    f"{domain_description}\t{cluster.protein_count}\t"
-                    f"{sum(with_domain.values())}\t"
-                    f"{proteome_count_with_domain / cluster.proteome_count:.3f}\t"
-                    f"{with_domain_str}\t{without_domain_str}"
-                )
-
-                output_by_domain_source[domain_source].append(output_line)
-
-    def __write_domain_outputs(
-        self,
-        output_by_domain_source: Dict[str, List[str]],
-        output_files: Dict[str, str],
-    ) -> None:
-        """
-        Write domain outputs to respective output files.
-
-        Args:
-            output_by_domain_source (Dict[str, List[str]]): A dictionary where keys are domain sources
-                and values are lists of output lines to be written to output files.
-            output_files (Dict[str, str]): A dictionary where keys are domain sources and values are
-                corresponding output file paths.
-
-        Returns:
-            None
+                output_line = (
+                    f"{cluster.cluster_id}\t{domain_source}\t{domain_id}\t"
+                    f"{domain_description}\t{cluster.protein_count}\t"
+                    f"{sum(with_domain.values())}\t"
+                    f"{proteome_count_with_domain / cluster.proteome_count:.3f}\t"
+                    f"{with_domain_str}\t{without_domain_str}"
+                )
 
-        """
-        for domain_source, output_lines in output_by_domain_source.items():
-            if len(output_lines) > 1:
-                output_file = output_files[domain_source]
-                logger.info(f"[STATUS] - Writing {output_file}")
-                with open(output_file, "w") as fh:
-                    fh.write("\n".join(output_lines) + "\n")
+                writer_by_domain_source[domain_source].add_line(output_line)
 
     def __write_cluster_metrics_domains_detailed(self) -> None:
         """
@@ -1156,22 +2197,28 @@ class DataFactory:
         Returns:
             None
         """
-        output_by_domain_source: Dict[str, List[str]] = {
-            source: [] for source in self.clusterCollection.domain_sources
-        }
-
-        output_files: Dict[str, str] = {
-            source: os.path.join(
-                self.dirs["main"], f"cluster_domain_annotation.{source}.txt"
+        # lines are written in the order of the clusters, a file needs at least
+        # two lines
+        writer_by_domain_source: Dict[str, LineWriter] = {
+            source: self.__open_output_file(
+                os.path.join(
+                    self.dirs["main"], f"cluster_domain_annotation.{source}.txt"
+                ),
+                sort=False,
+                min_line_count=2,
             )
             for source in self.clusterCollection.domain_sources
         }
-
-        if self.clusterCollection.functional_annotation_parsed:
-            for cluster in self.clusterCollection.cluster_list:
-                self.__process_cluster_domains(cluster, output_by_domain_source)
-
-        self.__write_domain_outputs(output_by_domain_source, output_files)
+        try:
+            if self.clusterCollection.functional_annotation_parsed:
+                for cluster in self.__iter_clusters():
+                    self.__process_cluster_domains(cluster, writer_by_domain_source)
+        except BaseException:
+            for writer in writer_by_domain_source.values():
+                writer.abort()
+            raise
+        for writer in writer_by_domain_source.values():
+            writer.close()
 
     # 5. write attribute metrics
     def __get_attribute_metrics(self, ALO: AttributeLevel) -> str:
@@ -1236,65 +2283,56 @@ class DataFactory:
 
         return "\t".join(map(str, attribute_metrics))
 
-    def __write_attribute_metrics(self) -> None:
+    def __write_attribute_metrics(self, attribute: str) -> None:
         """
-        Write attribute metrics for each attribute to respective output files.
+        Write the attribute metrics of each level of an attribute to the output
+        file named after the attribute.
 
-        This method iterates over each attribute in self.aloCollection.attributes,
-        retrieves attribute metrics for each level of the attribute, and writes them
-        to individual output files named after the attribute.
+        Args:
+            attribute (str): The attribute.
 
         Returns:
             None
 
         """
-        for attribute in self.aloCollection.attributes:
-            attribute_metrics_f = os.path.join(
-                self.dirs[attribute], f"{attribute}.attribute_metrics.txt"
-            )
-            attribute_metrics_output = []
-            levels = sorted(
-                list(self.aloCollection.ALO_by_level_by_attribute[attribute])
-            )
+        attribute_metrics_f = os.path.join(
+            self.dirs[attribute], f"{attribute}.attribute_metrics.txt"
+        )
+        levels = sorted(list(self.aloCollection.ALO_by_level_by_attribute[attribute]))
+        with SortedOutputWriter(
+            attribute_metrics_f,
+            self.__get_header_line("attribute_metrics", attribute),
+        ) as attribute_metrics_writer:
             for level in levels:
                 if ALO := self.aloCollection.ALO_by_level_by_attribute[attribute][
                     level
                 ]:
-                    attribute_metrics_output.append(self.__get_attribute_metrics(ALO))
-
-            if attribute_metrics_output:
-                with open(attribute_metrics_f, "w") as attribute_metrics_fh:
-                    logger.info(f"[STATUS] - Writing {attribute_metrics_f}")
-                    attribute_metrics_output.sort()
-                    header_line = self.__get_header_line("attribute_metrics", attribute)
-                    attribute_metrics_output.insert(0, header_line)
-                    attribute_metrics_fh.write(
-                        "\n".join(attribute_metrics_output) + "\n"
-                    )
+                    attribute_metrics_writer.add_line(self.__get_attribute_metrics(ALO))
 
     # 6. write cluster summary
-    def __write_cluster_summary(self) -> None:
+    def __write_cluster_summary(self, attribute: str) -> None:
         """
-        Write cluster summary metrics for each attribute to respective output files.
+        Write the cluster summary metrics of an attribute to the output file named
+        after the attribute, for each cluster (including inferred singletons).
 
-        This method iterates over each attribute in self.aloCollection.attributes,
-        retrieves cluster summary metrics for each cluster in self.clusterCollection.cluster_list,
-        and writes them to individual output files named after the attribute.
+        Args:
+            attribute (str): The attribute.
 
         Returns:
             None
 
         """
-        for attribute in self.aloCollection.attributes:
-            cluster_metrics_f = os.path.join(
-                self.dirs[attribute], f"{attribute}.cluster_summary.txt"
-            )
+        cluster_metrics_f = os.path.join(
+            self.dirs[attribute], f"{attribute}.cluster_summary.txt"
+        )
 
-            levels = sorted(
-                list(self.aloCollection.ALO_by_level_by_attribute[attribute])
-            )
-            cluster_metrics_output = []
-            for cluster in self.clusterCollection.cluster_list:
+        levels = sorted(list(self.aloCollection.ALO_by_level_by_attribute[attribute]))
+        with self.__open_output_file(
+            cluster_metrics_f,
+            self.__get_header_line("cluster_metrics", attribute),
+            presorted=True,
+        ) as cluster_metrics_writer:
+            for cluster in self.__iter_clusters_in_output_order():
                 cluster_metrics_line = [
                     str(cluster.cluster_id),
                     str(cluster.protein_count),
@@ -1303,14 +2341,12 @@ class DataFactory:
                     str(attribute),
                     str(cluster.cluster_type_by_attribute[attribute]),
                 ]
-                if (
-                    self.clusterCollection.fastas_parsed
-                    and cluster.protein_length_stats
-                ):
+                protein_length_stats = cluster.protein_length_stats
+                if self.clusterCollection.fastas_parsed and protein_length_stats:
                     cluster_metrics_line.extend(
                         [
-                            str(cluster.protein_length_stats.get("mean", "N/A")),
-                            str(cluster.protein_length_stats.get("sd", "N/A")),
+                            str(protein_length_stats.get("mean", "N/A")),
+                            str(protein_length_stats.get("sd", "N/A")),
                         ]
                     )
                 else:
@@ -1353,16 +2389,7 @@ class DataFactory:
                         ]
                     )
 
-                cluster_metrics_output.append("\t".join(cluster_metrics_line))
-
-            if cluster_metrics_output:
-                with open(cluster_metrics_f, "w") as cluster_metrics_fh:
-                    logger.info(f"[STATUS] - Writing {cluster_metrics_f}")
-                    cluster_metrics_output.sort()
-                    header_line = self.__get_header_line("cluster_metrics", attribute)
-                    cluster_metrics_output.insert(0, header_line)
-                    cluster_metrics_fh.write("\n".join(cluster_metrics_output) + "\n")
-                cluster_metrics_output = []
+                cluster_metrics_writer.add_line("\t".join(cluster_metrics_line))
 
     # 7. Write cluster ALO metrics
     def __get_enrichment_data(self, ALO: AttributeLevel, cluster: Cluster) -> List[str]:
@@ -1414,198 +2441,461 @@ class DataFactory:
                 - Sorted list of proteome IDs present only in cluster, or "N/A" if none
 
         """
-        ALO_proteomes_present = cluster.proteome_ids.intersection(
-            ALO.proteomes if ALO else set()
-        )
-        non_ALO_proteomes_present = cluster.proteome_ids.difference(
-            ALO.proteomes if ALO else set()
-        )
+        ALO_proteome_bitmask = ALO.proteome_bitmask if ALO else 0
+        ALO_proteomes_present = cluster.proteome_bitmask & ALO_proteome_bitmask
+        non_ALO_proteomes_present = cluster.proteome_bitmask & ~ALO_proteome_bitmask
         return [
-            f"{len(ALO_proteomes_present)}",
-            f"{len(non_ALO_proteomes_present)}",
+            f"{ALO_proteomes_present.bit_count()}",
+            f"{non_ALO_proteomes_present.bit_count()}",
             (
-                f"{','.join(sorted(list(ALO_proteomes_present)))}"
+                f"{','.join(self.aloCollection.get_proteome_ids(ALO_proteomes_present))}"
                 if ALO_proteomes_present
                 else "N/A"
             ),
             (
-                f"{','.join(sorted(list(non_ALO_proteomes_present)))}"
+                f"{','.join(self.aloCollection.get_proteome_ids(non_ALO_proteomes_present))}"
                 if non_ALO_proteomes_present
                 else "N/A"
             ),
         ]
 
-    def __write_cluster_metrics_ALO(self) -> None:
+    def __get_cluster_metrics_ALO_line(
+        self, ALO: AttributeLevel, cluster: Cluster, attribute: str, level: str
+    ) -> str:
+        """
+        Returns the line of a cluster in the cluster metrics file of an ALO.
+
+        Inferred singletons are not stored in the ALO, their status is given by
+        their proteome and they have no representation test.
+
+        Args:
+            ALO (AttributeLevel): The ALO of the file.
+            cluster (Cluster): The cluster of the line.
+            attribute (str): The attribute of the ALO.
+            level (str): The level of the ALO.
+
+        Returns:
+            str: Tab-separated metrics of the cluster.
+        """
+        if cluster.cluster_idx is None:
+            cluster_status = (
+                "present"
+                if cluster.proteome_bitmask & ALO.proteome_bitmask
+                else "absent"
+            )
+            cluster_type = "singleton"
+            mean_ALO_count = mean_non_ALO_count = None
+            enrichment_data = ["N/A", "N/A", "N/A"]
+        else:
+            cluster_status = ALO.cluster_status_by_cluster_id[cluster.cluster_id]
+            cluster_type = ALO.cluster_type_by_cluster_id[cluster.cluster_id]
+            mean_ALO_count = ALO.cluster_mean_ALO_count_by_cluster_id[
+                cluster.cluster_id
+            ]
+            mean_non_ALO_count = ALO.cluster_mean_non_ALO_count_by_cluster_id[
+                cluster.cluster_id
+            ]
+            enrichment_data = self.__get_enrichment_data(ALO, cluster)
+        return "\t".join(
+            [
+                f"{cluster.cluster_id}",
+                f"{cluster_status}",
+                f"{cluster_type}",
+                f"{cluster.protein_count}",
+                f"{cluster.proteome_count}",
+                f"{sum(cluster.protein_counts_of_proteomes_by_level_by_attribute[attribute][level])}",
+                f"{mean_ALO_count}" if mean_ALO_count else "N/A",
+                f"{mean_non_ALO_count}" if mean_non_ALO_count else "N/A",
+                *enrichment_data,
+                "{0:.2f}".format(
+                    cluster.proteome_coverage_by_level_by_attribute[attribute][level]
+                ),
+                *self.__get_proteome_data(ALO, cluster),
+            ]
+        )
+
+    def __get_cluster_metrics_ALO_lines(
+        self,
+        ALO: AttributeLevel,
+        attribute: str,
+        level: str,
+        singleton_by_proteome_idx: Dict[int, Cluster],
+    ) -> Generator[str, None, None]:
+        """
+        Yields the lines of the clusters and inferred singletons in the cluster
+        metrics file of an ALO, in output order. Lines of inferred singletons are
+        built without building their clusters.
+
+        Args:
+            ALO (AttributeLevel): The ALO of the file.
+            attribute (str): The attribute of the ALO.
+            level (str): The level of the ALO.
+            singleton_by_proteome_idx (Dict[int, Cluster]): One singleton cluster of
+                each proteome with inferred singletons.
+
+        Yields:
+            str: Tab-separated metrics of each cluster.
+        """
+        # everything after the cluster ID of a singleton only depends on the proteome
+        line_end_by_proteome_idx = {
+            proteome_idx: self.__get_cluster_metrics_ALO_line(
+                ALO, cluster, attribute, level
+            ).split("\t", 1)[1]
+            for proteome_idx, cluster in singleton_by_proteome_idx.items()
+        }
+        cluster_list = self.clusterCollection.cluster_list
+        cluster_count = len(cluster_list)
+        inferred_singletons = self.clusterCollection.inferred_singletons
+        for idx in self.__iter_output_order():
+            if idx < cluster_count:
+                yield self.__get_cluster_metrics_ALO_line(
+                    ALO, cluster_list[idx], attribute, level
+                )
+            else:
+                singleton_idx = idx - cluster_count
+                cluster_id = inferred_singletons.get_cluster_id(singleton_idx)
+                proteome_idx = int(inferred_singletons.proteome_idxs[singleton_idx])
+                yield f"{cluster_id}\t{line_end_by_proteome_idx[proteome_idx]}"
+
+    def __get_singleton_by_proteome_idx(self) -> Dict[int, Cluster]:
+        """
+        Returns one inferred singleton of each proteome with inferred singletons,
+        the rows of the others only differ by ID.
+
+        Returns:
+            Dict[int, Cluster]: Singleton cluster by proteome index.
         """
-        Write cluster metrics for each attribute level object (ALO) to separate files.
+        inferred_singletons = self.clusterCollection.inferred_singletons
+        if not inferred_singletons:
+            return {}
+        proteome_idxs, singleton_idxs = np.unique(
+            inferred_singletons.proteome_idxs, return_index=True
+        )
+        return {
+            proteome_idx: self.__get_inferred_singleton(singleton_idx)
+            for proteome_idx, singleton_idx in zip(
+                proteome_idxs.tolist(), singleton_idxs.tolist()
+            )
+        }
 
-        For each attribute in self.aloCollection.attributes, this method writes cluster metrics
-        to a file named '{attribute}.{level}.cluster_metrics.txt' in the corresponding directory
-        under self.dirs[attribute].
+    def __write_cluster_metrics_ALO(self, attribute: str, level: str) -> None:
+        """
+        Write the cluster metrics of an attribute level object (ALO) to a file named
+        '{attribute}.{level}.cluster_metrics.txt' in the directory under
+        self.dirs[attribute].
 
         Metrics include cluster ID, status, type, protein count, proteome count, counts by level,
         mean ALO counts, mean non-ALO counts, enrichment data, and proteome coverage.
 
+        Args:
+            attribute (str): The attribute of the ALO.
+            level (str): The level of the ALO.
+
         Returns:
             None
         """
-        for attribute in self.aloCollection.attributes:
-            levels = sorted(
-                list(self.aloCollection.ALO_by_level_by_attribute[attribute])
+        ALO = self.aloCollection.ALO_by_level_by_attribute[attribute][level]
+        if ALO is None:
+            return
+        cluster_metrics_ALO_f = os.path.join(
+            self.dirs[attribute], f"{attribute}.{level}.cluster_metrics.txt"
+        )
+        with self.__open_output_file(
+            cluster_metrics_ALO_f,
+            self.__get_header_line("cluster_metrics_ALO", attribute),
+            presorted=True,
+        ) as cluster_metrics_ALO_writer:
+            cluster_metrics_ALO_writer.add_lines(
+                self.__get_cluster_metrics_ALO_lines(
+                    ALO, attribute, level, self.__get_singleton_by_proteome_idx()
+                )
             )
 
-            for level in levels:
-                ALO = self.aloCollection.ALO_by_level_by_attribute[attribute][level]
-                cluster_metrics_ALO_f = os.path.join(
-                    self.dirs[attribute], f"{attribute}.{level}.cluster_metrics.txt"
-                )
-                if ALO is None:
+    def __get_cluster_metrics_ALO_long_line(
+        self, ALO: AttributeLevel, cluster: Cluster, attribute: str, level: str
+    ) -> str:
+        """
+        Returns the line of a cluster present in an ALO in the long-format cluster
+        metrics file of its attribute: its line in the file of the ALO (see
+        __get_cluster_metrics_ALO_line) with the level instead of the status.
+
+        Args:
+            ALO (AttributeLevel): The ALO of the line.
+            cluster (Cluster): The cluster of the line.
+            attribute (str): The attribute of the ALO.
+            level (str): The level of the ALO.
+
+        Returns:
+            str: Tab-separated metrics of the cluster.
+        """
+        cluster_id, _, line_end = self.__get_cluster_metrics_ALO_line(
+            ALO, cluster, attribute, level
+        ).split("\t", 2)
+        return f"{cluster_id}\t{level}\t{line_end}"
+
+    def __write_cluster_metrics_ALO_long(self, attribute: str) -> None:
+        """
+        Write the cluster metrics of the ALOs of an attribute to a long-format file
+        named '{attribute}.cluster_metrics.long.txt' in the directory under
+        self.dirs[attribute], with an offset index (see write_offset_index).
+
+        Rows are those of the files of each level (see __write_cluster_metrics_ALO)
+        for the levels a cluster is present in, with the level following the
+        cluster ID instead of the cluster status, in output order of the clusters
+        and order of the levels. Absent clusters have no rows.
+
+        Args:
+            attribute (str): The attribute of the ALOs.
+
+        Returns:
+            None
+        """
+        ALO_by_level = [
+            (level, ALO)
+            for level, ALO in sorted(
+                self.aloCollection.ALO_by_level_by_attribute[attribute].items()
+            )
+            if ALO is not None
+        ]
+        cluster_metrics_ALO_long_f = os.path.join(
+            self.dirs[attribute], f"{attribute}.cluster_metrics{LONG_FORMAT_SUFFIX}"
+        )
+        # everything after the cluster ID of a singleton only depends on the proteome
+        line_ends_by_proteome_idx = {
+            proteome_idx: [
+                self.__get_cluster_metrics_ALO_long_line(
+                    ALO, cluster, attribute, level
+                ).split("\t", 1)[1]
+                for level, ALO in ALO_by_level
+                if cluster.proteome_bitmask & ALO.proteome_bitmask
+            ]
+            for proteome_idx, cluster in self.__get_singleton_by_proteome_idx().items()
+        }
+
+        def get_lines() -> Generator[str, None, None]:
+            cluster_list = self.clusterCollection.cluster_list
+            cluster_count = len(cluster_list)
+            inferred_singletons = self.clusterCollection.inferred_singletons
+            for idx in self.__iter_output_order():
+                if idx < cluster_count:
+                    cluster = cluster_list[idx]
+                    for level, ALO in ALO_by_level:
+                        if cluster.proteome_bitmask & ALO.proteome_bitmask:
+                            yield self.__get_cluster_metrics_ALO_long_line(
+                                ALO, cluster, attribute, level
+                            )
+                else:
+                    singleton_idx = idx - cluster_count
+                    cluster_id = inferred_singletons.get_cluster_id(singleton_idx)
+                    proteome_idx = int(inferred_singletons.proteome_idxs[singleton_idx])
+                    for line_end in line_ends_by_proteome_idx[proteome_idx]:
+                        yield f"{cluster_id}\t{line_end}"
+
+        self.__write_long_format_output(
+            cluster_metrics_ALO_long_f,
+            self.__get_header_line("cluster_metrics_ALO_long", attribute),
+            get_lines(),
+        )
+
+    def __write_long_format_output(
+        self, output_f: str, header_line: str, lines: Iterable[str]
+    ) -> None:
+        """
+        Writes a long-format output, with lines in output order of the clusters,
+        and its offset index once complete. When clusters are analysed in chunks,
+        the index is written when the output is merged (see __write_spill_file).
+
+        Args:
+            output_f (str): Path of the output file.
+            header_line (str): Line written before all others.
+            lines (Iterable[str]): Lines, starting with cluster ID and level.
+
+        Returns:
+            None
+        """
+        long_format_writer = self.__open_output_file(
+            output_f, header_line, presorted=True
+        )
+        try:
+            long_format_writer.add_lines(lines)
+        except BaseException:
+            long_format_writer.abort()
+            raise
+        if long_format_writer.close():
+            write_offset_index(output_f)
+
+    # 8. write cluster 1to1 ALO
+    def __get_cluster_1to1_types_by_cluster_id(
+        self, ALO: AttributeLevel
+    ) -> Dict[str, Tuple[str, str]]:
+        """
+        Returns the cluster type and cardinality of the clusters of an ALO, which
+        are listed by type and cardinality.
+
+        Args:
+            ALO (AttributeLevel): The ALO.
+
+        Returns:
+            Dict[str, Tuple[str, str]]: Cluster type and cardinality by cluster ID.
+        """
+        return {
+            cluster_id: (cluster_type, cluster_cardinality)
+            for cluster_type, cluster_ids_by_cardinality in ALO.clusters_by_cluster_cardinality_by_cluster_type.items()
+            for cluster_cardinality, cluster_ids in cluster_ids_by_cardinality.items()
+            for cluster_id in cluster_ids
+        }
+
+    def __get_cluster_1to1_ALO_fields(
+        self, cluster: Cluster, cluster_type: str, cluster_cardinality: str
+    ) -> List[str]:
+        """
+        Returns the fields after the cluster ID of a line of the cluster 1-to-1s
+        file of an ALO.
+
+        Args:
+            cluster (Cluster): The cluster of the line.
+            cluster_type (str): Type of the cluster in the ALO.
+            cluster_cardinality (str): Cardinality of the cluster in the ALO.
+
+        Returns:
+            List[str]: Type, cardinality, proteome count and fuzzy count ratio.
+        """
+        _, protein_counts = self.clusterCollection.cluster_matrix.get_row(
+            cluster.cluster_idx
+        )
+        proteome_count = cluster.proteome_count
+
+        fuzzy_proteome_ratio = (
+            int(np.count_nonzero(protein_counts == self.inputData.fuzzy_count))
+            / proteome_count
+        )
+        return [
+            str(cluster_type),
+            str(cluster_cardinality),
+            str(proteome_count),
+            "{0:.2f}".format(fuzzy_proteome_ratio),
+        ]
+
+    def __write_cluster_1to1_ALO(self, attribute: str, level: str) -> None:
+        """
+        Write the cluster 1-to-1 relationships of an attribute level object (ALO) to
+        a file named '{attribute}.{level}.cluster_1to1s.txt' in the directory under
+        self.dirs[attribute].
+
+        Relationships include cluster ID, type, cardinality, proteome count, and fuzzy count ratio.
+
+        Args:
+            attribute (str): The attribute of the ALO.
+            level (str): The level of the ALO.
+
+        Returns:
+            None
+        """
+        cluster_1to1_ALO_f = os.path.join(
+            self.dirs[attribute], f"{attribute}.{level}.cluster_1to1s.txt"
+        )
+        ALO = self.aloCollection.ALO_by_level_by_attribute[attribute][level]
+        if attribute.lower() == "taxon" or not ALO:
+            return
+
+        # the clusters of the ALO are listed by type and cardinality, their
+        # lines are written in output order instead
+        cluster_type_and_cardinality_by_cluster_id = (
+            self.__get_cluster_1to1_types_by_cluster_id(ALO)
+        )
+        cluster_list = self.clusterCollection.cluster_list
+        cluster_count = len(cluster_list)
+        with self.__open_output_file(
+            cluster_1to1_ALO_f,
+            self.__get_header_line("cluster_1to1s_ALO", attribute),
+            presorted=True,
+        ) as cluster_1to1_ALO_writer:
+            for idx in self.__iter_output_order():
+                if idx >= cluster_count:
                     continue
-                cluster_metrics_ALO_output = [
+                cluster = cluster_list[idx]
+                if cluster.cluster_id not in cluster_type_and_cardinality_by_cluster_id:
+                    continue
+                cluster_1to1_ALO_writer.add_line(
                     "\t".join(
                         [
-                            f"{cluster.cluster_id}",
-                            (
-                                f"{ALO.cluster_status_by_cluster_id[cluster.cluster_id]}"
-                                if ALO
-                                else "N/A"
-                            ),
-                            (
-                                f"{ALO.cluster_type_by_cluster_id[cluster.cluster_id]}"
-                                if ALO
-                                else "N/A"
-                            ),
-                            f"{cluster.protein_count}",
-                            f"{cluster.proteome_count}",
-                            f"{sum(cluster.protein_counts_of_proteomes_by_level_by_attribute[attribute][level])}",
-                            (
-                                f"{ALO.cluster_mean_ALO_count_by_cluster_id[cluster.cluster_id]}"
-                                if ALO
-                                and ALO.cluster_mean_ALO_count_by_cluster_id[
-                                    cluster.cluster_id
-                                ]
-                                else "N/A"
-                            ),
-                            (
-                                f"{ALO.cluster_mean_non_ALO_count_by_cluster_id[cluster.cluster_id]}"
-                                if ALO
-                                and ALO.cluster_mean_non_ALO_count_by_cluster_id[
+                            str(cluster.cluster_id),
+                            *self.__get_cluster_1to1_ALO_fields(
+                                cluster,
+                                *cluster_type_and_cardinality_by_cluster_id[
                                     cluster.cluster_id
-                                ]
-                                else "N/A"
-                            ),
-                            *self.__get_enrichment_data(ALO, cluster),
-                            "{0:.2f}".format(
-                                cluster.proteome_coverage_by_level_by_attribute[
-                                    attribute
-                                ][level]
+                                ],
                             ),
-                            *self.__get_proteome_data(ALO, cluster),
                         ]
                     )
-                    for cluster in self.clusterCollection.cluster_list
-                ]
-                if cluster_metrics_ALO_output:
-                    with open(cluster_metrics_ALO_f, "w") as cluster_metrics_ALO_fh:
-                        logger.info(f"[STATUS] - Writing {cluster_metrics_ALO_f}")
-                        cluster_metrics_ALO_output.sort()
-
-                        header_line = self.__get_header_line(
-                            "cluster_metrics_ALO", attribute
-                        )
-                        cluster_metrics_ALO_output.insert(0, header_line)
-                        cluster_metrics_ALO_fh.write(
-                            "\n".join(cluster_metrics_ALO_output) + "\n"
-                        )
+                )
 
-    # 8. write cluster 1to1 ALO
-    def __write_cluster_1to1_ALO(self) -> None:
+    def __write_cluster_1to1_ALO_long(self, attribute: str) -> None:
         """
-        Write cluster 1-to-1 relationships for each attribute level object (ALO) to separate files.
+        Write the cluster 1-to-1 relationships of the ALOs of an attribute to a
+        long-format file named '{attribute}.cluster_1to1s.long.txt' in the
+        directory under self.dirs[attribute], with an offset index.
 
-        For each attribute in self.aloCollection.attributes, this method writes cluster 1-to-1
-        relationships to a file named '{attribute}.{level}.cluster_1to1s.txt' in the corresponding
-        directory under self.dirs[attribute].
+        Rows are those of the files of each level (see __write_cluster_1to1_ALO),
+        with the level following the cluster ID, in output order of the clusters
+        and order of the levels.
 
-        Relationships include cluster ID, type, cardinality, proteome count, and fuzzy count ratio.
+        Args:
+            attribute (str): The attribute of the ALOs.
 
         Returns:
             None
         """
-        for attribute in self.aloCollection.attributes:
-            levels = sorted(
-                list(self.aloCollection.ALO_by_level_by_attribute[attribute])
-            )
-            for level in levels:
-                cluster_1to1_ALO_f = os.path.join(
-                    self.dirs[attribute], f"{attribute}.{level}.cluster_1to1s.txt"
+        if attribute.lower() == "taxon":
+            return
+        cluster_1to1_ALO_long_f = os.path.join(
+            self.dirs[attribute], f"{attribute}.cluster_1to1s{LONG_FORMAT_SUFFIX}"
+        )
+        level_type_and_cardinality_by_cluster_id: Dict[
+            str, List[Tuple[str, str, str]]
+        ] = defaultdict(list)
+        for level, ALO in sorted(
+            self.aloCollection.ALO_by_level_by_attribute[attribute].items()
+        ):
+            if not ALO:
+                continue
+            for cluster_id, (
+                cluster_type,
+                cluster_cardinality,
+            ) in self.__get_cluster_1to1_types_by_cluster_id(ALO).items():
+                level_type_and_cardinality_by_cluster_id[cluster_id].append(
+                    (level, cluster_type, cluster_cardinality)
                 )
-                cluster_1to1_ALO_output = []
-
-                ALO = self.aloCollection.ALO_by_level_by_attribute[attribute][level]
-
-                if attribute.lower() != "taxon" and ALO:
-                    for (
-                        cluster_type
-                    ) in ALO.clusters_by_cluster_cardinality_by_cluster_type:
-                        for (
-                            cluster_cardinality
-                        ) in ALO.clusters_by_cluster_cardinality_by_cluster_type[
-                            cluster_type
-                        ]:
-                            for (
-                                cluster_id
-                            ) in ALO.clusters_by_cluster_cardinality_by_cluster_type[
-                                cluster_type
-                            ][
-                                cluster_cardinality
-                            ]:
-                                cluster = (
-                                    self.clusterCollection.cluster_list_by_cluster_id[
-                                        cluster_id
-                                    ]
-                                )
-                                protein_count_by_proteome = (
-                                    cluster.protein_count_by_proteome_id
-                                )
-                                proteome_count = cluster.proteome_count
-
-                                fuzzy_proteome_ratio = (
-                                    len(
-                                        [
-                                            protein_count
-                                            for _, protein_count in protein_count_by_proteome.items()
-                                            if protein_count
-                                            == self.inputData.fuzzy_count
-                                        ]
-                                    )
-                                    / proteome_count
-                                )
-
-                                cluster_1to1_ALO_line = "\t".join(
-                                    [
-                                        str(cluster_id),
-                                        str(cluster_type),
-                                        str(cluster_cardinality),
-                                        str(proteome_count),
-                                        "{0:.2f}".format(fuzzy_proteome_ratio),
-                                    ]
-                                )
 
-                                cluster_1to1_ALO_output.append(cluster_1to1_ALO_line)
+        def get_lines() -> Generator[str, None, None]:
+            cluster_list = self.clusterCollection.cluster_list
+            cluster_count = len(cluster_list)
+            for idx in self.__iter_output_order():
+                if idx >= cluster_count:
+                    continue
+                cluster = cluster_list[idx]
+                for (
+                    level,
+                    cluster_type,
+                    cluster_cardinality,
+                ) in level_type_and_cardinality_by_cluster_id.get(
+                    cluster.cluster_id, []
+                ):
+                    yield "\t".join(
+                        [
+                            str(cluster.cluster_id),
+                            level,
+                            *self.__get_cluster_1to1_ALO_fields(
+                                cluster, cluster_type, cluster_cardinality
+                            ),
+                        ]
+                    )
 
-                if cluster_1to1_ALO_output:
-                    with open(cluster_1to1_ALO_f, "w") as cluster_1to1_ALO_fh:
-                        logger.info(f"[STATUS] - Writing {cluster_1to1_ALO_f}")
-                        cluster_1to1_ALO_output.sort()
-                        header_line = self.__get_header_line(
-                            "cluster_1to1s_ALO", attribute
-                        )
-                        cluster_1to1_ALO_output.insert(0, header_line)
-                        cluster_1to1_ALO_fh.write(
-                            "\n".join(cluster_1to1_ALO_output) + "\n"
-                        )
-                    cluster_1to1_ALO_output = []
+        self.__write_long_format_output(
+            cluster_1to1_ALO_long_f,
+            self.__get_header_line("cluster_1to1s_ALO_long", attribute),
+            get_lines(),
+        )
 
     # 9. write_pairwise_representation
     def __process_background_representation(
@@ -1614,23 +2904,23 @@ class DataFactory:
         level: str,
         ALO: AttributeLevel,
         cluster: Cluster,
-        background_representation_test_by_pair_by_attribute,
     ) -> None:
         """
-        Process and append background representation test results for a cluster and attribute level.
+        Store the background representation test result of a cluster and attribute
+        level for the volcano plots.
 
         Args:
             attribute (str): The attribute name.
             level (str): The attribute level.
             ALO (AttributeLevel): The AttributeLevel object for the attribute and level.
             cluster (Cluster): The Cluster object representing the cluster.
-            background_representation_test_by_pair_by_attribute (Dict[str, Dict[str, Any]]):
-                A nested dictionary to store background representation test results,
-                structured as [attribute][background_pair] = list of test results.
 
         Returns:
             None
         """
+        background_representation_test_by_pair_by_attribute = (
+            self.background_representation_test_by_pair_by_attribute
+        )
         background_pair = (level, "background")
         if attribute not in background_representation_test_by_pair_by_attribute:
             background_representation_test_by_pair_by_attribute[attribute] = {}
@@ -1642,18 +2932,14 @@ class DataFactory:
                 background_pair
             ] = []
 
-        background_representation_test = [
-            cluster.cluster_id,
-            level,
-            "background",
-            ALO.cluster_mean_ALO_count_by_cluster_id[cluster.cluster_id],
-            ALO.cluster_mean_non_ALO_count_by_cluster_id[cluster.cluster_id],
-            ALO.cluster_mwu_log2_mean_by_cluster_id[cluster.cluster_id],
-            ALO.cluster_mwu_pvalue_by_cluster_id[cluster.cluster_id],
-        ]
         background_representation_test_by_pair_by_attribute[attribute][
             background_pair
-        ].append(background_representation_test)
+        ].append(
+            (
+                ALO.cluster_mwu_log2_mean_by_cluster_id[cluster.cluster_id],
+                ALO.cluster_mwu_pvalue_by_cluster_id[cluster.cluster_id],
+            )
+        )
 
     def __get_pairwise_representation_test(
         self,
@@ -1664,7 +2950,7 @@ class DataFactory:
         levels: List[str],
     ) -> Generator[List[Any], None, None]:
         """
-        Generate pairwise representation test results for a cluster and attribute level.
+        Generate the pairwise representation tests for a cluster and attribute level.
 
         Args:
             cluster (Cluster): The Cluster object representing the cluster.
@@ -1674,15 +2960,13 @@ class DataFactory:
             levels (List[str]): A list of all attribute levels.
 
         Yields:
-            Generator[List[Any], None, None]: A generator yielding lists containing pairwise representation test results.
-                Each list includes:
+            Generator[List[Any], None, None]: A generator yielding lists describing a pairwise
+                representation test to be run. Each list includes:
                 - cluster.cluster_id: ID of the cluster.
                 - level: Current attribute level.
                 - other_level: Another attribute level being compared with `level`.
-                - mean_ALO_count: Mean count of ALOs in the cluster at `level`.
-                - mean_non_ALO_count: Mean count of non-ALOs in the cluster at `level`.
-                - mwu_log2_mean: Log2 mean of the Mann-Whitney U test results between `level` and `other_level`.
-                - mwu_pvalue: P-value of the Mann-Whitney U test results between `level` and `other_level`.
+                - protein_counts_level: Non-zero protein counts of proteomes in `level`.
+                - protein_counts_other_level: Non-zero protein counts of proteomes in `other_level`.
         """
         for other_level in set(levels).difference(levels_seen):
             if other_level != level:
@@ -1691,7 +2975,10 @@ class DataFactory:
                 ]
                 if (
                     other_ALO
-                    and len(cluster.proteome_ids.intersection(other_ALO.proteomes)) >= 2
+                    and (
+                        cluster.proteome_bitmask & other_ALO.proteome_bitmask
+                    ).bit_count()
+                    >= 2
                 ):
                     protein_counts_level = [
                         count
@@ -1712,86 +2999,67 @@ class DataFactory:
                         if count > 0
                     ]
                     if protein_counts_level and protein_counts_other_level:
-                        (
-                            mwu_pvalue,
-                            mwu_log2_mean,
-                            mean_ALO_count,
-                            mean_non_ALO_count,
-                        ) = statistic(
-                            protein_counts_level,
-                            protein_counts_other_level,
-                            self.inputData.test,
-                            self.inputData.min_proteomes,
-                        )
                         yield [
                             cluster.cluster_id,
                             level,
                             other_level,
-                            mean_ALO_count,
-                            mean_non_ALO_count,
-                            mwu_log2_mean,
-                            mwu_pvalue,
+                            protein_counts_level,
+                            protein_counts_other_level,
                         ]
-                        # pvalue = None
-                        # try:
-                        #     pvalue = scipy.stats.mannwhitneyu(protein_counts_level, protein_counts_other_level, alternative="two-sided")[1]
-                        # except:
-                        #     pvalue = 1.0
-                        # mean_level = mean(protein_counts_level)
-                        # mean_other_level = mean(protein_counts_other_level)
-                        # log2fc_mean = log((mean_level/mean_other_level), 2)
-                        # yield [cluster.cluster_id, level, other_level, mean_level,
-                        # mean_other_level, log2fc_mean, pvalue]
 
     def __process_pairwise_representation(
         self,
         attribute: str,
-        level: str,
-        levels_seen: Set[str],
-        levels: List[str],
-        cluster: Cluster,
-        pairwise_representation_test_by_pair_by_attribute,
-        pairwise_representation_test_output: List[str],
+        pairwise_representation_tests: List[List[Any]],
+        pairwise_representation_test_writer: LineWriter,
     ) -> None:
         """
-        Process pairwise representation tests for a specific attribute level and cluster.
+        Run a batch of pairwise representation tests of an attribute and store the
+        results (log2 mean and p-value by pair of levels, for the volcano plots).
 
         Args:
             attribute (str): The attribute name.
-            level (str): The current attribute level.
-            levels_seen (Set[str]): A set of attribute levels already processed.
-            levels (List[str]): A list of all attribute levels.
-            cluster (Cluster): The Cluster object representing the cluster.
-            pairwise_representation_test_by_pair_by_attribute (Dict[str, Dict[Tuple[str, str], List[List[Any]]]]):
-                Dictionary storing pairwise representation test results by attribute and pair of levels.
-            pairwise_representation_test_output (List[str]): List to store formatted output lines of pairwise tests.
+            pairwise_representation_tests (List[List[Any]]): Tests as generated by
+                `__get_pairwise_representation_test`.
+            pairwise_representation_test_writer (LineWriter): Writer of the formatted output lines of pairwise tests.
 
         Returns:
             None
         """
-        for result in self.__get_pairwise_representation_test(
-            cluster, attribute, level, levels_seen, levels
-        ):
-            if attribute not in pairwise_representation_test_by_pair_by_attribute:
-                pairwise_representation_test_by_pair_by_attribute[attribute] = {}
-            pair = (result[1], result[2])
-            if pair not in pairwise_representation_test_by_pair_by_attribute[attribute]:
-                pairwise_representation_test_by_pair_by_attribute[attribute][pair] = []
-            pairwise_representation_test_by_pair_by_attribute[attribute][pair].append(
-                result
+        results = batch_statistic(
+            counts_1=[test[3] for test in pairwise_representation_tests],
+            counts_2=[test[4] for test in pairwise_representation_tests],
+            test=self.inputData.test,
+            min_proteomes=self.inputData.min_proteomes,
+        )
+        for (cluster_id, level, other_level, _, _), (
+            mwu_pvalue,
+            mwu_log2_mean,
+            mean_ALO_count,
+            mean_non_ALO_count,
+        ) in zip(pairwise_representation_tests, results):
+            pairwise_representation_test_by_pair = (
+                self.pairwise_representation_test_by_pair_by_attribute.setdefault(
+                    attribute, {}
+                )
             )
+            pairwise_representation_test_by_pair.setdefault(
+                (level, other_level), []
+            ).append((mwu_log2_mean, mwu_pvalue))
 
-            pairwise_representation_test_output.append(
-                f"{result[0]}\t{result[1]}\t{result[3]}\t{result[2]}\t{result[4]}\t{result[5]}\t{result[6]}"
+            pairwise_representation_test_writer.add_line(
+                f"{cluster_id}\t{level}\t{mean_ALO_count}\t{other_level}\t{mean_non_ALO_count}\t{mwu_log2_mean}\t{mwu_pvalue}"
             )
 
-    # 9.5 __plot_count_comparisons_volcano
-    def __prepare_data(self, pair_data: List[str]) -> Tuple[List[float], List[float]]:
+    # 9.5 __plot_volcano
+    def __prepare_data(
+        self, pair_data: List[Tuple[float, float]]
+    ) -> Tuple[List[float], List[float]]:
         """
         Prepare data from pair_data into lists of p-values and log2 fold change (log2fc) values.
 
         Args:
-            pair_data (List[str]): List of strings containing data for each pair.
+            pair_data (List[Tuple[float, float]]): log2 mean and p-value of each test of the pair.
 
         Returns:
             Tuple[List[float], List[float]]: Tuple containing:
@@ -1802,9 +3070,10 @@ class DataFactory:
         p_values: List[float] = []
         log2fc_values: List[float] = []
 
-        for data in pair_data:
-            log2fc_values.append(float(data[5]))
-            pvalue = data[6] if data[6] != 0.0 else 0.01 / (pair_data_count + 1)
+        for log2_mean, pvalue in pair_data:
+            log2fc_values.append(float(log2_mean))
+            if pvalue == 0.0:
+                pvalue = 0.01 / (pair_data_count + 1)
             p_values.append(float(pvalue))
 
         return p_values, log2fc_values
@@ -1993,74 +3262,73 @@ class DataFactory:
         )
         legend.get_frame().set_facecolor("white")
 
-    def __plot_count_comparisons_volcano(
+    def __plot_volcano(
         self,
-        pairwise_representation_test_by_pair_by_attribute,
+        attribute: str,
+        level: str,
+        other_level: str,
+        p_values: List[float],
+        log2fc_values: List[float],
     ) -> None:
         """
-        Generate volcano plots for count comparisons based on pairwise representation test results.
+        Generate the volcano plot of the representation tests of a pair of levels.
 
         Parameters:
-        - pairwise_representation_test_by_pair_by_attribute (Dict[str, Dict[Tuple[str, str], Any]]):
-        Dictionary containing test results organized by attribute and pair.
+        - attribute (str): Attribute of the levels.
+        - level (str): Level tested.
+        - other_level (str): Level (or 'background') it is tested against.
+        - p_values (List[float]): p-values of the tests, see __prepare_data.
+        - log2fc_values (List[float]): log2 fold changes of the tests.
 
         Returns:
         - None
         """
-        for attribute in pairwise_representation_test_by_pair_by_attribute:
-            for pair in pairwise_representation_test_by_pair_by_attribute[attribute]:
-                pair_list = list(pair)
-                pair_data = pairwise_representation_test_by_pair_by_attribute[
-                    attribute
-                ][pair]
-
-                p_values, log2fc_values = self.__prepare_data(pair_data)
-
-                if p_values:
-                    output_file = self.__get_output_filename(attribute, pair_list)
-                    self.__create_volcano_plot(
-                        p_values, log2fc_values, pair_list, output_file
-                    )
+        pair_list = [level, other_level]
+        self.__create_volcano_plot(
+            p_values,
+            log2fc_values,
+            pair_list,
+            self.__get_output_filename(attribute, pair_list),
+        )
 
-    def __write_pairwise_representation(self) -> None:
+    def __write_pairwise_representation(self, attribute: str) -> None:
         """
-        Process pairwise representation tests, write results, and generate volcano plots.
+        Process pairwise representation tests of an attribute and write results.
 
-        Iterates through attributes in `self.aloCollection.attributes` and performs the
-        following steps for each attribute:
-        1. Initializes dictionaries `pairwise_representation_test_by_pair_by_attribute`
-        and `background_representation_test_by_pair_by_attribute`.
-        2. Prepares output file path (`pairwise_representation_test_f`) and header line
+        Performs the following steps for the attribute:
+        1. Prepares output file path (`pairwise_representation_test_f`) and header line
         (`pairwise_representation_test_output`) for pairwise representation test results.
-        3. Retrieves sorted levels from `self.aloCollection.ALO_by_level_by_attribute[attribute]`.
-        4. Iterates through each level and processes pairwise and background representation
-        tests for each cluster in `self.clusterCollection.cluster_list`.
-        5. Generates volcano plots using `__plot_count_comparisons_volcano` for
-        `background_representation_test_by_pair_by_attribute` if available.
-        6. Writes pairwise representation test results to `pairwise_representation_test_f`
+        2. Retrieves sorted levels from `self.aloCollection.ALO_by_level_by_attribute[attribute]`.
+        3. Iterates through each level and processes pairwise and background representation
+        tests for each cluster in `self.clusterCollection.cluster_list`. The pairwise
+        tests of a level are collected over all clusters and run as one batch.
+        4. Writes pairwise representation test results to `pairwise_representation_test_f`
         if data is available.
-        7. Generates volcano plots using `__plot_count_comparisons_volcano` for
-        `pairwise_representation_test_by_pair_by_attribute` if data is available.
+
+        Results are also stored for the volcano plots, which are generated by
+        `__plot_volcano` once all clusters have been processed.
+
+        Args:
+            attribute (str): The attribute.
 
         Returns:
         - None
         """
-        for attribute in self.aloCollection.attributes:
-            pairwise_representation_test_by_pair_by_attribute: Dict[
-                str, Dict[str, str]
-            ] = {}
-            background_representation_test_by_pair_by_attribute = {}
-            pairwise_representation_test_output = []
-            pairwise_representation_test_f = os.path.join(
-                self.dirs[attribute], f"{attribute}.pairwise_representation_test.txt"
-            )
-            levels = sorted(
-                list(self.aloCollection.ALO_by_level_by_attribute[attribute])
-            )
-            levels_seen: Set[str] = set()
+        pairwise_representation_test_f = os.path.join(
+            self.dirs[attribute], f"{attribute}.pairwise_representation_test.txt"
+        )
+        levels = sorted(list(self.aloCollection.ALO_by_level_by_attribute[attribute]))
+        levels_seen: Set[str] = set()
+
+        # tests are run level by level, so lines are not in cluster order
+        with self.__open_output_file(
+            pairwise_representation_test_f,
+            self.__get_header_line("pairwise_representation_test", attribute),
+        ) as pairwise_representation_test_writer:
 
             for level in levels:
                 ALO = self.aloCollection.ALO_by_level_by_attribute[attribute][level]
+                pairwise_representation_tests: List[List[Any]] = []
 
                 for cluster in self.clusterCollection.cluster_list:
                     if (
@@ -2070,53 +3338,28 @@ class DataFactory:
                         and ALO.cluster_mwu_log2_mean_by_cluster_id[cluster.cluster_id]
                     ):
                         self.__process_background_representation(
-                            attribute,
-                            level,
-                            ALO,
-                            cluster,
-                            background_representation_test_by_pair_by_attribute,
+                            attribute, level, ALO, cluster
                         )
 
-                    ALO_proteomes_present = cluster.proteome_ids.intersection(
-                        ALO.proteomes if ALO else set("")
+                    ALO_proteomes_present = cluster.proteome_bitmask & (
+                        ALO.proteome_bitmask if ALO else 0
                     )
 
                     if (
                         len(levels) > 1
-                        and len(ALO_proteomes_present) >= self.inputData.min_proteomes
+                        and ALO_proteomes_present.bit_count()
+                        >= self.inputData.min_proteomes
                     ):
-                        self.__process_pairwise_representation(
-                            attribute,
-                            level,
-                            levels_seen,
-                            levels,
-                            cluster,
-                            pairwise_representation_test_by_pair_by_attribute,
-                            pairwise_representation_test_output,
+                        pairwise_representation_tests.extend(
+                            self.__get_pairwise_representation_test(
+                                cluster, attribute, level, levels_seen, levels
+                            )
                         )
 
-                levels_seen.add(level)
-
-                if background_representation_test_by_pair_by_attribute:
-                    self.__plot_count_comparisons_volcano(
-                        background_representation_test_by_pair_by_attribute
-                    )
-
-            if pairwise_representation_test_output:
-                with open(
-                    pairwise_representation_test_f, "w"
-                ) as pairwise_representation_test_fh:
-                    logger.info(f"[STATUS] - Writing {pairwise_representation_test_f}")
-                    pairwise_representation_test_output.sort()
-                    header_line = self.__get_header_line(
-                        "pairwise_representation_test", attribute
+                if pairwise_representation_tests:
+                    self.__process_pairwise_representation(
+                        attribute,
+                        pairwise_representation_tests,
+                        pairwise_representation_test_writer,
                     )
-                    pairwise_representation_test_output.insert(0, header_line)
-                    pairwise_representation_test_fh.write(
-                        "\n".join(pairwise_representation_test_output) + "\n"
-                    )
-
-            if pairwise_representation_test_by_pair_by_attribute:
-                self.__plot_count_comparisons_volcano(
-                    pairwise_representation_test_by_pair_by_attribute
-                )
+                levels_seen.add(level)
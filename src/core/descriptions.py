@@ -0,0 +1,106 @@
+import logging
+import os
+import sqlite3
+from typing import Callable, Dict, List, Optional
+
+from core.sqlite_index import connect_sqlite_index, open_sqlite_index
+
+logger = logging.getLogger("kinfin_logger")
+
+# bump when the layout of the index changes
+DESCRIPTION_INDEX_VERSION = 1
+
+
+class DescriptionStore:
+    """
+    Descriptions of domain IDs from a mapping file (Pfam, InterPro or GO), looked
+    up on demand in a SQLite index.
+
+    The index is compiled once next to the mapping file (as '<mapping_f>.sqlite')
+    with the parser of the mapping file, which validates it, and recompiled when
+    the file changes. Lookups are memoized. Behaves like the dictionary returned
+    by the parser, for get().
+
+    Lookups can be made from processes forked after the store was created (e.g.
+    output workers), which open their own connection to the index.
+    """
+
+    def __init__(
+        self,
+        mapping_f: str,
+        parse_mapping: Callable[[str], Dict[str, str]],
+        index_f: Optional[str] = None,
+    ) -> None:
+        """
+        Args:
+            mapping_f (str): Path to the mapping file.
+            parse_mapping (Callable[[str], Dict[str, str]]): Parser of the mapping
+                file, e.g. parse_pfam_mapping.
+            index_f (Optional[str]): Path of the index [default: next to mapping_f].
+
+        Raises:
+            OSError, sqlite3.Error: If there is no up to date index and it cannot be built.
+            ValueError: If the mapping file has conflicting descriptions.
+        """
+
+        def fill_index(connection: sqlite3.Connection) -> None:
+            connection.execute(
+                "CREATE TABLE descriptions (domain_id TEXT PRIMARY KEY, description TEXT) WITHOUT ROWID"
+            )
+            connection.executemany(
+                "INSERT INTO descriptions VALUES (?, ?)",
+                parse_mapping(mapping_f).items(),
+            )
+
+        self.index_f: str = index_f or f"{mapping_f}.sqlite"
+        self.connection: sqlite3.Connection = open_sqlite_index(
+            mapping_f, self.index_f, DESCRIPTION_INDEX_VERSION, fill_index
+        )
+        # process in which the connection was opened
+        self.connection_pid: int = os.getpid()
+        # connections opened by parent processes, never used nor closed here
+        self.inherited_connections: List[sqlite3.Connection] = []
+        self.description_by_domain_id: Dict[str, Optional[str]] = {}
+
+    def get(self, domain_id: str, default: Optional[str] = None) -> Optional[str]:
+        """
+        Args:
+            domain_id (str): The domain ID.
+            default (Optional[str]): Returned for unknown domain IDs.
+
+        Returns:
+            Optional[str]: The description of the domain.
+        """
+        if domain_id not in self.description_by_domain_id:
+            row = (
+                self.__get_connection()
+                .execute(
+                    "SELECT description FROM descriptions WHERE domain_id = ?",
+                    (domain_id,),
+                )
+                .fetchone()
+            )
+            self.description_by_domain_id[domain_id] = row[0] if row else None
+        description = self.description_by_domain_id[domain_id]
+        return default if description is None else description
+
+    def __get_connection(self) -> sqlite3.Connection:
+        """
+        Returns the connection to the index of the current process, opened on its
+        first lookup in a forked process.
+        """
+        if self.connection_pid != os.getpid():
+            self.inherited_connections.append(self.connection)
+            self.connection = connect_sqlite_index(self.index_f)
+            self.connection_pid = os.getpid()
+        return self.connection
+
+    def close(self) -> None:
+        """
+        Closes the index, if it was opened by the current process.
+
+        Returns:
+            None
+        """
+        if self.connection_pid == os.getpid():
+            self.connection.close()
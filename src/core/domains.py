@@ -0,0 +1,110 @@
+from collections import Counter
+from typing import List
+
+import numpy as np
+import scipy.sparse
+
+
+class DomainCounts:
+    """
+    Counts of the domains of a domain source for many rows (proteins or clusters),
+    as a sparse matrix of rows by domains.
+
+    Domain IDs are interned into the vocabulary of the domain source: the column of
+    a domain is the index of its domain ID in domain_ids. Row reductions (e.g. over
+    the proteins of clusters, see ClusterProteins) and entropies are computed for
+    all rows at once.
+    """
+
+    def __init__(self, domain_ids: List[str], counts: scipy.sparse.csr_matrix) -> None:
+        """
+        Args:
+            domain_ids (List[str]): Vocabulary of the domain source.
+            counts (scipy.sparse.csr_matrix): Domain counts of each row, one column
+                per domain ID.
+        """
+        self.domain_ids: List[str] = domain_ids
+        self.counts: scipy.sparse.csr_matrix = counts
+
+    def __len__(self) -> int:
+        return self.counts.shape[0]
+
+    def sum_rows(
+        self, group_idxs: np.ndarray, row_idxs: np.ndarray, group_count: int
+    ) -> "DomainCounts":
+        """
+        Returns the domain counts of groups of rows (e.g. the proteins of clusters),
+        summed by a sparse product. Domains with a count of 0 are dropped.
+
+        Args:
+            group_idxs (np.ndarray): Group of each entry.
+            row_idxs (np.ndarray): Row of each entry.
+            group_count (int): Number of groups.
+
+        Returns:
+            DomainCounts: Domain counts of each group, sharing the vocabulary.
+        """
+        membership = scipy.sparse.csr_matrix(
+            (np.ones(len(row_idxs), dtype=self.counts.dtype), (group_idxs, row_idxs)),
+            shape=(group_count, len(self)),
+        )
+        group_counts = (membership @ self.counts).tocsr()
+        group_counts.eliminate_zeros()
+        group_counts.sort_indices()
+        return DomainCounts(self.domain_ids, group_counts)
+
+    def has_domains(self, row_idx: int) -> bool:
+        """
+        Returns whether a row has at least one domain.
+        """
+        return bool(self.counts.indptr[row_idx] < self.counts.indptr[row_idx + 1])
+
+    def get_domain_ids(self, row_idx: int) -> List[str]:
+        """
+        Returns the domain IDs of a row.
+
+        Args:
+            row_idx (int): The row.
+
+        Returns:
+            List[str]: Domain IDs of the row.
+        """
+        start, end = self.counts.indptr[row_idx], self.counts.indptr[row_idx + 1]
+        domain_ids = self.domain_ids
+        return [domain_ids[column] for column in self.counts.indices[start:end]]
+
+    def get_counter(self, row_idx: int) -> Counter[str]:
+        """
+        Returns the domain counts of a row.
+
+        Args:
+            row_idx (int): The row.
+
+        Returns:
+            Counter[str]: Counts by domain ID.
+        """
+        start, end = self.counts.indptr[row_idx], self.counts.indptr[row_idx + 1]
+        return Counter(
+            dict(
+                zip(
+                    self.get_domain_ids(row_idx),
+                    self.counts.data[start:end].tolist(),
+                )
+            )
+        )
+
+    def get_entropies(self) -> np.ndarray:
+        """
+        Returns the Shannon entropy (in bits) of the domain counts of each row, 0.0
+        for rows without domains.
+        """
+        row_idxs = np.repeat(
+            np.arange(len(self), dtype=np.int64), np.diff(self.counts.indptr)
+        )
+        totals = np.bincount(row_idxs, weights=self.counts.data, minlength=len(self))
+        frequencies = self.counts.data / totals[row_idxs]
+        return 0.0 - np.bincount(
+            row_idxs,
+            weights=frequencies * (np.log(frequencies) / np.log(2)),
+            minlength=len(self),
+        )
@@ -28,6 +28,11 @@ class InputData:
         test: str = "mannwhitneyu",
         taxranks: List[str] = None,
         repetitions: int = 30,
+        seed: Optional[int] = None,
+        rarefaction: str = "sampled",
+        jobs: int = 1,
+        chunk_size: Optional[int] = None,
+        cache_dir: Optional[str] = None,
         fuzzy_count: int = 1,
         fuzzy_fraction: float = 0.75,
         fuzzy_range: Set[int] = {x for x in range(20 + 1) if x != 1},
@@ -35,6 +40,8 @@ class InputData:
         plotsize: Tuple[float, float] = (24, 12),
         plot_format: str = "pdf",
         taxon_idx_mapping_file: Optional[str] = None,
+        outputs: Optional[List[str]] = None,
+        alo_metrics_format: str = "per_level",
     ) -> None:
         if taxranks is None:
             taxranks = ["phylum", "order", "genus"]
@@ -67,11 +74,18 @@ class InputData:
         self.fuzzy_fraction = fuzzy_fraction
         self.fuzzy_range = fuzzy_range
         self.repetitions = repetitions
+        self.seed = seed
+        self.rarefaction = rarefaction
+        self.jobs = jobs
+        self.chunk_size = chunk_size
+        self.cache_dir = cache_dir
         self.min_proteomes = min_proteomes
         self.plot_format = plot_format
         self.fontsize = fontsize
         self.taxranks = taxranks
         self.plotsize = plotsize
+        self.outputs = outputs
+        self.alo_metrics_format = alo_metrics_format
 
         self.pfam_mapping = True
         self.ipr_mapping = True
@@ -0,0 +1,85 @@
+from typing import Dict, Union
+
+import numpy as np
+
+
+class LengthStats:
+    """
+    Protein length statistics of many segments (groups of proteins), computed at
+    once by segment reductions over a flat array of lengths.
+
+    For each segment:
+        - counts: number of proteins
+        - sums: sum of lengths
+        - means, medians, sds: mean, median and population standard deviation
+        - minima: smallest length (0 for empty segments)
+    """
+
+    def __init__(
+        self, lengths: np.ndarray, segment_idxs: np.ndarray, segment_count: int
+    ) -> None:
+        """
+        Args:
+            lengths (np.ndarray): Protein lengths.
+            segment_idxs (np.ndarray): Segment of each protein.
+            segment_count (int): Number of segments.
+        """
+        order = np.lexsort((lengths, segment_idxs))
+        sorted_lengths = lengths[order].astype(np.int64)
+        self.counts: np.ndarray = np.bincount(segment_idxs, minlength=segment_count)
+        indptr = np.zeros(segment_count + 1, dtype=np.int64)
+        np.cumsum(self.counts, out=indptr[1:])
+
+        cumulative_lengths = np.zeros(len(sorted_lengths) + 1, dtype=np.int64)
+        np.cumsum(sorted_lengths, out=cumulative_lengths[1:])
+        self.sums: np.ndarray = (
+            cumulative_lengths[indptr[1:]] - cumulative_lengths[indptr[:-1]]
+        )
+
+        present = self.counts > 0
+        self.means: np.ndarray = np.zeros(segment_count)
+        np.divide(self.sums, self.counts, out=self.means, where=present)
+
+        self.medians: np.ndarray = np.zeros(segment_count)
+        self.minima: np.ndarray = np.zeros(segment_count, dtype=np.int64)
+        starts = indptr[:-1][present]
+        lower = starts + (self.counts[present] - 1) // 2
+        upper = starts + self.counts[present] // 2
+        self.medians[present] = (sorted_lengths[lower] + sorted_lengths[upper]) / 2.0
+        self.minima[present] = sorted_lengths[starts]
+
+        sorted_segment_idxs = np.repeat(np.arange(segment_count), self.counts)
+        squared_differences = (sorted_lengths - self.means[sorted_segment_idxs]) ** 2
+        self.sds: np.ndarray = np.zeros(segment_count)
+        np.divide(
+            np.bincount(
+                sorted_segment_idxs,
+                weights=squared_differences,
+                minlength=segment_count,
+            ),
+            self.counts,
+            out=self.sds,
+            where=present,
+        )
+        np.sqrt(self.sds, out=self.sds)
+
+    def get(self, segment_idx: int) -> Dict[str, Union[int, float]]:
+        """
+        Returns the statistics of a segment in the format of
+        ProteinCollection.get_protein_length_stats.
+
+        Args:
+            segment_idx (int): Index of the segment.
+
+        Returns:
+            Dict[str, Union[int, float]]: 'sum', 'mean', 'median' and 'sd' of the
+                lengths of the segment (0 if the segment is empty).
+        """
+        if not self.counts[segment_idx]:
+            return {"sum": 0, "mean": 0.0, "median": 0, "sd": 0.0}
+        return {
+            "sum": int(self.sums[segment_idx]),
+            "mean": float(self.means[segment_idx]),
+            "median": float(self.medians[segment_idx]),
+            "sd": float(self.sds[segment_idx]),
+        }
@@ -1,13 +1,20 @@
-import contextlib
 import logging
+import multiprocessing
 import os
+import sqlite3
 from collections import defaultdict
-from typing import DefaultDict, Dict, List, Literal, Optional, Set, Tuple
+from typing import DefaultDict, Dict, List, Literal, Optional, Set, Tuple, Union
 
 import ete3
 from ete3 import Tree, TreeNode
 
-from core.utils import progress, read_fasta_len, yield_config_lines, yield_file_lines
+from core.nodesdb import NodesDB, yield_nodesdb_rows
+from core.utils import (
+    check_file,
+    read_fasta_lengths,
+    yield_config_lines,
+    yield_file_lines,
+)
 
 logger = logging.getLogger("kinfin_logger")
 
@@ -30,52 +37,62 @@ def parse_nodesdb(filepath: str) -> Dict[str, Dict[str, str]]:
     """
     logger.info(f"[STATUS] - Parsing nodesDB {filepath}")
 
-    nodesdb: Dict[str, Dict[str, str]] = {}
-    nodesdb_count = 0
-    nodes_count = 0
-
-    for line in yield_file_lines(filepath):
-        if line.startswith("#"):
-            nodesdb_count = int(line.lstrip("# nodes_count = ").rstrip("\n"))
-        elif line.strip():
-            nodes_count += 1
-            with contextlib.suppress(Exception):
-                node, rank, name, parent = line.rstrip("\n").split("\t")
-                nodesdb[node] = {"rank": rank, "name": name, "parent": parent}
-            if nodesdb_count:
-                progress(nodes_count, 1000, nodesdb_count)
-    return nodesdb
+    return {
+        node: {"rank": rank, "name": name, "parent": parent}
+        for node, rank, name, parent in yield_nodesdb_rows(filepath)
+    }
 
 
 # cli
 def get_lineage(
     taxid: str,
-    nodesdb: Dict[str, Dict[str, str]],
+    nodesdb: Union[NodesDB, Dict[str, Dict[str, str]]],
     taxranks: List[str],
+    ranks_by_node: Optional[Dict[str, Dict[str, str]]] = None,
 ) -> Dict[str, str]:
     """
     Get the lineage of a taxonomic identifier.
 
+    Walks up the parents of the node until the root. If a rank occurs more than
+    once, the name of the node closest to the root is kept.
+
     Args:
         taxid (str): The taxonomic identifier.
-        nodesdb (Dict[str, Dict[str, str]]): A dictionary containing information about nodes.
+        nodesdb (Union[NodesDB, Dict[str, Dict[str, str]]]): Information about nodes, see
+            NodesDB and parse_nodesdb.
         taxranks (List[str]): A list of taxonomic ranks to include in the lineage.
+        ranks_by_node (Optional[Dict[str, Dict[str, str]]]): Names by rank of the nodes
+            already walked (for the same taxranks), shared between calls so that common
+            ancestors are walked once.
 
     Returns:
         Dict[str, str]: A dictionary containing the lineage information, with taxonomic ranks as keys
         and corresponding names as values.
     """
-    lineage = {taxrank: "undef" for taxrank in taxranks}
-    parent = ""
+    if ranks_by_node is None:
+        ranks_by_node = {}
+
+    # walk up to the root, or to the first node of a known lineage
+    path: List[str] = []
+    ranks: Dict[str, str] = {}
     node = taxid
-    while parent != "1":
-        taxrank = nodesdb[node]["rank"]
+    while node not in ranks_by_node:
+        path.append(node)
         parent = nodesdb[node]["parent"]
-        if taxrank in taxranks:
-            name = nodesdb[node]["name"]
-            lineage[taxrank] = name
+        if parent == "1":
+            break
         node = parent
-    return lineage
+    else:
+        ranks = ranks_by_node[node]
+
+    # nodes closer to the root take precedence
+    for node in reversed(path):
+        taxrank = nodesdb[node]["rank"]
+        if taxrank in taxranks and taxrank not in ranks:
+            ranks = {**ranks, taxrank: nodesdb[node]["name"]}
+        ranks_by_node[node] = ranks
+
+    return {taxrank: ranks.get(taxrank, "undef") for taxrank in taxranks}
 
 
 # cli
@@ -187,10 +204,21 @@ def add_taxid_attributes(
             - Updated list of attributes with taxonomic ranks added and "TAXID" removed.
             - Updated dictionary of attributes indexed by proteome ID, with taxonomic attributes added and "TAXID" removed.
     """
-    NODESDB = parse_nodesdb(nodesdb_f)
+    NODESDB: Union[NodesDB, Dict[str, Dict[str, str]]]
+    try:
+        NODESDB = NodesDB(nodesdb_f)
+    except (OSError, sqlite3.Error) as e:
+        logger.info(f"[STATUS] - Could not index nodesDB ({e}), parsing it instead")
+        NODESDB = parse_nodesdb(nodesdb_f)
+    ranks_by_node: Dict[str, Dict[str, str]] = {}
     for proteome_id in level_by_attribute_by_proteome_id:
         taxid = level_by_attribute_by_proteome_id[proteome_id]["TAXID"]
-        lineage = get_lineage(taxid=taxid, nodesdb=NODESDB, taxranks=taxranks)
+        lineage = get_lineage(
+            taxid=taxid,
+            nodesdb=NODESDB,
+            taxranks=taxranks,
+            ranks_by_node=ranks_by_node,
+        )
 
         # add lineage attribute/levels
         for taxrank in taxranks:
@@ -199,6 +227,9 @@ def add_taxid_attributes(
         # remove taxid-levels
         del level_by_attribute_by_proteome_id[proteome_id]["TAXID"]
 
+    if isinstance(NODESDB, NodesDB):
+        NODESDB.close()
+
     # remove taxid-attribute
     attributes.remove("TAXID")
 
@@ -285,10 +316,9 @@ def parse_tree_from_file(
     return tree_ete, node_idx_by_proteome_ids
 
 
-def parse_fasta_dir(species_ids_f: str, fasta_dir: str) -> Dict[str, int]:
+def get_fasta_files(species_ids_f: str, fasta_dir: str) -> List[str]:
     """
-    Parse a species IDs file to retrieve fasta file names and then calculate
-    lengths of sequences from corresponding FASTA files.
+    Parse a species IDs file to retrieve the paths of the FASTA files.
 
     Args:
     - species_ids_f (str): Path to the species IDs file, where each line contains
@@ -296,10 +326,8 @@ def parse_fasta_dir(species_ids_f: str, fasta_dir: str) -> Dict[str, int]:
     - fasta_dir (str): Directory path where the FASTA files are located.
 
     Returns:
-    - Dict[str, int]: A dictionary mapping header strings (protein IDs) to their
-      corresponding sequence lengths extracted from the FASTA files.
+    - List[str]: Paths of the FASTA files, one per species.
     """
-    logger.info("[STATUS] - Parsing FASTAs ...")
     fasta_file_by_species_id: Dict[str, str] = {}
 
     for line in yield_file_lines(species_ids_f):
@@ -307,12 +335,47 @@ def parse_fasta_dir(species_ids_f: str, fasta_dir: str) -> Dict[str, int]:
             idx, fasta = line.split(": ")
             fasta_file_by_species_id[idx] = fasta
 
-    fasta_len_by_protein_id: Dict[str, int] = {}
-    for _, fasta_f in list(fasta_file_by_species_id.items()):
-        fasta_f = os.path.join(fasta_dir, fasta_f)
+    return [
+        os.path.join(fasta_dir, fasta_f)
+        for fasta_f in fasta_file_by_species_id.values()
+    ]
+
+
+def parse_fasta_dir(
+    species_ids_f: str, fasta_dir: str, jobs: int = 1
+) -> Dict[str, int]:
+    """
+    Parse a species IDs file to retrieve fasta file names and then calculate
+    lengths of sequences from corresponding FASTA files.
 
-        for header, length in read_fasta_len(fasta_f):
-            fasta_len_by_protein_id[header] = length
+    With more than one job, FASTA files are scanned in parallel processes.
+
+    Args:
+    - species_ids_f (str): Path to the species IDs file, where each line contains
+      an index and a corresponding FASTA file name separated by ': '.
+    - fasta_dir (str): Directory path where the FASTA files are located.
+    - jobs (int): Number of processes scanning FASTA files [default: 1].
+
+    Returns:
+    - Dict[str, int]: A dictionary mapping header strings (protein IDs) to their
+      corresponding sequence lengths extracted from the FASTA files.
+    """
+    logger.info("[STATUS] - Parsing FASTAs ...")
+
+    fasta_fs = get_fasta_files(species_ids_f, fasta_dir)
+    # fail before starting workers
+    for fasta_f in fasta_fs:
+        check_file(fasta_f)
+
+    fasta_len_by_protein_id: Dict[str, int] = {}
+    if jobs > 1 and len(fasta_fs) > 1:
+        with multiprocessing.get_context("fork").Pool(min(jobs, len(fasta_fs))) as pool:
+            # in order of the files, so later records still replace earlier ones
+            for protein_ids, lengths in pool.imap(read_fasta_lengths, fasta_fs):
+                fasta_len_by_protein_id.update(zip(protein_ids, lengths))
+    else:
+        for fasta_f in fasta_fs:
+            fasta_len_by_protein_id.update(zip(*read_fasta_lengths(fasta_f)))
 
     return fasta_len_by_protein_id
 
@@ -427,6 +490,27 @@ def compute_protein_ids_by_proteome(
 
 
 # common
+def get_proteome_bitmask(
+    proteome_ids: Set[str], proteome_idx_by_proteome_id: Dict[str, int]
+) -> int:
+    """
+    Computes the bitmask of a set of proteomes.
+
+    Args:
+        proteome_ids (Set[str]): Proteome IDs, unknown IDs are ignored.
+        proteome_idx_by_proteome_id (Dict[str, int]): Bit index of each proteome.
+
+    Returns:
+        int: Integer with the bits of the proteomes set.
+    """
+    bitmask = 0
+    for proteome_id in proteome_ids:
+        proteome_idx = proteome_idx_by_proteome_id.get(proteome_id)
+        if proteome_idx is not None:
+            bitmask |= 1 << proteome_idx
+    return bitmask
+
+
 def get_attribute_cluster_type(
     singleton,
     implicit_protein_ids_by_proteome_id_by_level,
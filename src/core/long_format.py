@@ -0,0 +1,129 @@
+import itertools
+import logging
+import os
+from typing import Dict, Iterator, List, Tuple
+
+from core.spill import OUTPUT_BUFFER_SIZE
+
+logger = logging.getLogger("kinfin_logger")
+
+# suffix of the long-format outputs, with a row per cluster and level
+LONG_FORMAT_SUFFIX = ".long.txt"
+# suffix of the offset index of a long-format output, see write_offset_index
+OFFSET_INDEX_SUFFIX = ".idx"
+
+
+def get_offset_index_f(long_f: str) -> str:
+    """
+    Returns the path of the offset index of a long-format output.
+    """
+    return f"{long_f}{OFFSET_INDEX_SUFFIX}"
+
+
+def write_offset_index(long_f: str) -> str:
+    """
+    Writes the offset index of a long-format output: a line per cluster with the
+    byte offset and length of its rows, and the levels of its rows.
+
+    The rows of a long-format output start with the cluster ID and the level,
+    and the rows of a cluster are consecutive.
+
+    Args:
+        long_f (str): Path of the long-format output.
+
+    Returns:
+        str: Path of the offset index.
+    """
+    offset_index_f = get_offset_index_f(long_f)
+    logger.info(f"[STATUS] - Writing {offset_index_f}")
+    with open(long_f, "rb", buffering=OUTPUT_BUFFER_SIZE) as long_fh, open(
+        offset_index_f, "w", buffering=OUTPUT_BUFFER_SIZE
+    ) as offset_index_fh:
+        offset_index_fh.write("#cluster_id\toffset\tlength\tlevels\n")
+        offset = 0
+        for cluster_id, lines in itertools.groupby(
+            long_fh, key=lambda line: line.split(b"\t", 1)[0]
+        ):
+            lines = list(lines)
+            length = sum(len(line) for line in lines)
+            if not cluster_id.startswith(b"#"):
+                levels = b",".join(line.split(b"\t", 2)[1] for line in lines)
+                offset_index_fh.write(
+                    f"{cluster_id.decode()}\t{offset}\t{length}\t{levels.decode()}\n"
+                )
+            offset += length
+    return offset_index_f
+
+
+class LongFormatReader:
+    """
+    Reads the rows of a long-format output through its offset index, by cluster
+    or by level, without scanning the output.
+    """
+
+    def __init__(self, long_f: str) -> None:
+        """
+        Args:
+            long_f (str): Path of the long-format output, indexed by
+                write_offset_index.
+
+        Raises:
+            FileNotFoundError: If the output or its offset index do not exist.
+        """
+        self.long_f: str = long_f
+        offset_index_f = get_offset_index_f(long_f)
+        if not os.path.isfile(offset_index_f):
+            raise FileNotFoundError(f"[ERROR] - {offset_index_f} does not exist.")
+        with open(long_f) as long_fh:
+            # columns of the rows
+            self.header: List[str] = long_fh.readline().rstrip("\n").split("\t")
+        # byte offset and length of the rows of each cluster, and their levels
+        self.position_by_cluster_id: Dict[str, Tuple[int, int]] = {}
+        self.levels_by_cluster_id: Dict[str, List[str]] = {}
+        with open(offset_index_f) as offset_index_fh:
+            for line in offset_index_fh:
+                if line.startswith("#"):
+                    continue
+                cluster_id, offset, length, levels = line.rstrip("\n").split("\t")
+                self.position_by_cluster_id[cluster_id] = (int(offset), int(length))
+                self.levels_by_cluster_id[cluster_id] = levels.split(",")
+
+    def __read_rows(self, long_fh, cluster_id: str) -> List[List[str]]:
+        offset, length = self.position_by_cluster_id[cluster_id]
+        long_fh.seek(offset)
+        return [line.split("\t") for line in long_fh.read(length).decode().splitlines()]
+
+    def get_cluster_rows(self, cluster_id: str) -> List[List[str]]:
+        """
+        Returns the rows of a cluster.
+
+        Args:
+            cluster_id (str): The cluster ID.
+
+        Returns:
+            List[List[str]]: Fields of the rows of the cluster, one per level it is
+                present in (none if it is not in the output).
+        """
+        if cluster_id not in self.position_by_cluster_id:
+            return []
+        with open(self.long_f, "rb") as long_fh:
+            return self.__read_rows(long_fh, cluster_id)
+
+    def iter_level_rows(self, level: str) -> Iterator[List[str]]:
+        """
+        Yields the rows of a level, in the order of the output. Only the rows of
+        the clusters present in the level are read.
+
+        Args:
+            level (str): The level.
+
+        Yields:
+            List[str]: Fields of each row of the level.
+        """
+        with open(self.long_f, "rb", buffering=OUTPUT_BUFFER_SIZE) as long_fh:
+            for cluster_id, levels in self.levels_by_cluster_id.items():
+                if level not in levels:
+                    continue
+                for row in self.__read_rows(long_fh, cluster_id):
+                    if row[1] == level:
+                        yield row
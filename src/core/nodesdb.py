@@ -0,0 +1,105 @@
+import contextlib
+import logging
+import sqlite3
+from typing import Dict, Generator, Optional, Tuple
+
+from core.sqlite_index import open_sqlite_index
+from core.utils import progress, yield_file_lines
+
+logger = logging.getLogger("kinfin_logger")
+
+# bump when the layout of the index changes
+NODESDB_INDEX_VERSION = 1
+
+
+def yield_nodesdb_rows(
+    nodesdb_f: str,
+) -> Generator[Tuple[str, str, str, str], None, None]:
+    """
+    Parses the nodes database file, skipping malformed lines (see parse_nodesdb).
+
+    Args:
+        nodesdb_f (str): Path to the nodes database file.
+
+    Yields:
+        Tuple[str, str, str, str]: Node, rank, name and parent of each node.
+    """
+    nodesdb_count = 0
+    nodes_count = 0
+    for line in yield_file_lines(nodesdb_f):
+        if line.startswith("#"):
+            nodesdb_count = int(line.lstrip("# nodes_count = ").rstrip("\n"))
+        elif line.strip():
+            nodes_count += 1
+            with contextlib.suppress(Exception):
+                node, rank, name, parent = line.rstrip("\n").split("\t")
+                yield node, rank, name, parent
+            if nodesdb_count:
+                progress(nodes_count, 1000, nodesdb_count)
+
+
+class NodesDB:
+    """
+    Nodes of a nodes database file, looked up on demand in a SQLite index.
+
+    The index is built once next to the file (as '<nodesdb_f>.sqlite') and rebuilt
+    when the file changes. Nodes are memoized, so that shared ancestors are read
+    once. Behaves like the dictionary returned by parse_nodesdb, for the nodes
+    looked up.
+    """
+
+    def __init__(self, nodesdb_f: str, index_f: Optional[str] = None) -> None:
+        """
+        Args:
+            nodesdb_f (str): Path to the nodes database file.
+            index_f (Optional[str]): Path of the index [default: next to nodesdb_f].
+
+        Raises:
+            OSError, sqlite3.Error: If there is no up to date index and it cannot be built.
+        """
+
+        def fill_index(connection: sqlite3.Connection) -> None:
+            connection.execute(
+                "CREATE TABLE nodes (node TEXT PRIMARY KEY, rank TEXT, name TEXT, parent TEXT) WITHOUT ROWID"
+            )
+            # later lines replace earlier ones, as in parse_nodesdb
+            connection.executemany(
+                "INSERT OR REPLACE INTO nodes VALUES (?, ?, ?, ?)",
+                yield_nodesdb_rows(nodesdb_f),
+            )
+
+        self.index_f: str = index_f or f"{nodesdb_f}.sqlite"
+        self.connection: sqlite3.Connection = open_sqlite_index(
+            nodesdb_f, self.index_f, NODESDB_INDEX_VERSION, fill_index
+        )
+        self.node_by_taxid: Dict[str, Dict[str, str]] = {}
+
+    def __getitem__(self, taxid: str) -> Dict[str, str]:
+        """
+        Args:
+            taxid (str): The taxonomic identifier.
+
+        Returns:
+            Dict[str, str]: 'rank', 'name' and 'parent' of the node.
+
+        Raises:
+            KeyError: If the node is not in the nodes database.
+        """
+        if taxid not in self.node_by_taxid:
+            row = self.connection.execute(
+                "SELECT rank, name, parent FROM nodes WHERE node = ?", (taxid,)
+            ).fetchone()
+            if row is None:
+                raise KeyError(taxid)
+            rank, name, parent = row
+            self.node_by_taxid[taxid] = {"rank": rank, "name": name, "parent": parent}
+        return self.node_by_taxid[taxid]
+
+    def close(self) -> None:
+        """
+        Closes the index.
+
+        Returns:
+            None
+        """
+        self.connection.close()
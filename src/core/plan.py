@@ -0,0 +1,91 @@
+import graphlib
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+# stages of the analysis, with the stages they depend on
+STAGE_DEPENDENCIES: Dict[str, Tuple[str, ...]] = {
+    # parsing of the functional annotation file
+    "functional_annotation": (),
+    # per-cluster counts by ALO
+    "cluster_analysis": (),
+    # apomorphies and synapomorphies of tree nodes
+    "tree_analysis": ("cluster_analysis",),
+    # representation tests of clusters in ALOs against the other ALOs
+    "representation_tests": ("cluster_analysis",),
+    # representation tests of clusters between pairs of ALOs
+    "pairwise_tests": ("cluster_analysis",),
+    "rarefaction": ("cluster_analysis",),
+    "volcano_plots": ("representation_tests", "pairwise_tests"),
+}
+
+# outputs that can be selected, with the stages they need
+OUTPUT_STAGES: Dict[str, Tuple[str, ...]] = {
+    "cluster_counts_by_taxon": ("cluster_analysis",),
+    "cluster_size_distribution": ("cluster_analysis",),
+    "cluster_metrics_domains": ("cluster_analysis", "functional_annotation"),
+    "cluster_domain_annotation": ("cluster_analysis", "functional_annotation"),
+    "cluster_summary": ("cluster_analysis",),
+    "attribute_metrics": ("cluster_analysis",),
+    "cluster_metrics_ALO": ("representation_tests",),
+    "cluster_1to1s": ("cluster_analysis",),
+    "pairwise_representation_test": ("pairwise_tests",),
+    "volcano_plots": ("volcano_plots",),
+    "rarefaction_curves": ("rarefaction",),
+    "tree": ("tree_analysis",),
+}
+
+
+class ComputePlan:
+    """
+    Stages of the analysis needed for a selection of outputs.
+
+    The stages needed by the outputs, and the stages they depend on, form a DAG
+    that is ordered once. Stages that are not part of the plan are skipped.
+    """
+
+    def __init__(self, outputs: Optional[Iterable[str]] = None) -> None:
+        """
+        Args:
+            outputs (Optional[Iterable[str]]): Outputs to produce (see OUTPUT_STAGES)
+                [default: all].
+
+        Raises:
+            ValueError: If an output is not known.
+        """
+        self.outputs: Set[str] = set(OUTPUT_STAGES if outputs is None else outputs)
+        if unknown_outputs := self.outputs - set(OUTPUT_STAGES):
+            raise ValueError(
+                f"[ERROR] - Unknown outputs: {', '.join(sorted(unknown_outputs))}"
+            )
+        graph: Dict[str, Tuple[str, ...]] = {}
+        stages = [stage for output in self.outputs for stage in OUTPUT_STAGES[output]]
+        while stages:
+            stage = stages.pop()
+            if stage not in graph:
+                graph[stage] = STAGE_DEPENDENCIES[stage]
+                stages.extend(graph[stage])
+        sorter = graphlib.TopologicalSorter(graph)
+        sorter.prepare()
+        # stages in dependency order, in groups of stages independent of each other
+        self.stage_groups: List[List[str]] = []
+        while sorter.is_active():
+            stage_group = sorted(sorter.get_ready())
+            self.stage_groups.append(stage_group)
+            sorter.done(*stage_group)
+        self.stages: List[str] = [
+            stage for stage_group in self.stage_groups for stage in stage_group
+        ]
+
+    def needs_stage(self, stage: str) -> bool:
+        """
+        Returns whether a stage is part of the plan.
+        """
+        return stage in self.stages
+
+    def wants_output(self, output: str) -> bool:
+        """
+        Returns whether an output was selected.
+        """
+        return output in self.outputs
+
+    def __str__(self) -> str:
+        return " > ".join(" + ".join(stage_group) for stage_group in self.stage_groups)
@@ -0,0 +1,117 @@
+import contextlib
+import hashlib
+import json
+import logging
+import os
+import tempfile
+from typing import Any, Dict, Iterable
+
+import numpy as np
+
+from core.utils import set_default_permissions
+
+logger = logging.getLogger("kinfin_logger")
+
+# bump when the rendering of figures changes, so that they are rendered again
+PLOT_VERSION = 1
+# name of the manifest of the figures, in the main output directory
+PLOT_MANIFEST_FILENAME = ".plot_manifest.json"
+
+
+def get_plot_hash(data: Iterable[Any], settings: Iterable[Any]) -> str:
+    """
+    Returns the hash of the data and settings a figure is rendered from.
+
+    Args:
+        data (Iterable[Any]): Values plotted, each converted to a float array.
+        settings (Iterable[Any]): Labels and plot settings, hashed by their repr.
+
+    Returns:
+        str: Hex digest.
+    """
+    digest = hashlib.sha256(repr((PLOT_VERSION, *settings)).encode())
+    for values in data:
+        array = np.ascontiguousarray(values, dtype=np.float64)
+        digest.update(str(array.shape).encode())
+        digest.update(array.tobytes())
+    return digest.hexdigest()
+
+
+class PlotRegistry:
+    """
+    Figures of a run, registered once each with the hash of their data before
+    they are rendered.
+
+    Hashes are kept in a JSON manifest in the output directory. A figure whose
+    file exists and whose hash is unchanged from the previous run into the same
+    output directory is not rendered again.
+    """
+
+    def __init__(self, manifest_f: str) -> None:
+        """
+        Args:
+            manifest_f (str): Path of the manifest.
+        """
+        self.manifest_f: str = manifest_f
+        self.manifest_dir: str = os.path.dirname(manifest_f) or "."
+        self.previous_hash_by_plot_f: Dict[str, str] = {}
+        if os.path.isfile(manifest_f):
+            try:
+                with open(manifest_f) as manifest_fh:
+                    self.previous_hash_by_plot_f = json.load(manifest_fh)
+            except (OSError, ValueError):
+                logger.info(f"[STATUS] - Ignoring unreadable {manifest_f}")
+        self.hash_by_plot_f: Dict[str, str] = {}
+
+    def __get_key(self, plot_f: str) -> str:
+        return os.path.relpath(plot_f, self.manifest_dir)
+
+    def register(self, plot_f: str, plot_hash: str) -> bool:
+        """
+        Registers a figure of the run.
+
+        Args:
+            plot_f (str): Path of the figure.
+            plot_hash (str): Hash of its data (see get_plot_hash).
+
+        Returns:
+            bool: True if the figure needs to be rendered, False if it was already
+                registered in this run, or its file is up to date.
+        """
+        key = self.__get_key(plot_f)
+        if key in self.hash_by_plot_f:
+            return False
+        self.hash_by_plot_f[key] = plot_hash
+        return not (
+            self.previous_hash_by_plot_f.get(key) == plot_hash
+            and os.path.isfile(plot_f)
+        )
+
+    def write(self) -> None:
+        """
+        Writes the manifest, keeping the figures of the previous run that were not
+        registered again. The manifest is replaced once complete. Nothing is
+        written if no figure was registered in this run.
+
+        Returns:
+            None
+        """
+        if not self.hash_by_plot_f:
+            return
+        fd, tmp_manifest_f = tempfile.mkstemp(
+            prefix=".manifest-", suffix=".json", dir=self.manifest_dir
+        )
+        try:
+            with os.fdopen(fd, "w") as manifest_fh:
+                json.dump(
+                    {**self.previous_hash_by_plot_f, **self.hash_by_plot_f},
+                    manifest_fh,
+                    indent=1,
+                    sort_keys=True,
+                )
+            set_default_permissions(tmp_manifest_f)
+            os.replace(tmp_manifest_f, self.manifest_f)
+        except BaseException:
+            with contextlib.suppress(OSError):
+                os.remove(tmp_manifest_f)
+            raise
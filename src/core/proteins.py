@@ -1,10 +1,26 @@
-from collections import Counter
-from typing import Dict, List, Optional, Union
+import sys
+from typing import Dict, List, Optional, Sequence, Union
 
+import numpy as np
+
+from core.descriptions import DescriptionStore
+from core.domains import DomainCounts
 from core.utils import mean, median, sd
 
+# descriptions by domain ID of a domain source, compiled or parsed
+DomainDescriptions = Union[DescriptionStore, Dict[str, str]]
+
 
 class Protein:
+    __slots__ = (
+        "protein_id",
+        "protein_idx",
+        "proteome_id",
+        "species_id",
+        "sequence_id",
+        "clustered",
+    )
+
     def __init__(
         self,
         protein_id: str,
@@ -13,62 +29,106 @@ class Protein:
         sequence_id: str,
     ) -> None:
 
-        self.protein_id = protein_id
-        self.proteome_id = proteome_id
-        self.species_id = species_id
-        self.sequence_id = sequence_id
-        self.length: Optional[int] = None
+        self.protein_id: str = protein_id
+        # integer ID, row in ProteinCollection.protein_table
+        self.protein_idx: int = -1
+        self.proteome_id: str = sys.intern(proteome_id)
+        self.species_id: str = sys.intern(species_id)
+        self.sequence_id: str = sequence_id
         self.clustered: bool = False
-        self.secreted: bool = False
-        self.domain_counter_by_domain_source: Dict[str, Counter[str]] = {}
-        self.go_terms: List[str] = []
 
-    def update_length(self, length: int) -> None:
-        self.length = length
+
+class ProteinTable:
+    """
+    Columns of per-protein values, indexed by integer protein ID (the position of
+    the protein in ProteinCollection.proteins_list):
+        - proteome_idxs: index of the proteome (see
+          AloCollection.proteome_idx_by_proteome_id), -1 if unknown
+        - lengths: length of the protein, -1 if unknown
+        - secreted: whether SignalP_EUK predicts a signal peptide ('SignalP-noTM')
+    and the domain counts of proteins (rows) by domain source, see DomainCounts.
+    """
+
+    def __init__(self, proteome_idxs: np.ndarray) -> None:
+        self.proteome_idxs: np.ndarray = proteome_idxs
+        self.lengths: np.ndarray = np.full(len(proteome_idxs), -1, dtype=np.int64)
+        self.secreted: np.ndarray = np.zeros(len(proteome_idxs), dtype=bool)
+        self.domain_counts_by_domain_source: Dict[str, DomainCounts] = {}
 
 
 class ProteinCollection:
-    def __init__(self, proteins_list: List[Protein]) -> None:
+    def __init__(
+        self,
+        proteins_list: List[Protein],
+        proteome_idx_by_proteome_id: Optional[Dict[str, int]] = None,
+    ) -> None:
         self.proteins_list: List[Protein] = proteins_list
-        self.proteins_by_protein_id: Dict[str, Protein] = {
-            protein.protein_id: protein for protein in proteins_list
-        }
+        self.proteins_by_protein_id: Dict[str, Protein] = {}
+        for protein_idx, protein in enumerate(proteins_list):
+            protein.protein_idx = protein_idx
+            self.proteins_by_protein_id[protein.protein_id] = protein
+        proteome_idx_by_proteome_id = proteome_idx_by_proteome_id or {}
+        self.protein_table: ProteinTable = ProteinTable(
+            np.array(
+                [
+                    proteome_idx_by_proteome_id.get(protein.proteome_id, -1)
+                    for protein in proteins_list
+                ],
+                dtype=np.int32,
+            )
+        )
         self.protein_count: int = len(proteins_list)
         self.domain_sources: List[str] = []
         self.fastas_parsed: bool = False
         self.functional_annotation_parsed: bool = False
-        self.domain_desc_by_id_by_source: Dict[str, Dict[str, str]] = {}
+        self.domain_desc_by_id_by_source: Dict[str, DomainDescriptions] = {}
 
-    def add_annotation_to_protein(
-        self,
-        domain_protein_id: str,
-        domain_counter_by_domain_source: Dict[str, Counter],
-        go_terms: List[str],
-    ):
+    def get_protein_idxs(self, protein_ids: Sequence[str]) -> np.ndarray:
         """
-        Updates a protein object with domain counters and GO terms.
+        Returns the integer IDs of proteins, skipping unknown protein IDs.
 
         Args:
-        - domain_protein_id (str): Identifier of the protein to annotate.
-        - domain_counter_by_domain_source (Dict[str, Counter]): Domain sources mapped to counters of domains.
-        - go_terms (List[str]): Gene Ontology (GO) terms associated with the protein.
+            protein_ids (Sequence[str]): Protein IDs.
 
-        This method sets domain counters, assigns GO terms, and checks if the protein is secreted
-        based on domain information ('SignalP_EUK' source).
-
-        Note: If 'SignalP_EUK' indicates 'SignalP-noTM', sets protein.secreted = True.
+        Returns:
+            np.ndarray: Integer IDs of the proteins.
         """
-        protein: Optional[Protein] = self.proteins_by_protein_id.get(
-            domain_protein_id, None
+        return np.array(
+            [
+                self.proteins_by_protein_id[protein_id].protein_idx
+                for protein_id in protein_ids
+                if protein_id in self.proteins_by_protein_id
+            ],
+            dtype=np.int64,
         )
-        if protein is not None:
-            protein.domain_counter_by_domain_source = domain_counter_by_domain_source
-            signalp_notm = protein.domain_counter_by_domain_source.get(
-                "SignalP_EUK", None
+
+    def add_domain_counts(
+        self, domain_source: str, domain_counts: DomainCounts
+    ) -> None:
+        """
+        Sets the domain counts of the proteins for a domain source.
+
+        Args:
+        - domain_source (str): The domain source.
+        - domain_counts (DomainCounts): Domain counts with one row per protein.
+
+        Note: If 'SignalP_EUK' has 'SignalP-noTM' for a protein, the protein is
+        marked as secreted in the protein table.
+        """
+        self.protein_table.domain_counts_by_domain_source[domain_source] = domain_counts
+        if (
+            domain_source == "SignalP_EUK"
+            and "SignalP-noTM" in domain_counts.domain_ids
+        ):
+            counts = domain_counts.counts
+            protein_idxs = np.repeat(
+                np.arange(self.protein_count), np.diff(counts.indptr)
             )
-            if signalp_notm and "SignalP-noTM" in signalp_notm:
-                protein.secreted = True
-            protein.go_terms = go_terms
+            self.protein_table.secreted[
+                protein_idxs[
+                    counts.indices == domain_counts.domain_ids.index("SignalP-noTM")
+                ]
+            ] = True
 
     def get_protein_length_stats(
         self, protein_ids: List[str]
@@ -93,12 +153,10 @@ class ProteinCollection:
         if protein_ids and self.fastas_parsed:
             protein_lengths: List[int] = [
                 length
-                for length in [
-                    self.proteins_by_protein_id[protein_id].length
-                    for protein_id in protein_ids
-                    if protein_id in self.proteins_by_protein_id
-                ]
-                if length is not None
+                for length in self.protein_table.lengths[
+                    self.get_protein_idxs(protein_ids)
+                ].tolist()
+                if length >= 0
             ]
             protein_length_stats["sum"] = sum(protein_lengths)
             protein_length_stats["mean"] = mean(protein_lengths)
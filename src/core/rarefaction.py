@@ -0,0 +1,191 @@
+import multiprocessing
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import scipy.sparse
+
+from core.clusters import ClusterMatrix
+
+# maximum number of (repetition, cluster proteome) values ranked at once
+MAX_BATCH_VALUES = 2**24
+
+# number of sampled repetitions giving the min/max envelope of exact curves
+EXACT_RAREFACTION_REPETITIONS = 10
+
+# presence matrix shared with worker processes (inherited on fork)
+_worker_presence: Optional[scipy.sparse.csr_matrix] = None
+
+
+def get_presence_matrix(cluster_matrix: ClusterMatrix) -> scipy.sparse.csr_matrix:
+    """
+    Returns the cluster-by-proteome presence matrix of non-singleton clusters.
+
+    Args:
+        cluster_matrix (ClusterMatrix): Protein counts of clusters by proteome.
+
+    Returns:
+        scipy.sparse.csr_matrix: Boolean matrix with a row for each cluster with more
+            than one protein.
+    """
+    counts = cluster_matrix.tocsr()
+    non_singleton = np.asarray(counts.sum(axis=1)).ravel() > 1
+    presence = counts[non_singleton]
+    presence.data = np.ones_like(presence.data, dtype=bool)
+    return presence
+
+
+def compute_rarefaction_curve(
+    presence: scipy.sparse.csr_matrix,
+    proteome_idxs: np.ndarray,
+    repetitions: int,
+    rng: np.random.Generator,
+) -> Dict[int, List[int]]:
+    """
+    Computes the number of clusters found when sampling proteomes of a level one by
+    one in random order.
+
+    Each repetition draws a random rank for every proteome. A cluster is found at
+    the smallest rank of its proteomes, so the curve is the cumulative count of
+    clusters by that rank. All repetitions of a batch are handled at once.
+
+    Args:
+        presence (scipy.sparse.csr_matrix): Cluster-by-proteome presence matrix.
+        proteome_idxs (np.ndarray): Columns of the proteomes of the level.
+        repetitions (int): Number of random orders.
+        rng (np.random.Generator): Random number generator.
+
+    Returns:
+        Dict[int, List[int]]: Cluster counts of all repetitions by sample size.
+    """
+    # ranks are drawn in column order, not in the order of the proteome set of
+    # the level, which depends on the hash seed of the process
+    proteome_idxs = np.sort(proteome_idxs)
+    proteome_count = len(proteome_idxs)
+    level_presence = presence[:, proteome_idxs].tocsr()
+    level_presence = level_presence[np.diff(level_presence.indptr) > 0]
+
+    counts = np.zeros((repetitions, proteome_count), dtype=np.int64)
+    if level_presence.nnz:
+        batch_size = max(1, MAX_BATCH_VALUES // level_presence.nnz)
+        for start in range(0, repetitions, batch_size):
+            end = min(start + batch_size, repetitions)
+            ranks = rng.permuted(
+                np.tile(np.arange(proteome_count), (end - start, 1)), axis=1
+            )
+            first_ranks = np.minimum.reduceat(
+                ranks[:, level_presence.indices], level_presence.indptr[:-1], axis=1
+            )
+            first_ranks += (np.arange(end - start) * proteome_count)[:, None]
+            counts[start:end] = np.bincount(
+                first_ranks.ravel(), minlength=(end - start) * proteome_count
+            ).reshape(end - start, proteome_count)
+    curves = np.cumsum(counts, axis=1)
+    return {
+        sample_size: curves[:, sample_size - 1].tolist()
+        for sample_size in range(1, proteome_count + 1)
+    }
+
+
+def compute_expected_rarefaction_curve(
+    presence: scipy.sparse.csr_matrix, proteome_idxs: np.ndarray
+) -> Dict[int, float]:
+    """
+    Computes the expected number of clusters found when sampling proteomes of a
+    level without replacement.
+
+    A cluster present in m of the N proteomes of the level is missed by a sample of
+    k proteomes with the hypergeometric probability C(N - m, k) / C(N, k), which is
+    the product of (N - m - i) / (N - i) for i in 0..k-1. Clusters are grouped by
+    m, so the cost only depends on N and the number of distinct occupancies.
+
+    Args:
+        presence (scipy.sparse.csr_matrix): Cluster-by-proteome presence matrix.
+        proteome_idxs (np.ndarray): Columns of the proteomes of the level.
+
+    Returns:
+        Dict[int, float]: Expected cluster count by sample size.
+    """
+    proteome_count = len(proteome_idxs)
+    occupancies = np.asarray(presence[:, proteome_idxs].sum(axis=1)).ravel()
+    occupancy_counts = np.bincount(
+        occupancies[occupancies > 0], minlength=proteome_count + 1
+    )
+    present_occupancies = np.flatnonzero(occupancy_counts)
+
+    sample_idxs = np.arange(proteome_count)
+    miss_probabilities = np.cumprod(
+        np.clip(proteome_count - present_occupancies[:, None] - sample_idxs, 0, None)
+        / (proteome_count - sample_idxs),
+        axis=1,
+    )
+    expected_counts = occupancy_counts[present_occupancies] @ (1.0 - miss_probabilities)
+    return {
+        sample_size: float(expected_counts[sample_size - 1])
+        for sample_size in range(1, proteome_count + 1)
+    }
+
+
+def _compute_rarefaction_curve_task(
+    task: Tuple[np.ndarray, int, np.random.SeedSequence]
+) -> Dict[int, List[int]]:
+    """
+    Computes a rarefaction curve in a worker process.
+
+    Args:
+        task (Tuple[np.ndarray, int, np.random.SeedSequence]): Proteome columns,
+            number of repetitions and seed of the level.
+
+    Returns:
+        Dict[int, List[int]]: Cluster counts of all repetitions by sample size.
+    """
+    proteome_idxs, repetitions, seed_sequence = task
+    return compute_rarefaction_curve(
+        _worker_presence,  # type: ignore
+        proteome_idxs,
+        repetitions,
+        np.random.default_rng(seed_sequence),
+    )
+
+
+def compute_rarefaction_curves(
+    presence: scipy.sparse.csr_matrix,
+    proteome_idxs_by_level: List[np.ndarray],
+    repetitions: int,
+    seed: Optional[int] = None,
+    jobs: int = 1,
+) -> List[Dict[int, List[int]]]:
+    """
+    Computes rarefaction curves of several levels, optionally in worker processes.
+
+    Every level gets its own random stream spawned from the seed, so the results
+    do not depend on the number of processes, nor on the hash seed of the process
+    (see compute_rarefaction_curve).
+
+    Args:
+        presence (scipy.sparse.csr_matrix): Cluster-by-proteome presence matrix.
+        proteome_idxs_by_level (List[np.ndarray]): Proteome columns of each level.
+        repetitions (int): Number of random orders.
+        seed (Optional[int]): Seed of the random number generator, None for a
+            random seed.
+        jobs (int): Number of worker processes.
+
+    Returns:
+        List[Dict[int, List[int]]]: Rarefaction curve of each level.
+    """
+    global _worker_presence
+
+    seed_sequences = np.random.SeedSequence(seed).spawn(len(proteome_idxs_by_level))
+    tasks = [
+        (proteome_idxs, repetitions, seed_sequence)
+        for proteome_idxs, seed_sequence in zip(proteome_idxs_by_level, seed_sequences)
+    ]
+    _worker_presence = presence
+    try:
+        if jobs > 1 and len(tasks) > 1:
+            with multiprocessing.get_context("fork").Pool(
+                min(jobs, len(tasks))
+            ) as pool:
+                return pool.map(_compute_rarefaction_curve_task, tasks)
+        return [_compute_rarefaction_curve_task(task) for task in tasks]
+    finally:
+        _worker_presence = None
@@ -3,6 +3,8 @@ import time
 
 from core.datastore import DataFactory
 from core.input import InputData
+from core.rarefaction import EXACT_RAREFACTION_REPETITIONS
+from core.stats import STATISTIC_CACHE
 
 logger = logging.getLogger("kinfin_logger")
 
@@ -10,6 +12,7 @@ logger = logging.getLogger("kinfin_logger")
 def analyse(input_data: InputData) -> None:
     """
     Performs KinFin analysis based on the provided input data using DataFactory.
+    Only the stages needed by the selected outputs are run (see ComputePlan).
 
     Args:
         input_data (InputData): An instance of InputData containing input parameters and data.
@@ -30,17 +33,31 @@ def analyse(input_data: InputData) -> None:
         dataFactory.inputData.plot_format,
         dataFactory.inputData.fontsize,
     )
-    rarefaction_data = dataFactory.aloCollection.compute_rarefaction_data(
-        repetitions=dataFactory.inputData.repetitions
-    )
-    dataFactory.plot_rarefaction_data(
-        dirs=dataFactory.dirs,
-        plotsize=dataFactory.inputData.plotsize,
-        plot_format=dataFactory.inputData.plot_format,
-        fontsize=dataFactory.inputData.fontsize,
-        rarefaction_by_samplesize_by_level_by_attribute=rarefaction_data,
-    )
+    if dataFactory.plan.needs_stage("rarefaction"):
+        repetitions = dataFactory.inputData.repetitions
+        expected_rarefaction_data = None
+        if dataFactory.inputData.rarefaction == "exact":
+            repetitions = min(repetitions, EXACT_RAREFACTION_REPETITIONS)
+            expected_rarefaction_data = (
+                dataFactory.aloCollection.compute_expected_rarefaction_data(
+                    cluster_matrix=dataFactory.clusterCollection.cluster_matrix
+                )
+            )
+        rarefaction_data = dataFactory.aloCollection.compute_rarefaction_data(
+            repetitions=repetitions,
+            cluster_matrix=dataFactory.clusterCollection.cluster_matrix,
+            seed=dataFactory.inputData.seed,
+            jobs=dataFactory.inputData.jobs,
+        )
+        # plotted with the other outputs
+        dataFactory.rarefaction_by_samplesize_by_level_by_attribute = rarefaction_data
+        dataFactory.expected_rarefaction_by_samplesize_by_level_by_attribute = (
+            expected_rarefaction_data
+        )
     dataFactory.write_output()
+    logger.info(
+        f"[STATUS] - Representation test cache: {STATISTIC_CACHE.hits} hits, {STATISTIC_CACHE.misses} misses"
+    )
     overall_end = time.time()
     overall_elapsed = overall_end - overall_start
     logger.info(f"[STATUS] - Took {overall_elapsed}s to run kinfin.")
@@ -0,0 +1,214 @@
+import heapq
+import os
+import shutil
+import tempfile
+from contextlib import ExitStack
+from typing import Dict, Iterable, List, Optional
+
+# maximum number of sorted runs merged at once
+MAX_MERGE_FAN_IN = 64
+# buffer size of output file handles
+OUTPUT_BUFFER_SIZE = 1 << 20
+
+
+def _strip_newline(line: str) -> str:
+    return line[:-1]
+
+
+def merge_sorted_runs(run_fs: List[str], output_fh) -> None:
+    """
+    Writes the lines of sorted run files to an open file in sorted order.
+
+    Args:
+        run_fs (List[str]): Paths of the run files, each sorted.
+        output_fh: File to write the merged lines to.
+
+    Returns:
+        None
+    """
+    with ExitStack() as stack:
+        run_fhs = [stack.enter_context(open(run_f)) for run_f in run_fs]
+        # compare lines without their newline, as when sorting them in memory
+        output_fh.writelines(heapq.merge(*run_fhs, key=_strip_newline))
+
+
+class SpillFile:
+    """
+    Lines of an output file, written to disk in runs as they are produced.
+
+    Each run is sorted (unless the output keeps the order of its lines), so that
+    the output is an external merge sort of all runs, with the same line order as
+    sorting all lines in memory.
+    """
+
+    def __init__(
+        self,
+        spill_dir: str,
+        header_line: Optional[str] = None,
+        sort: bool = True,
+        min_line_count: int = 1,
+    ) -> None:
+        """
+        Args:
+            spill_dir (str): Directory of the run files.
+            header_line (Optional[str]): Line written before all others.
+            sort (bool): Whether lines are sorted, otherwise they are written in
+                the order they were added.
+            min_line_count (int): Minimum number of lines for the output to be
+                written at all.
+        """
+        self.spill_dir: str = spill_dir
+        self.header_line: Optional[str] = header_line
+        self.sort: bool = sort
+        self.min_line_count: int = min_line_count
+        self.run_fs: List[str] = []
+        self.line_count: int = 0
+
+    def add_run(self, lines: List[str]) -> None:
+        """
+        Writes lines to a new run file.
+
+        Args:
+            lines (List[str]): Lines without trailing newlines.
+
+        Returns:
+            None
+        """
+        if not lines:
+            return
+        if self.sort:
+            lines.sort()
+        run_fh = tempfile.NamedTemporaryFile(
+            "w", dir=self.spill_dir, suffix=".run", delete=False
+        )
+        with run_fh:
+            run_fh.write("\n".join(lines) + "\n")
+        self.run_fs.append(run_fh.name)
+        self.line_count += len(lines)
+
+    def __reduce_runs(self) -> None:
+        """
+        Merges runs until at most MAX_MERGE_FAN_IN are left.
+
+        Returns:
+            None
+        """
+        while len(self.run_fs) > MAX_MERGE_FAN_IN:
+            run_fs, self.run_fs = (
+                self.run_fs[:MAX_MERGE_FAN_IN],
+                self.run_fs[MAX_MERGE_FAN_IN:],
+            )
+            run_fh = tempfile.NamedTemporaryFile(
+                "w", dir=self.spill_dir, suffix=".run", delete=False
+            )
+            with run_fh:
+                merge_sorted_runs(run_fs, run_fh)
+            self.run_fs.append(run_fh.name)
+            for run_f in run_fs:
+                os.remove(run_f)
+
+    def write(self, output_f: str) -> bool:
+        """
+        Writes the header and all lines to the output file and removes the runs.
+
+        Args:
+            output_f (str): Path of the output file.
+
+        Returns:
+            bool: True if the output was written, False if it had too few lines.
+        """
+        written = self.line_count >= self.min_line_count
+        if written:
+            if self.sort:
+                self.__reduce_runs()
+            with open(output_f, "w", buffering=OUTPUT_BUFFER_SIZE) as output_fh:
+                if self.header_line is not None:
+                    output_fh.write(f"{self.header_line}\n")
+                if self.sort:
+                    merge_sorted_runs(self.run_fs, output_fh)
+                else:
+                    for run_f in self.run_fs:
+                        with open(run_f) as run_fh:
+                            shutil.copyfileobj(run_fh, output_fh)
+        for run_f in self.run_fs:
+            os.remove(run_f)
+        self.run_fs = []
+        return written
+
+
+class SpillDirectory:
+    """
+    Spill files of all outputs written in chunks, in a temporary directory.
+    """
+
+    def __init__(self, parent_dir: str) -> None:
+        """
+        Args:
+            parent_dir (str): Directory in which the temporary directory is created.
+        """
+        self.spill_dir: str = tempfile.mkdtemp(prefix="kinfin_spill_", dir=parent_dir)
+        self.spill_file_by_output_f: Dict[str, SpillFile] = {}
+
+    def add_lines(
+        self,
+        output_f: str,
+        lines: Iterable[str],
+        header_line: Optional[str] = None,
+        sort: bool = True,
+        min_line_count: int = 1,
+    ) -> None:
+        """
+        Adds lines of a chunk to the spill file of an output, as one run.
+
+        Args:
+            output_f (str): Path of the output file.
+            lines (Iterable[str]): Lines without trailing newlines.
+            header_line (Optional[str]): Line written before all others.
+            sort (bool): Whether the lines of the output are sorted.
+            min_line_count (int): Minimum number of lines of the output.
+
+        Returns:
+            None
+        """
+        if output_f not in self.spill_file_by_output_f:
+            self.spill_file_by_output_f[output_f] = SpillFile(
+                self.spill_dir, header_line, sort, min_line_count
+            )
+        self.spill_file_by_output_f[output_f].add_run(list(lines))
+
+    def write_output(self, output_f: str) -> bool:
+        """
+        Writes an output from its spill file and removes its runs.
+
+        Args:
+            output_f (str): Path of the output file.
+
+        Returns:
+            bool: True if the output was written, False if it had too few lines.
+        """
+        return self.spill_file_by_output_f[output_f].write(output_f)
+
+    def remove(self) -> None:
+        """
+        Removes the temporary directory, with the runs of outputs not written.
+
+        Returns:
+            None
+        """
+        self.spill_file_by_output_f = {}
+        shutil.rmtree(self.spill_dir, ignore_errors=True)
+
+    def write(self) -> List[str]:
+        """
+        Writes all outputs and removes the temporary directory.
+
+        Returns:
+            List[str]: Paths of the outputs written.
+        """
+        output_fs = [
+            output_f
+            for output_f in self.spill_file_by_output_f
+            if self.write_output(output_f)
+        ]
+        self.remove()
+        return output_fs
@@ -0,0 +1,117 @@
+import contextlib
+import logging
+import os
+import sqlite3
+import tempfile
+from typing import Callable, Optional
+
+from core.utils import set_default_permissions
+
+logger = logging.getLogger("kinfin_logger")
+
+
+def get_index_signature(source_f: str, index_version: int) -> str:
+    """
+    Returns the signature of a source file an index is built from.
+
+    Args:
+        source_f (str): Path to the source file.
+        index_version (int): Version of the layout of the index.
+
+    Returns:
+        str: Index version, size and modification time of the file.
+    """
+    stat = os.stat(source_f)
+    return f"{index_version}:{stat.st_size}:{stat.st_mtime_ns}"
+
+
+def read_index_signature(index_f: str) -> Optional[str]:
+    """
+    Returns the signature stored in an index.
+
+    Args:
+        index_f (str): Path of the index.
+
+    Returns:
+        Optional[str]: The signature, None if there is no readable index.
+    """
+    if not os.path.isfile(index_f):
+        return None
+    try:
+        connection = connect_sqlite_index(index_f)
+        try:
+            row = connection.execute(
+                "SELECT value FROM meta WHERE key = 'signature'"
+            ).fetchone()
+        finally:
+            connection.close()
+    except sqlite3.Error:
+        return None
+    return row[0] if row else None
+
+
+def connect_sqlite_index(index_f: str) -> sqlite3.Connection:
+    """
+    Returns a read-only connection to an index. A connection must not be used
+    across fork(): processes forked after it was opened need their own.
+
+    Args:
+        index_f (str): Path of the index.
+
+    Returns:
+        sqlite3.Connection: Read-only connection to the index.
+    """
+    return sqlite3.connect(f"file:{index_f}?mode=ro", uri=True)
+
+
+def open_sqlite_index(
+    source_f: str,
+    index_f: str,
+    index_version: int,
+    fill_index: Callable[[sqlite3.Connection], None],
+) -> sqlite3.Connection:
+    """
+    Opens the SQLite index of a source file read-only, (re)building it first if it
+    does not exist or was built from an older version of the file.
+
+    The index is written to a temporary file that replaces index_f once complete,
+    so that concurrent runs never open a partial index.
+
+    Args:
+        source_f (str): Path to the source file.
+        index_f (str): Path of the index.
+        index_version (int): Version of the layout of the index.
+        fill_index (Callable[[sqlite3.Connection], None]): Creates and fills the
+            tables of the index from the source file.
+
+    Returns:
+        sqlite3.Connection: Read-only connection to the index.
+
+    Raises:
+        OSError, sqlite3.Error: If the index is missing or outdated and cannot be built.
+    """
+    signature = get_index_signature(source_f, index_version)
+    if read_index_signature(index_f) != signature:
+        logger.info(f"[STATUS] - Indexing {source_f} into {index_f}")
+        fd, tmp_index_f = tempfile.mkstemp(
+            prefix=".index-", suffix=".sqlite", dir=os.path.dirname(index_f) or "."
+        )
+        os.close(fd)
+        try:
+            connection = sqlite3.connect(tmp_index_f)
+            with connection:
+                fill_index(connection)
+                connection.execute(
+                    "CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT)"
+                )
+                connection.execute(
+                    "INSERT INTO meta VALUES ('signature', ?)", (signature,)
+                )
+            connection.close()
+            set_default_permissions(tmp_index_f)
+            os.replace(tmp_index_f, index_f)
+        except BaseException:
+            with contextlib.suppress(OSError):
+                os.remove(tmp_index_f)
+            raise
+    return connect_sqlite_index(index_f)
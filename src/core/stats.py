@@ -0,0 +1,421 @@
+from collections import OrderedDict
+from functools import lru_cache
+from math import log
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import scipy
+import scipy.special
+
+from core.config import STATISTIC_CACHE_SIZE
+
+# (pvalue, log2_mean, mean_count_1, mean_count_2), see core.utils.statistic
+StatisticResult = Tuple[
+    Optional[float],
+    Optional[float],
+    Optional[float],
+    Optional[float],
+]
+
+# canonical count profile: (sorted non-zero count_1, sorted non-zero count_2,
+# test, min_proteomes)
+StatisticKey = Tuple[Tuple[int, ...], Tuple[int, ...], str, int]
+
+# largest sample size for which the exact Mann-Whitney U distribution is used
+# when there are no ties (same rule as scipy.stats.mannwhitneyu)
+MWU_EXACT_MAX_SAMPLE_SIZE = 8
+
+
+class StatisticCache:
+    """
+    Least recently used cache of representation test results by count profile.
+    """
+
+    def __init__(self, maxsize: int) -> None:
+        self.maxsize: int = maxsize
+        self.hits: int = 0
+        self.misses: int = 0
+        self.results: OrderedDict[StatisticKey, StatisticResult] = OrderedDict()
+
+    def get(self, key: StatisticKey) -> Optional[StatisticResult]:
+        """
+        Returns the cached result of a count profile and counts the hit or miss.
+
+        Args:
+            key (StatisticKey): Canonical count profile.
+
+        Returns:
+            Optional[StatisticResult]: The cached result, None if not cached.
+        """
+        result = self.results.get(key)
+        if result is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+            self.results.move_to_end(key)
+        return result
+
+    def put(self, key: StatisticKey, result: StatisticResult) -> None:
+        """
+        Caches the result of a count profile, evicting the least recently used one
+        if the cache is full.
+
+        Args:
+            key (StatisticKey): Canonical count profile.
+            result (StatisticResult): Result of the representation test.
+
+        Returns:
+            None
+        """
+        self.results[key] = result
+        self.results.move_to_end(key)
+        if len(self.results) > self.maxsize:
+            self.results.popitem(last=False)
+
+
+STATISTIC_CACHE = StatisticCache(STATISTIC_CACHE_SIZE)
+
+
+class RaggedSamples:
+    """
+    Pairs of samples of positive counts stored as one flat array.
+
+    The values of test i are values[offsets[i]:offsets[i + 1]], of which the
+    first n_1[i] belong to the first and the remaining n_2[i] to the second sample.
+    """
+
+    def __init__(self, samples_1: List[List[int]], samples_2: List[List[int]]) -> None:
+        self.n_1: np.ndarray = np.array([len(s) for s in samples_1], dtype=np.int64)
+        self.n_2: np.ndarray = np.array([len(s) for s in samples_2], dtype=np.int64)
+        self.n: np.ndarray = self.n_1 + self.n_2
+        self.offsets: np.ndarray = np.zeros(len(self.n) + 1, dtype=np.int64)
+        np.cumsum(self.n, out=self.offsets[1:])
+        self.values: np.ndarray = np.fromiter(
+            (
+                count
+                for sample_1, sample_2 in zip(samples_1, samples_2)
+                for sample in (sample_1, sample_2)
+                for count in sample
+            ),
+            dtype=np.float64,
+            count=int(self.offsets[-1]),
+        )
+        # test index of each value and whether it belongs to the first sample
+        self.test_idxs: np.ndarray = np.repeat(np.arange(len(self.n)), self.n)
+        position = np.arange(len(self.values)) - self.offsets[self.test_idxs]
+        self.in_sample_1: np.ndarray = position < self.n_1[self.test_idxs]
+
+    def __len__(self) -> int:
+        return len(self.n)
+
+    def sums(self, values: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Sums values (aligned with self.values) by sample.
+
+        Args:
+            values (np.ndarray): Values to sum.
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray]: Sums of the first and second samples.
+        """
+        size = len(self)
+        sum_1 = np.bincount(
+            self.test_idxs[self.in_sample_1],
+            weights=values[self.in_sample_1],
+            minlength=size,
+        )
+        sum_2 = np.bincount(
+            self.test_idxs[~self.in_sample_1],
+            weights=values[~self.in_sample_1],
+            minlength=size,
+        )
+        return sum_1, sum_2
+
+    def ranks(self) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Ranks the pooled values of each test, averaging the ranks of ties.
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray]:
+                - Ranks aligned with self.values.
+                - Tie term sum(t**3 - t) over groups of t tied values, by test.
+        """
+        order = np.lexsort((self.values, self.test_idxs))
+        sorted_values = self.values[order]
+        sorted_test_idxs = self.test_idxs[order]
+        is_group_start = np.ones(len(order), dtype=bool)
+        is_group_start[1:] = (sorted_values[1:] != sorted_values[:-1]) | (
+            sorted_test_idxs[1:] != sorted_test_idxs[:-1]
+        )
+        group_starts = np.flatnonzero(is_group_start)
+        group_sizes = np.diff(np.append(group_starts, len(order)))
+        # 1-based rank of the first value of each group within its test
+        first_ranks = (
+            group_starts - self.offsets[sorted_test_idxs[group_starts]] + 1
+        ).astype(np.float64)
+        ranks = np.empty(len(order), dtype=np.float64)
+        ranks[order] = np.repeat(first_ranks + (group_sizes - 1) / 2.0, group_sizes)
+        tie_terms = np.bincount(
+            sorted_test_idxs[group_starts],
+            weights=group_sizes.astype(np.float64) ** 3 - group_sizes,
+            minlength=len(self),
+        )
+        return ranks, tie_terms
+
+
+def ttest_pvalues(
+    samples: RaggedSamples, means_1: np.ndarray, means_2: np.ndarray, equal_var: bool
+) -> np.ndarray:
+    """
+    Computes two-sided p-values of Student's (or Welch's) t-test.
+
+    Args:
+        samples (RaggedSamples): Pairs of samples.
+        means_1 (np.ndarray): Means of the first samples.
+        means_2 (np.ndarray): Means of the second samples.
+        equal_var (bool): Whether to assume equal variances (Student's t-test).
+
+    Returns:
+        np.ndarray: p-values, NaN where undefined.
+    """
+    n_1 = samples.n_1.astype(np.float64)
+    n_2 = samples.n_2.astype(np.float64)
+    means = np.where(
+        samples.in_sample_1, means_1[samples.test_idxs], means_2[samples.test_idxs]
+    )
+    sum_of_squares_1, sum_of_squares_2 = samples.sums((samples.values - means) ** 2)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        var_1 = sum_of_squares_1 / (n_1 - 1)
+        var_2 = sum_of_squares_2 / (n_2 - 1)
+        if equal_var:
+            var_1 = np.where(n_1 == 1, 0.0, var_1)
+            var_2 = np.where(n_2 == 1, 0.0, var_2)
+            df = n_1 + n_2 - 2.0
+            pooled_var = ((n_1 - 1) * var_1 + (n_2 - 1) * var_2) / df
+            denom = np.sqrt(pooled_var * (1.0 / n_1 + 1.0 / n_2))
+        else:
+            vn_1 = var_1 / n_1
+            vn_2 = var_2 / n_2
+            df = (vn_1 + vn_2) ** 2 / (vn_1**2 / (n_1 - 1) + vn_2**2 / (n_2 - 1))
+            df = np.where(np.isnan(df), 1.0, df)
+            denom = np.sqrt(vn_1 + vn_2)
+        t = (means_1 - means_2) / denom
+    return 2 * scipy.special.stdtr(df, -np.abs(t))
+
+
+@lru_cache(maxsize=None)
+def mwu_exact_sf(n_1: int, n_2: int) -> np.ndarray:
+    """
+    Computes the survival function of the exact null distribution of the
+    Mann-Whitney U statistic for samples without ties.
+
+    The number of arrangements with U = k are the coefficients of the Gaussian
+    binomial coefficient [n_1 + n_2 choose n_1], built as the product of
+    (1 - q**(n_2 + i)) / (1 - q**i) for i in 1..n_1 using exact integers.
+
+    Args:
+        n_1 (int): Size of the first sample.
+        n_2 (int): Size of the second sample.
+
+    Returns:
+        np.ndarray: P(U >= k) for k in 0..n_1 * n_2.
+    """
+    n_1, n_2 = min(n_1, n_2), max(n_1, n_2)
+    size = n_1 * n_2 + 1
+    frequencies = [1] + [0] * (size - 1)
+    for i in range(1, n_1 + 1):
+        # multiply by (1 - q**(n_2 + i)), highest degree first
+        for k in range(size - 1, n_2 + i - 1, -1):
+            frequencies[k] -= frequencies[k - n_2 - i]
+        # divide by (1 - q**i)
+        for k in range(i, size):
+            frequencies[k] += frequencies[k - i]
+    total = sum(frequencies)
+    tail = 0
+    sf = [0.0] * size
+    for k in range(size - 1, -1, -1):
+        tail += frequencies[k]
+        sf[k] = tail / total
+    return np.array(sf)
+
+
+def mannwhitneyu_pvalues(samples: RaggedSamples) -> np.ndarray:
+    """
+    Computes two-sided p-values of the Mann-Whitney U test.
+
+    Follows scipy.stats.mannwhitneyu with method "auto": the exact distribution is
+    used if there are no ties and one of the samples has at most
+    MWU_EXACT_MAX_SAMPLE_SIZE values, otherwise the normal approximation with tie
+    and continuity correction.
+
+    Args:
+        samples (RaggedSamples): Pairs of samples.
+
+    Returns:
+        np.ndarray: p-values.
+    """
+    n_1 = samples.n_1.astype(np.float64)
+    n_2 = samples.n_2.astype(np.float64)
+    n = n_1 + n_2
+    ranks, tie_terms = samples.ranks()
+    rank_sums_1, _ = samples.sums(ranks)
+    U_1 = rank_sums_1 - n_1 * (n_1 + 1) / 2
+    U = np.maximum(U_1, n_1 * n_2 - U_1)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        s = np.sqrt(n_1 * n_2 / 12 * ((n + 1) - tie_terms / (n * (n - 1))))
+        z = (U - n_1 * n_2 / 2 - 0.5) / s
+    pvalues = 2 * scipy.special.ndtr(-z)
+
+    exact = (tie_terms == 0) & (
+        np.minimum(samples.n_1, samples.n_2) <= MWU_EXACT_MAX_SAMPLE_SIZE
+    )
+    for idx in np.flatnonzero(exact).tolist():
+        sf = mwu_exact_sf(int(samples.n_1[idx]), int(samples.n_2[idx]))
+        pvalues[idx] = 2 * sf[int(U[idx])]
+    return np.clip(pvalues, 0.0, 1.0)
+
+
+def kruskal_pvalues(samples: RaggedSamples) -> np.ndarray:
+    """
+    Computes p-values of the Kruskal-Wallis H-test of two samples.
+
+    Args:
+        samples (RaggedSamples): Pairs of samples.
+
+    Returns:
+        np.ndarray: p-values, NaN where undefined.
+    """
+    n_1 = samples.n_1.astype(np.float64)
+    n_2 = samples.n_2.astype(np.float64)
+    n = n_1 + n_2
+    ranks, tie_terms = samples.ranks()
+    rank_sums_1, rank_sums_2 = samples.sums(ranks)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        ties = 1 - tie_terms / (n**3 - n)
+        h = 12.0 / (n * (n + 1)) * (
+            rank_sums_1**2 / n_1 + rank_sums_2**2 / n_2
+        ) - 3 * (n + 1)
+        h /= ties
+    return scipy.special.chdtrc(1.0, h)
+
+
+def ks_pvalues(samples_1: List[List[int]], samples_2: List[List[int]]) -> np.ndarray:
+    """
+    Computes two-sided p-values of the two-sample Kolmogorov-Smirnov test.
+
+    The exact KS distribution has no closed form that vectorizes, so scipy is
+    called for each pair (batch_statistic only passes distinct count profiles).
+
+    Args:
+        samples_1 (List[List[int]]): First samples.
+        samples_2 (List[List[int]]): Second samples.
+
+    Returns:
+        np.ndarray: p-values.
+    """
+    return np.array(
+        [
+            scipy.stats.ks_2samp(sample_1, sample_2)[1]
+            for sample_1, sample_2 in zip(samples_1, samples_2)
+        ],
+        dtype=np.float64,
+    )
+
+
+def batch_statistic(
+    counts_1: Sequence[Sequence[int]],
+    counts_2: Sequence[Sequence[int]],
+    test: str,
+    min_proteomes: int,
+    cache: Optional[StatisticCache] = STATISTIC_CACHE,
+) -> List[StatisticResult]:
+    """
+    Batched version of core.utils.statistic.
+
+    Performs the representation test between counts_1[i] and counts_2[i] for all i
+    at once. Counts of zero are ignored, tests with fewer than min_proteomes
+    non-zero counts in either list get a result of all None, and tests of lists
+    that consist of one and the same value get a p-value of 1.0.
+
+    Since results only depend on the sorted non-zero counts, each distinct count
+    profile is tested once and its result is kept in the cache for later batches.
+
+    Args:
+        counts_1 (Sequence[Sequence[int]]): First lists of counts.
+        counts_2 (Sequence[Sequence[int]]): Second lists of counts.
+        test (str): One of "welch", "mannwhitneyu", "ttest", "ks", "kruskal".
+        min_proteomes (int): Minimum number of non-zero counts in each list.
+        cache (Optional[StatisticCache]): Cache of results by count profile,
+            None to disable caching.
+
+    Returns:
+        List[StatisticResult]: (pvalue, log2_mean, mean_count_1, mean_count_2)
+            for each pair of lists.
+    """
+    results: List[StatisticResult] = [(None, None, None, None)] * len(counts_1)
+    min_count = max(min_proteomes, 1)
+
+    idxs_by_key: Dict[StatisticKey, List[int]] = {}
+    for idx, (count_1, count_2) in enumerate(zip(counts_1, counts_2)):
+        implicit_count_1 = sorted(count for count in count_1 if count > 0)
+        implicit_count_2 = sorted(count for count in count_2 if count > 0)
+        if len(implicit_count_1) < min_count or len(implicit_count_2) < min_count:
+            continue
+        key = (tuple(implicit_count_1), tuple(implicit_count_2), test, min_proteomes)
+        if key in idxs_by_key:
+            idxs_by_key[key].append(idx)
+            if cache is not None:
+                cache.hits += 1
+            continue
+        cached_result = cache.get(key) if cache is not None else None
+        if cached_result is None:
+            idxs_by_key[key] = [idx]
+        else:
+            results[idx] = cached_result
+
+    if not idxs_by_key:
+        return results
+
+    keys = list(idxs_by_key)
+    samples_1 = [list(key[0]) for key in keys]
+    samples_2 = [list(key[1]) for key in keys]
+
+    samples = RaggedSamples(samples_1, samples_2)
+    sums_1, sums_2 = samples.sums(samples.values)
+    means_1 = sums_1 / samples.n_1
+    means_2 = sums_2 / samples.n_2
+
+    equal = (
+        (np.minimum.reduceat(samples.values, samples.offsets[:-1]) == means_1)
+        & (np.maximum.reduceat(samples.values, samples.offsets[:-1]) == means_1)
+        & (means_1 == means_2)
+    )
+    if test == "welch":
+        pvalues = ttest_pvalues(samples, means_1, means_2, equal_var=False)
+    elif test == "ttest":
+        pvalues = ttest_pvalues(samples, means_1, means_2, equal_var=True)
+    elif test == "mannwhitneyu":
+        pvalues = mannwhitneyu_pvalues(samples)
+    elif test == "kruskal":
+        pvalues = kruskal_pvalues(samples)
+    elif test == "ks":
+        pvalues = ks_pvalues(samples_1, samples_2)
+    else:
+        raise ValueError(f"Unsupported test: {test}")
+    pvalues[equal | np.isnan(pvalues)] = 1.0
+
+    for key, pvalue, mean_count_1, mean_count_2 in zip(
+        keys, pvalues.tolist(), means_1.tolist(), means_2.tolist()
+    ):
+        result: StatisticResult = (
+            pvalue,
+            log(mean_count_1 / mean_count_2, 2),
+            mean_count_1,
+            mean_count_2,
+        )
+        if cache is not None:
+            cache.put(key, result)
+        for idx in idxs_by_key[key]:
+            results[idx] = result
+    return results
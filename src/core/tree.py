@@ -0,0 +1,218 @@
+from typing import Dict, List, Tuple
+
+import numpy as np
+from ete3 import Tree, TreeNode
+
+
+class TreeIndex:
+    """
+    Lowest common ancestor (LCA) queries on the nodes of a tree.
+
+    Nodes are numbered in level order. Every node gets the interval of its
+    subtree in an Euler tour of the tree, and a sparse table over the depths of
+    the tour answers range minimum queries (RMQ) in constant time, which gives
+    the LCA of any set of leaves.
+
+    The node counts of clusters are only updated along the paths from the leaves
+    of a cluster to the root. The number of clusters present in each node is
+    tracked, so that 'absent' counts can be filled in by subtraction.
+
+    Leaf names are assumed to be unique proteome IDs.
+    """
+
+    def __init__(
+        self, tree_ete: Tree, proteome_idx_by_proteome_id: Dict[str, int]
+    ) -> None:
+        self.nodes: List[TreeNode] = list(tree_ete.traverse("levelorder"))  # type: ignore
+        node_idx_by_node_id: Dict[int, int] = {
+            id(node): node_idx for node_idx, node in enumerate(self.nodes)
+        }
+        self.parent_idxs: List[int] = [
+            node_idx_by_node_id[id(node.up)] if node.up else -1 for node in self.nodes
+        ]
+        self.leaf_idx_by_proteome_idx: Dict[int, int] = {
+            proteome_idx_by_proteome_id[node.name]: node_idx
+            for node_idx, node in enumerate(self.nodes)
+            if node.is_leaf() and node.name in proteome_idx_by_proteome_id
+        }
+        # proteomes present in the tree
+        self.proteome_bitmask: int = 0
+        for proteome_idx in self.leaf_idx_by_proteome_idx:
+            self.proteome_bitmask |= 1 << proteome_idx
+
+        self.__build_euler_tour()
+        self.__build_sparse_table()
+
+        self.visited: List[int] = [0] * len(self.nodes)
+        self.visit_stamp: int = 0
+        self.present_cluster_counts: List[int] = [0] * len(self.nodes)
+        self.cluster_count: int = 0
+
+    def __build_euler_tour(self) -> None:
+        """
+        Builds the Euler tour of the tree: the sequence of nodes visited by a
+        depth-first traversal, listing a node again after each of its children.
+
+        Returns:
+            None
+        """
+        child_idxs: List[List[int]] = [[] for _ in self.nodes]
+        for node_idx, parent_idx in enumerate(self.parent_idxs):
+            if parent_idx >= 0:
+                child_idxs[parent_idx].append(node_idx)
+
+        self.first_euler_idxs: List[int] = [0] * len(self.nodes)
+        self.last_euler_idxs: List[int] = [0] * len(self.nodes)
+        euler_nodes: List[int] = []
+        euler_depths: List[int] = []
+        stack: List[Tuple[int, int, int]] = [(0, 0, 0)]
+        while stack:
+            node_idx, depth, child_pos = stack.pop()
+            if child_pos == 0:
+                self.first_euler_idxs[node_idx] = len(euler_nodes)
+            euler_nodes.append(node_idx)
+            euler_depths.append(depth)
+            self.last_euler_idxs[node_idx] = len(euler_nodes) - 1
+            if child_pos < len(child_idxs[node_idx]):
+                stack.append((node_idx, depth, child_pos + 1))
+                stack.append((child_idxs[node_idx][child_pos], depth + 1, 0))
+
+        self.euler_nodes: np.ndarray = np.array(euler_nodes, dtype=np.int64)
+        self.euler_depths: np.ndarray = np.array(euler_depths, dtype=np.int64)
+
+    def __build_sparse_table(self) -> None:
+        """
+        Builds the sparse table of the Euler tour, where level k holds the position
+        of the shallowest node in each window of 2**k positions.
+
+        Returns:
+            None
+        """
+        euler_tour_length = len(self.euler_depths)
+        positions = np.arange(euler_tour_length, dtype=np.int64)
+        self.sparse_table: List[List[int]] = [positions.tolist()]
+        width = 1
+        while 2 * width <= euler_tour_length:
+            previous = positions
+            left, right = previous[:-width], previous[width:]
+            positions = np.where(
+                self.euler_depths[right] < self.euler_depths[left], right, left
+            )
+            self.sparse_table.append(positions.tolist())
+            width *= 2
+
+    def get_lca(self, node_idxs: List[int]) -> int:
+        """
+        Returns the lowest common ancestor of a set of nodes.
+
+        Args:
+            node_idxs (List[int]): Indices of the nodes.
+
+        Returns:
+            int: Index of the LCA.
+        """
+        start = min(self.first_euler_idxs[node_idx] for node_idx in node_idxs)
+        end = max(self.first_euler_idxs[node_idx] for node_idx in node_idxs) + 1
+        level = (end - start).bit_length() - 1
+        left = self.sparse_table[level][start]
+        right = self.sparse_table[level][end - (1 << level)]
+        if self.euler_depths[right] < self.euler_depths[left]:
+            left = right
+        return int(self.euler_nodes[left])
+
+    def is_ancestor(self, node_idx: int, other_node_idx: int) -> bool:
+        """
+        Checks whether a node is an ancestor of (or the same as) another node.
+
+        Args:
+            node_idx (int): Index of the potential ancestor.
+            other_node_idx (int): Index of the other node.
+
+        Returns:
+            bool: True if node_idx is an ancestor of other_node_idx.
+        """
+        return (
+            self.first_euler_idxs[node_idx]
+            <= self.first_euler_idxs[other_node_idx]
+            <= self.last_euler_idxs[node_idx]
+        )
+
+    def get_cluster_nodes(self, proteome_bitmask: int) -> Tuple[List[int], int]:
+        """
+        Returns the nodes containing at least one proteome of a cluster, and the
+        node below which all proteomes of the cluster are found.
+
+        Counts the cluster as present in the returned nodes.
+
+        Args:
+            proteome_bitmask (int): Bitmask of the proteomes of the cluster.
+
+        Returns:
+            Tuple[List[int], int]:
+                - Indices of the nodes on the paths from the leaves of the
+                  cluster to the root.
+                - Index of the LCA of the leaves of the cluster, -1 if the
+                  cluster has proteomes that are not in the tree.
+        """
+        self.cluster_count += 1
+        self.visit_stamp += 1
+
+        leaf_idxs: List[int] = []
+        bitmask = proteome_bitmask & self.proteome_bitmask
+        while bitmask:
+            lowest_bit = bitmask & -bitmask
+            leaf_idxs.append(self.leaf_idx_by_proteome_idx[lowest_bit.bit_length() - 1])
+            bitmask ^= lowest_bit
+
+        present_node_idxs: List[int] = []
+        for node_idx in leaf_idxs:
+            while node_idx >= 0 and self.visited[node_idx] != self.visit_stamp:
+                self.visited[node_idx] = self.visit_stamp
+                self.present_cluster_counts[node_idx] += 1
+                present_node_idxs.append(node_idx)
+                node_idx = self.parent_idxs[node_idx]
+
+        if not leaf_idxs or proteome_bitmask & ~self.proteome_bitmask:
+            return present_node_idxs, -1
+        return present_node_idxs, self.get_lca(leaf_idxs)
+
+    def add_singleton_counts(self, singleton_counts: List[int]) -> None:
+        """
+        Adds singleton clusters to the nodes on the paths from their leaves to the
+        root, given only their number by proteome.
+
+        Singletons of proteomes that are not in the tree are counted as absent
+        from all nodes.
+
+        Args:
+            singleton_counts (List[int]): Number of singletons by proteome index.
+
+        Returns:
+            None
+        """
+        for proteome_idx, singleton_count in enumerate(singleton_counts):
+            if not singleton_count:
+                continue
+            self.cluster_count += singleton_count
+            node_idx = self.leaf_idx_by_proteome_idx.get(proteome_idx, -1)
+            while node_idx >= 0:
+                node = self.nodes[node_idx]
+                node.counts["singleton"] += singleton_count  # type: ignore
+                node.apomorphic_cluster_counts["singletons"] += singleton_count  # type: ignore
+                self.present_cluster_counts[node_idx] += singleton_count
+                node_idx = self.parent_idxs[node_idx]
+
+    def add_absent_counts(self) -> None:
+        """
+        Adds the clusters seen since the last call that are not present in a node
+        to its 'absent' count, then resets the tracked counts.
+
+        Returns:
+            None
+        """
+        for node, present_cluster_count in zip(self.nodes, self.present_cluster_counts):
+            node.counts["absent"] += (  # type: ignore
+                self.cluster_count - present_cluster_count
+            )
+        self.present_cluster_counts = [0] * len(self.nodes)
+        self.cluster_count = 0
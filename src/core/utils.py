@@ -1,15 +1,23 @@
 import gzip
 import json
 import logging
+import mmap
 import os
+import re
 import sys
 from math import log, sqrt
 from typing import Any, Generator, List, Optional, Tuple, Union
 
+import numpy as np
 import scipy
 
 logger = logging.getLogger("kinfin_logger")
 
+# characters of protein IDs replaced by orthofinder
+FASTA_HEADER_TRANSLATION = str.maketrans(":,()", "____")
+# bytes of a FASTA file scanned at once by read_fasta_lengths
+FASTA_SCAN_WINDOW_SIZE = 64 * 2**20
+
 
 def progress(iteration: int, steps: Union[int, float], max_value: int) -> None:
     """
@@ -36,6 +44,23 @@ def progress(iteration: int, steps: Union[int, float], max_value: int) -> None:
         sys.stdout.flush()
 
 
+def set_default_permissions(path: str) -> None:
+    """
+    Sets the permissions of a file or directory created by tempfile (which are
+    private to the user) to those of a file or directory created by open or
+    os.makedirs, given the umask, so that shared outputs can be read by others.
+
+    Args:
+        path (str): Path of the file or directory.
+
+    Returns:
+        None
+    """
+    umask = os.umask(0)
+    os.umask(umask)
+    os.chmod(path, (0o777 if os.path.isdir(path) else 0o666) & ~umask)
+
+
 def check_file(filepath: Optional[str], install_kinfin: bool = False) -> None:
     """
     Check if a file exists.
@@ -103,6 +128,168 @@ def yield_config_lines(
     return
 
 
+def get_fasta_header_ids(header_lines: bytes, header_count: int) -> List[str]:
+    """
+    Returns the protein IDs of FASTA headers: their first word, with the characters
+    replaced by orthofinder.
+
+    Args:
+    - header_lines (bytes): Header lines without '>', separated by newlines.
+    - header_count (int): Number of header lines.
+
+    Returns:
+    List[str]: The protein IDs.
+    """
+    # decoded and translated at once, only headers with descriptions (or carriage
+    # returns) need to be split one by one
+    headers = (
+        header_lines.decode("utf-8")
+        .translate(FASTA_HEADER_TRANSLATION)
+        .split("\n")[:header_count]
+    )
+    if re.search(r"[^\S\n]", "".join(headers)):
+        return [header.split(None, 1)[0] for header in headers]
+    return headers
+
+
+def read_fai_lengths(fai_file: str) -> Tuple[List[str], List[int]]:
+    """
+    Parses a FASTA index (as written by `samtools faidx`).
+
+    Args:
+    - fai_file (str): Path to the FASTA index.
+
+    Returns:
+    Tuple[List[str], List[int]]: The protein IDs and sequence lengths.
+    """
+    names: List[bytes] = []
+    lengths: List[int] = []
+    with open(fai_file, "rb") as fh:
+        for line in fh:
+            if line.strip():
+                name, length = line.split(b"\t", 2)[:2]
+                names.append(name)
+                lengths.append(int(length))
+    return get_fasta_header_ids(b"\n".join(names), len(names)), lengths
+
+
+def read_fasta_lengths(fasta_file: str) -> Tuple[List[str], List[int]]:
+    """
+    Parses the protein IDs and sequence lengths of a FASTA file.
+
+    Uses the FASTA index ('<fasta_file>.fai') if there is one that is not older than
+    the FASTA file. Otherwise the file is memory-mapped and scanned as bytes, with
+    numpy, in windows of FASTA_SCAN_WINDOW_SIZE bytes: the length of a sequence is
+    the size of its block minus its line breaks, so sequences are never joined. Line breaks are '\n', '\r\n' or '\r', as for
+    files opened in text mode.
+
+    Args:
+    - fasta_file (str): Path to the FASTA file to be parsed.
+
+    Returns:
+    Tuple[List[str], List[int]]: The protein IDs and sequence lengths.
+
+    Raises:
+    FileNotFoundError: If the specified FASTA file does not exist.
+    """
+    check_file(fasta_file)
+    fai_file = f"{fasta_file}.fai"
+    if os.path.isfile(fai_file) and os.path.getmtime(fai_file) >= os.path.getmtime(
+        fasta_file
+    ):
+        logger.info(f"[STATUS]\t - Parsing FASTA index {fai_file}")
+        return read_fai_lengths(fai_file)
+
+    logger.info(f"[STATUS]\t - Parsing FASTA {fasta_file}")
+    header_idxs_by_window: List[np.ndarray] = []
+    header_end_idxs_by_window: List[np.ndarray] = []
+    # line breaks before each header
+    line_break_counts_by_window: List[np.ndarray] = []
+    line_break_count = 0
+    with open(fasta_file, "rb") as fh:
+        size = os.fstat(fh.fileno()).st_size
+        if not size:
+            return [], []
+        with mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            buffer = np.frombuffer(data, dtype=np.uint8)
+            try:
+                # the file is scanned in windows, so that the masks of the scan
+                # stay small whatever the size of the file
+                previous_is_line_break = True
+                # end of the last header line, if it was not found in its window
+                pending_header_end_idxs: Optional[np.ndarray] = None
+                for start in range(0, size, FASTA_SCAN_WINDOW_SIZE):
+                    window = buffer[start : start + FASTA_SCAN_WINDOW_SIZE]
+                    is_line_break = window == ord("\n")
+                    is_line_break |= window == ord("\r")
+                    line_break_idxs = np.flatnonzero(is_line_break)
+                    if pending_header_end_idxs is not None and line_break_idxs.size:
+                        pending_header_end_idxs[-1] = start + line_break_idxs[0] + 1
+                        pending_header_end_idxs = None
+                    header_idxs = np.flatnonzero(window == ord(">"))
+                    is_header = is_line_break[header_idxs - 1]
+                    if header_idxs.size and header_idxs[0] == 0:
+                        is_header[0] = previous_is_line_break
+                    header_idxs = header_idxs[is_header]
+                    previous_is_line_break = bool(is_line_break[-1])
+                    del is_line_break, is_header
+                    if header_idxs.size:
+                        # header lines end at their first line break character
+                        # (included), -1 if it is not in the window
+                        line_break_positions = np.searchsorted(
+                            line_break_idxs, header_idxs
+                        )
+                        header_end_idxs = np.append(start + line_break_idxs + 1, -1)[
+                            line_break_positions
+                        ]
+                        if header_end_idxs[-1] == -1:
+                            pending_header_end_idxs = header_end_idxs
+                        header_idxs_by_window.append(start + header_idxs)
+                        header_end_idxs_by_window.append(header_end_idxs)
+                        line_break_counts_by_window.append(
+                            line_break_count + line_break_positions
+                        )
+                    line_break_count += line_break_idxs.size
+                if not header_idxs_by_window:
+                    return [""], [size - line_break_count]
+                # the last header line may end at the end of the file
+                last_header_has_line_break = pending_header_end_idxs is None
+                if pending_header_end_idxs is not None:
+                    pending_header_end_idxs[-1] = size
+                header_idxs = np.concatenate(header_idxs_by_window)
+                header_end_idxs = np.concatenate(header_end_idxs_by_window)
+                header_line_break_counts = np.concatenate(line_break_counts_by_window)
+                header_sizes = header_end_idxs - header_idxs - 1
+                header_lines = buffer[
+                    np.repeat(
+                        header_idxs + 1 - (np.cumsum(header_sizes) - header_sizes),
+                        header_sizes,
+                    )
+                    + np.arange(header_sizes.sum())
+                ].tobytes()
+                # each header line ends with its first line break character
+                header_lines = header_lines.replace(b"\r", b"\n")
+            finally:
+                # the mmap cannot be closed while numpy holds on to it
+                del buffer
+                window = None
+    # sequences before the first header are ignored, a sequence runs from the end
+    # of its header line to the next header
+    sequence_end_idxs = np.append(header_idxs[1:], size)
+    header_end_line_break_counts = header_line_break_counts + 1
+    if not last_header_has_line_break:
+        header_end_line_break_counts[-1] -= 1
+    lengths = (
+        sequence_end_idxs
+        - header_end_idxs
+        - (
+            np.append(header_line_break_counts[1:], line_break_count)
+            - header_end_line_break_counts
+        )
+    )
+    return get_fasta_header_ids(header_lines, header_idxs.size), lengths.tolist()
+
+
 def read_fasta_len(fasta_file: str) -> Generator[Tuple[str, int], Any, None]:
     """
     Generator function to parse a FASTA file and yield tuples of header and sequence length.
@@ -116,34 +303,7 @@ def read_fasta_len(fasta_file: str) -> Generator[Tuple[str, int], Any, None]:
     Raises:
     FileNotFoundError: If the specified FASTA file does not exist.
     """
-    check_file(fasta_file)
-    with open(fasta_file) as fh:
-        logger.info(f"[STATUS]\t - Parsing FASTA {fasta_file}")
-        header: str = ""
-        seqs: List[str] = []
-        for line in fh:
-            if line[0] == ">":
-                if header:
-                    header = (
-                        header.replace(":", "_")
-                        .replace(",", "_")
-                        .replace("(", "_")
-                        .replace(")", "_")
-                    )  # orthofinder replaces chars
-                    yield header, len("".join(seqs))
-                header, seqs = (
-                    line[1:-1].split()[0],
-                    [],
-                )  # Header is split at first whitespace
-            else:
-                seqs.append(line[:-1])
-        header = (
-            header.replace(":", "_")
-            .replace(",", "_")
-            .replace("(", "_")
-            .replace(")", "_")
-        )  # orthofinder replaces chars
-        yield header, len("".join(seqs))
+    yield from zip(*read_fasta_lengths(fasta_file))
 
 
 def median(lst) -> float:
@@ -191,7 +351,8 @@ def sd(lst, population=True) -> float:
     - float: Standard deviation of the list.
     """
     n = len(lst)
-    differences = [x_ - mean(lst) for x_ in lst]
+    lst_mean = mean(lst)
+    differences = [x_ - lst_mean for x_ in lst]
     sq_differences = [d**2 for d in differences]
     ssd = sum(sq_differences)
     variance = ssd / n if population is True else ssd / (n - 1)
@@ -0,0 +1,252 @@
+import logging
+import os
+import shutil
+import tempfile
+from typing import Iterable, List, Optional, TextIO
+
+from core.spill import OUTPUT_BUFFER_SIZE, SpillDirectory, SpillFile
+
+logger = logging.getLogger("kinfin_logger")
+
+# lines held in memory by a SortedOutputWriter before they are spilled as a run
+SORT_BUFFER_LINE_COUNT = 200_000
+
+
+class LineWriter:
+    """
+    Lines of an output file, added one at a time. Used as a context manager, the
+    output is completed when the block exits without an error.
+    """
+
+    def add_line(self, line: str) -> None:
+        """
+        Adds a line.
+
+        Args:
+            line (str): Line without trailing newline.
+
+        Returns:
+            None
+        """
+        raise NotImplementedError
+
+    def add_lines(self, lines: Iterable[str]) -> None:
+        """
+        Adds lines.
+
+        Args:
+            lines (Iterable[str]): Lines without trailing newlines.
+
+        Returns:
+            None
+        """
+        for line in lines:
+            self.add_line(line)
+
+    def close(self) -> bool:
+        """
+        Completes the output.
+
+        Returns:
+            bool: True if the output file was written.
+        """
+        raise NotImplementedError
+
+    def abort(self) -> None:
+        """
+        Releases the resources of an output that is not completed.
+
+        Returns:
+            None
+        """
+
+    def __enter__(self) -> "LineWriter":
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+
+class OutputWriter(LineWriter):
+    """
+    Writes lines to an output file as they are added, in that order, through a
+    buffered file handle.
+
+    The file is only created (with its header) once min_line_count lines were
+    added, so that outputs with fewer lines are not written at all.
+    """
+
+    def __init__(
+        self,
+        output_f: str,
+        header_line: Optional[str] = None,
+        min_line_count: int = 1,
+    ) -> None:
+        """
+        Args:
+            output_f (str): Path of the output file.
+            header_line (Optional[str]): Line written before all others.
+            min_line_count (int): Minimum number of lines for the file to be written.
+        """
+        self.output_f: str = output_f
+        self.header_line: Optional[str] = header_line
+        self.min_line_count: int = min_line_count
+        # lines added before the file is created
+        self.pending_lines: List[str] = []
+        self.output_fh: Optional[TextIO] = None
+
+    def __open(self) -> None:
+        logger.info(f"[STATUS] - Writing {self.output_f}")
+        self.output_fh = open(self.output_f, "w", buffering=OUTPUT_BUFFER_SIZE)
+        if self.header_line is not None:
+            self.output_fh.write(f"{self.header_line}\n")
+        self.output_fh.writelines(f"{line}\n" for line in self.pending_lines)
+        self.pending_lines = []
+
+    def add_line(self, line: str) -> None:
+        if self.output_fh is not None:
+            self.output_fh.write(f"{line}\n")
+            return
+        self.pending_lines.append(line)
+        if len(self.pending_lines) >= self.min_line_count:
+            self.__open()
+
+    def add_lines(self, lines: Iterable[str]) -> None:
+        lines = iter(lines)
+        if self.output_fh is None:
+            for line in lines:
+                self.add_line(line)
+                if self.output_fh is not None:
+                    break
+        if self.output_fh is not None:
+            self.output_fh.writelines(f"{line}\n" for line in lines)
+
+    def close(self) -> bool:
+        self.pending_lines = []
+        if self.output_fh is None:
+            return False
+        self.output_fh.close()
+        self.output_fh = None
+        return True
+
+    def abort(self) -> None:
+        self.pending_lines = []
+        if self.output_fh is not None:
+            self.output_fh.close()
+            self.output_fh = None
+
+
+class SortedOutputWriter(LineWriter):
+    """
+    Writes the lines of an output file in sorted order, for lines that are not
+    added in that order.
+
+    Lines are sorted in memory, unless there are more than buffer_line_count: then
+    they are spilled as sorted runs to a temporary directory next to the output
+    and merged (see SpillFile), so that memory stays bounded.
+    """
+
+    def __init__(
+        self,
+        output_f: str,
+        header_line: Optional[str] = None,
+        min_line_count: int = 1,
+        buffer_line_count: int = SORT_BUFFER_LINE_COUNT,
+    ) -> None:
+        """
+        Args:
+            output_f (str): Path of the output file.
+            header_line (Optional[str]): Line written before all others.
+            min_line_count (int): Minimum number of lines for the file to be written.
+            buffer_line_count (int): Maximum number of lines held in memory.
+        """
+        self.output_f: str = output_f
+        self.header_line: Optional[str] = header_line
+        self.min_line_count: int = min_line_count
+        self.buffer_line_count: int = buffer_line_count
+        self.lines: List[str] = []
+        self.spill_file: Optional[SpillFile] = None
+
+    def add_line(self, line: str) -> None:
+        self.lines.append(line)
+        if len(self.lines) >= self.buffer_line_count:
+            if self.spill_file is None:
+                self.spill_file = SpillFile(
+                    tempfile.mkdtemp(
+                        prefix="kinfin_sort_",
+                        dir=os.path.dirname(self.output_f) or ".",
+                    ),
+                    self.header_line,
+                    min_line_count=self.min_line_count,
+                )
+            self.spill_file.add_run(self.lines)
+            self.lines = []
+
+    def close(self) -> bool:
+        if self.spill_file is None:
+            self.lines.sort()
+            output_writer = OutputWriter(
+                self.output_f, self.header_line, self.min_line_count
+            )
+            output_writer.add_lines(self.lines)
+            self.lines = []
+            return output_writer.close()
+        self.spill_file.add_run(self.lines)
+        self.lines = []
+        if written := self.spill_file.line_count >= self.min_line_count:
+            logger.info(f"[STATUS] - Writing {self.output_f}")
+        self.spill_file.write(self.output_f)
+        self.abort()
+        return written
+
+    def abort(self) -> None:
+        self.lines = []
+        if self.spill_file is not None:
+            shutil.rmtree(self.spill_file.spill_dir, ignore_errors=True)
+            self.spill_file = None
+
+
+class SpillRunWriter(LineWriter):
+    """
+    Collects the lines of an output for the clusters of a chunk, which are added
+    to its spill file as one run when closed (see SpillDirectory).
+    """
+
+    def __init__(
+        self,
+        spillDirectory: SpillDirectory,
+        output_f: str,
+        header_line: Optional[str] = None,
+        sort: bool = True,
+        min_line_count: int = 1,
+    ) -> None:
+        """
+        Args:
+            spillDirectory (SpillDirectory): Spill files of the outputs.
+            output_f (str): Path of the output file.
+            header_line (Optional[str]): Line written before all others.
+            sort (bool): Whether the lines of the output are sorted.
+            min_line_count (int): Minimum number of lines of the output.
+        """
+        self.spillDirectory: SpillDirectory = spillDirectory
+        self.output_f: str = output_f
+        self.header_line: Optional[str] = header_line
+        self.sort: bool = sort
+        self.min_line_count: int = min_line_count
+        self.lines: List[str] = []
+
+    def add_line(self, line: str) -> None:
+        self.lines.append(line)
+
+    def close(self) -> bool:
+        self.spillDirectory.add_lines(
+            self.output_f, self.lines, self.header_line, self.sort, self.min_line_count
+        )
+        self.lines = []
+        return False
+
+    def abort(self) -> None:
+        self.lines = []
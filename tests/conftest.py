@@ -1,6 +1,12 @@
 import os
+import sys
 from typing import List, Tuple
 
+# modules under test are imported as in src/main.py (from core.x import ...)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(__file__)), "src"))
+
+from core.plot_registry import PLOT_MANIFEST_FILENAME  # noqa: E402
+
 
 def pytest_addoption(parser) -> None:
     """Add argument to take path to generated and expected output directories"""
@@ -51,11 +57,14 @@ def get_file_pairs(config) -> List[Tuple[str, str]]:
 
 def get_files(directory) -> List[str]:
     """
-    Recursively get all files in a directory
+    Recursively get all files in a directory, except the manifest of the plots
+    of the run (see PlotRegistry), which depends on the run
     """
     file_list = []
     for root, _, files in os.walk(directory):
         for file in files:
+            if file == PLOT_MANIFEST_FILENAME:
+                continue
             relative_path = os.path.relpath(os.path.join(root, file), directory)
             file_list.append(relative_path)
     return file_list
@@ -0,0 +1,40 @@
+import os
+
+import pytest
+
+from core.utils import read_fasta_lengths
+
+FASTA = ">p1 first protein\nMKVL\nLLA\n>p2:a\nAAAA\n\n>p3\nM\n"
+EXPECTED = (["p1", "p2_a", "p3"], [7, 4, 1])
+
+
+@pytest.mark.parametrize(
+    "line_break",
+    ["\n", "\r\n", "\r"],
+    ids=["LF", "CRLF", "CR"],
+)
+def test_read_fasta_lengths_line_breaks(tmp_path, line_break: str) -> None:
+    fasta_f = os.path.join(tmp_path, "proteins.fa")
+    with open(fasta_f, "wb") as fh:
+        fh.write(FASTA.replace("\n", line_break).encode())
+    # line breaks are not counted, whatever the line ending
+    assert read_fasta_lengths(fasta_f) == EXPECTED
+
+
+def test_read_fasta_lengths_without_trailing_line_break(tmp_path) -> None:
+    fasta_f = os.path.join(tmp_path, "proteins.fa")
+    with open(fasta_f, "wb") as fh:
+        fh.write(b">p1\r\nMKV\r\nLL\r\n>p2\r\nMM")
+    assert read_fasta_lengths(fasta_f) == (["p1", "p2"], [5, 2])
+
+
+@pytest.mark.parametrize("window_size", [1, 2, 3, 5, 8, 13])
+def test_read_fasta_lengths_windows(tmp_path, monkeypatch, window_size: int) -> None:
+    fasta_f = os.path.join(tmp_path, "proteins.fa")
+    with open(fasta_f, "wb") as fh:
+        fh.write(b"MM\n>p0 a>b\r\n" + FASTA.replace("\n", "\r\n").encode() + b">p4")
+    expected = read_fasta_lengths(fasta_f)
+    assert expected == (["p0", *EXPECTED[0], "p4"], [0, *EXPECTED[1], 0])
+    # windows end within headers, line breaks and sequences
+    monkeypatch.setattr("core.utils.FASTA_SCAN_WINDOW_SIZE", window_size)
+    assert read_fasta_lengths(fasta_f) == expected
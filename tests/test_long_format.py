@@ -0,0 +1,48 @@
+from typing import Dict, List
+
+import pytest
+
+from core.long_format import LongFormatReader, write_offset_index
+
+HEADER = ["#cluster_id", "level", "protein_count"]
+# rows of a long-format output, by cluster, in the order of the output
+ROWS_BY_CLUSTER_ID: Dict[str, List[List[str]]] = {
+    "OG0": [["OG0", "A", "3"], ["OG0", "B", "1"]],
+    "OG1": [["OG1", "B", "2"]],
+    "OG10": [["OG10", "A", "1"], ["OG10", "B", "4"], ["OG10", "C", "1"]],
+    "OG2": [["OG2", "C", "5"]],
+}
+
+
+@pytest.fixture
+def reader(tmp_path) -> LongFormatReader:
+    long_f = str(tmp_path / "cluster_metrics.long.txt")
+    with open(long_f, "w") as long_fh:
+        long_fh.write("\t".join(HEADER) + "\n")
+        for rows in ROWS_BY_CLUSTER_ID.values():
+            for row in rows:
+                long_fh.write("\t".join(row) + "\n")
+    write_offset_index(long_f)
+    return LongFormatReader(long_f)
+
+
+@pytest.mark.parametrize("cluster_id", ["OG0", "OG10", "OG2"])
+def test_get_cluster_rows(reader, cluster_id) -> None:
+    """The rows of the first, a middle and the last cluster are read exactly"""
+    assert reader.header == HEADER
+    assert reader.get_cluster_rows(cluster_id) == ROWS_BY_CLUSTER_ID[cluster_id]
+
+
+@pytest.mark.parametrize("cluster_id", ["OG3", "OG", "#cluster_id"])
+def test_get_cluster_rows_missing(reader, cluster_id) -> None:
+    """Clusters that are not in the output (nor the header) have no rows"""
+    assert reader.get_cluster_rows(cluster_id) == []
+
+
+@pytest.mark.parametrize("level", ["A", "B", "C", "D"])
+def test_iter_level_rows(reader, level) -> None:
+    """The rows of a level are read in the order of the output"""
+    expected = [
+        row for rows in ROWS_BY_CLUSTER_ID.values() for row in rows if row[1] == level
+    ]
+    assert list(reader.iter_level_rows(level)) == expected
@@ -0,0 +1,55 @@
+import json
+import os
+import subprocess
+import sys
+
+SRC_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), "src")
+
+# rarefaction curves of two levels, whose proteomes are sets of strings
+CURVES_SCRIPT = """
+import json
+
+import numpy as np
+import scipy.sparse
+
+from core.alo import AttributeLevel
+from core.rarefaction import compute_rarefaction_curves
+
+proteome_ids = [f"proteome_{idx}" for idx in range(12)]
+proteome_idx_by_proteome_id = {
+    proteome_id: idx for idx, proteome_id in enumerate(proteome_ids)
+}
+presence = scipy.sparse.csr_matrix(
+    np.random.default_rng(0).random((200, len(proteome_ids))) < 0.2
+)
+ALOs = [
+    AttributeLevel("all", "all", set(proteome_ids), proteome_idx_by_proteome_id),
+    AttributeLevel("grp", "a", set(proteome_ids[::2]), proteome_idx_by_proteome_id),
+]
+print(
+    json.dumps(
+        compute_rarefaction_curves(
+            presence, [ALO.proteome_idxs for ALO in ALOs], repetitions=5, seed=7
+        )
+    )
+)
+"""
+
+
+def compute_curves(hash_seed: str):
+    env = {**os.environ, "PYTHONHASHSEED": hash_seed, "PYTHONPATH": SRC_DIR}
+    output = subprocess.run(
+        [sys.executable, "-c", CURVES_SCRIPT],
+        env=env,
+        check=True,
+        capture_output=True,
+        text=True,
+    ).stdout
+    return json.loads(output)
+
+
+def test_rarefaction_curves_do_not_depend_on_hash_seed() -> None:
+    """Curves of the same seed are equal in processes with different hash seeds"""
+    curves = compute_curves("1")
+    assert curves == compute_curves("2")
+    assert curves == compute_curves("3")
@@ -0,0 +1,78 @@
+import random
+from typing import List, Tuple
+
+import pytest
+
+from core.config import SUPPORTED_TESTS
+from core.stats import batch_statistic
+from core.utils import statistic
+
+
+def get_count_profiles(seed: int) -> List[Tuple[List[int], List[int]]]:
+    """
+    Returns random pairs of count lists: with and without ties, all-equal
+    groups, tiny groups and zero counts (which are ignored by the tests).
+    """
+    rng = random.Random(seed)
+    profiles: List[Tuple[List[int], List[int]]] = []
+    for _ in range(300):
+        n_1, n_2 = rng.randint(0, 12), rng.randint(0, 12)
+        max_count = rng.choice([1, 2, 3, 10, 1000])
+        profiles.append(
+            (
+                [rng.randint(0, max_count) for _ in range(n_1)],
+                [rng.randint(0, max_count) for _ in range(n_2)],
+            )
+        )
+    profiles.extend(
+        [
+            # all equal, within and between groups
+            ([2, 2, 2], [2, 2]),
+            ([3, 3, 3, 3], [3, 3, 3, 3]),
+            # all equal within groups
+            ([1, 1, 1], [4, 4, 4]),
+            ([5] * 10, [1] * 9),
+            # tiny groups
+            ([1], [2]),
+            ([7], [7]),
+            ([1, 2], [3]),
+            ([0, 0, 1], [0, 2]),
+            # no ties, exact Mann-Whitney U distribution
+            ([1, 3, 5, 7], [2, 4, 6, 8, 10]),
+            (list(range(1, 9)), list(range(5, 13))),
+            # larger samples, normal approximation
+            (list(range(1, 30)), list(range(10, 25))),
+            # heavy ties
+            ([1, 1, 1, 2, 2, 9], [1, 2, 2, 2, 3, 3, 3]),
+        ]
+    )
+    return profiles
+
+
+def assert_results_match(result, expected, profile) -> None:
+    if expected[0] is None:
+        assert result == (None, None, None, None), profile
+        return
+    assert result == pytest.approx(expected, rel=1e-7, abs=1e-12), profile
+
+
+# scipy warns about degenerate samples (e.g. zero variance)
+@pytest.mark.filterwarnings("ignore::RuntimeWarning")
+@pytest.mark.parametrize("min_proteomes", [1, 2])
+@pytest.mark.parametrize("test", sorted(SUPPORTED_TESTS))
+def test_batch_statistic_matches_statistic(test: str, min_proteomes: int) -> None:
+    profiles = get_count_profiles(seed=len(test) * 10 + min_proteomes)
+    results = batch_statistic(
+        [count_1 for count_1, _ in profiles],
+        [count_2 for _, count_2 in profiles],
+        test=test,
+        min_proteomes=min_proteomes,
+        cache=None,
+    )
+    assert len(results) == len(profiles)
+    for (count_1, count_2), result in zip(profiles, results):
+        assert_results_match(
+            result,
+            statistic(count_1, count_2, test, min_proteomes),
+            (count_1, count_2),
+        )
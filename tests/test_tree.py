@@ -0,0 +1,90 @@
+import itertools
+
+from ete3 import Tree
+
+from core.tree import TreeIndex
+
+# a node with more than two children (n1), and leaves at different depths
+NEWICK = "((A,B,C)n1,(D,(E,F)n3)n2,G)root;"
+PROTEOME_IDS = ["A", "B", "C", "D", "E", "F", "G"]
+
+
+def get_tree_index() -> TreeIndex:
+    tree_ete = Tree(NEWICK, format=1)
+    return TreeIndex(
+        tree_ete,
+        {proteome_id: idx for idx, proteome_id in enumerate(PROTEOME_IDS)},
+    )
+
+
+def get_bitmask(proteome_ids) -> int:
+    return sum(1 << PROTEOME_IDS.index(proteome_id) for proteome_id in proteome_ids)
+
+
+def get_leaf_subsets():
+    for size in range(1, len(PROTEOME_IDS) + 1):
+        yield from itertools.combinations(PROTEOME_IDS, size)
+
+
+def test_get_lca_matches_ete() -> None:
+    tree_index = get_tree_index()
+    tree_ete = tree_index.nodes[0].get_tree_root()
+    for proteome_ids in get_leaf_subsets():
+        leaf_idxs = [
+            tree_index.leaf_idx_by_proteome_idx[PROTEOME_IDS.index(proteome_id)]
+            for proteome_id in proteome_ids
+        ]
+        expected = (
+            tree_ete & proteome_ids[0]
+            if len(proteome_ids) == 1
+            else tree_ete.get_common_ancestor(*proteome_ids)
+        )
+        assert tree_index.nodes[tree_index.get_lca(leaf_idxs)] is expected
+
+
+def test_is_ancestor_matches_ete() -> None:
+    tree_index = get_tree_index()
+    for node_idx, node in enumerate(tree_index.nodes):
+        for other_node_idx, other_node in enumerate(tree_index.nodes):
+            expected = node is other_node or node in other_node.get_ancestors()
+            assert tree_index.is_ancestor(node_idx, other_node_idx) == expected
+
+
+def test_get_cluster_nodes_matches_ete_descendant_leaves() -> None:
+    tree_index = get_tree_index()
+    for proteome_ids in get_leaf_subsets():
+        present_node_idxs, lca_idx = tree_index.get_cluster_nodes(
+            get_bitmask(proteome_ids)
+        )
+        expected = {
+            node_idx
+            for node_idx, node in enumerate(tree_index.nodes)
+            if set(node.get_leaf_names()) & set(proteome_ids)
+        }
+        assert len(present_node_idxs) == len(expected)
+        assert set(present_node_idxs) == expected
+        # the LCA is the deepest node with all proteomes of the cluster below it
+        lca_node = tree_index.nodes[lca_idx]
+        assert set(proteome_ids) <= set(lca_node.get_leaf_names())
+        assert all(
+            not set(proteome_ids) <= set(child.get_leaf_names())
+            for child in lca_node.children
+        )
+
+
+def test_get_cluster_nodes_with_proteome_outside_tree() -> None:
+    tree_ete = Tree(NEWICK, format=1)
+    tree_index = TreeIndex(
+        tree_ete,
+        {proteome_id: idx for idx, proteome_id in enumerate(PROTEOME_IDS + ["H"])},
+    )
+    present_node_idxs, lca_idx = tree_index.get_cluster_nodes(
+        get_bitmask(["A", "B"]) | 1 << len(PROTEOME_IDS)
+    )
+    assert lca_idx == -1
+    assert {tree_index.nodes[node_idx].name for node_idx in present_node_idxs} == {
+        "A",
+        "B",
+        "n1",
+        "root",
+    }